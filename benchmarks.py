@@ -0,0 +1,311 @@
+#The necessary imports
+import sys
+import json
+import time
+import timeit
+import platform
+import argparse
+
+import numpy as np
+from classes import *
+from seq_tests import *
+from ele_tests import *
+from gen_result import *
+from searchstructure import *
+
+"""
+Micro-benchmarks of the hot kernels of the solver.
+Each kernel is timed on seeded inputs for a range of series lengths and magnitudes of the values,
+the results are written as JSON and can be compared against a stored baseline.
+Usage:
+    python -m benchmarks --json baseline.json
+    python -m benchmarks --baseline baseline.json --threshold 0.2
+"""
+
+"""
+The inputs of the benchmarks
+Each function gets a np random generator, the length of the series and the magnitude of its values,
+it returns the function to time (without arguments). Work which is not part of the kernel is done in advance.
+The series of the tests on subseries follow the rule of the test and end with np.nan, as in the search.
+"""
+def masked_last(series):
+    series     = np.asarray(series, dtype='float64')
+    series[-1] = np.nan
+    return series
+
+def arithmetic_series(rng, length, magnitude):
+    return magnitude*rng.uniform(0.5, 1.)+rng.integers(1, 10)*np.arange(length)
+
+def geometric_series(rng, length, magnitude):
+    #the factor keeps the last value below magnitude*1e12 for every length
+    factor = np.exp(np.log(1e12)/max(length, 2))*rng.uniform(0.5, 1.)
+    return magnitude*rng.uniform(0.5, 1.)*factor**np.arange(length)
+
+def fibonacci_series(rng, length, magnitude):
+    series     = np.zeros(max(length, 2))
+    series[:2] = magnitude*rng.uniform(0.5, 1., size = 2)
+    for index in range(2, length):
+        series[index] = series[index-1]+series[index-2]
+    return series[:length]
+
+def integer_values(rng, length, magnitude):
+    return rng.integers(2, max(int(magnitude), 3), size = length).astype('float64')
+
+def bench_const_test(rng, length, magnitude):
+    series = masked_last(np.full(length, magnitude*rng.uniform(0.5, 1.)))
+    return lambda: const_test(series)
+
+def bench_sum_test(rng, length, magnitude):
+    series = masked_last(arithmetic_series(rng, length, magnitude))
+    return lambda: sum_test(series)
+
+def bench_fac_test(rng, length, magnitude):
+    series = masked_last(geometric_series(rng, length, magnitude))
+    return lambda: fac_test(series)
+
+def bench_fib_test(rng, length, magnitude):
+    series = masked_last(fibonacci_series(rng, length, magnitude))
+    return lambda: fib_test(series)
+
+def bench_is_prime(rng, length, magnitude):
+    values = integer_values(rng, length, magnitude)
+    return lambda: is_prime(values)
+
+def bench_is_square(rng, length, magnitude):
+    values = integer_values(rng, length, magnitude)
+    return lambda: is_square(values)
+
+def bench_is_cube(rng, length, magnitude):
+    values = integer_values(rng, length, magnitude)
+    return lambda: is_cube(values)
+
+def random_pair(rng, length):
+    """
+    A (start_index, stepsize) pair perf_layer tests on a series of the given length.
+    """
+    upper_bound = max(int((2*length-1)/4.)+1, 2)
+    stepsize    = int(rng.integers(1, upper_bound))
+    return int(rng.integers(0, stepsize)), stepsize
+
+def random_triple(rng, length):
+    """
+    A (start_index, cons_elem_len, stepsize) triple perf_layer tests on a series of the given length.
+    """
+    start_index, stepsize = random_pair(rng, length)
+    upper_bound           = max(int((2*length-1)/4.)+1, 2)
+    return start_index, int(rng.integers(1, upper_bound)), stepsize
+
+def bench_extract_subseries(rng, length, magnitude):
+    """
+    One subseries, its indices come from the cache of subseries_plan (as in the search).
+    """
+    series = masked_last(arithmetic_series(rng, length, magnitude))
+    j, i   = random_pair(rng, length)
+    return lambda: extract_subseries(series, start_index = j, stepsize = i)
+
+def bench_subseries_plan(rng, length, magnitude):
+    """
+    The indices of one subseries, computed without the cache.
+    """
+    j, i = random_pair(rng, length)
+    return lambda: subseries_plan.__wrapped__(length, j, i)
+
+def bench_extract_subseries_cons_elem(rng, length, magnitude):
+    """
+    One set of blocks, its indices come from the cache of cons_elem_plan (as in the search).
+    """
+    series  = masked_last(arithmetic_series(rng, length, magnitude))
+    j, k, i = random_triple(rng, length)
+    return lambda: extract_subseries_cons_elem(series, start_index = j, cons_elem_len = k, stepsize = i)
+
+def bench_cons_elem_plan(rng, length, magnitude):
+    """
+    The indices of one set of blocks, computed without the cache.
+    """
+    j, k, i = random_triple(rng, length)
+    return lambda: cons_elem_plan.__wrapped__(length, j, k, i)
+
+def bench_gen_next_layer(rng, length, magnitude):
+    series = arithmetic_series(rng, length, magnitude)
+    return lambda: gen_next_layer(series)
+
+def scattered_positions(rng, length):
+    return np.sort(rng.choice(length, size = max(length//8, 2), replace = False))
+
+def run_positions(rng, length):
+    #runs of adjacent positions, which are filled one after another
+    run    = max(length//16, 3)
+    starts = rng.choice(length-run+1, size = max(length//32, 1), replace = False)
+    return np.unique((starts[:, None]+np.arange(run)).ravel())
+
+def backprop_case(rng, length, magnitude, gender, positions = None):
+    """
+    The ancestor misses the elements at positions (default: its last element), the child (its differences or quotients)
+    is complete. The series of the ancestor is copied before each call, as backprop fills it in place.
+    A single position takes the scalar branch of backprop, several positions the loops over them.
+    """
+    truth     = geometric_series(rng, length, magnitude)
+    positions = np.asarray([length-1] if positions is None else positions, dtype='int64')
+    ancestor  = data(positions, truth, None, None, None)
+    masked    = ancestor.series.copy()
+    series    = truth[1:]-truth[:-1] if gender == 'dif' else truth[1:]/truth[:-1]
+    child     = data(np.asarray([], dtype='int64'), series, None, None, None)
+    backprop  = backprop_dif if gender == 'dif' else backprop_quo
+    def run():
+        ancestor.enter_values(masked.copy())
+        backprop(ancestor, child)
+    return run
+
+def bench_backprop_dif(rng, length, magnitude):
+    return backprop_case(rng, length, magnitude, 'dif')
+
+def bench_backprop_quo(rng, length, magnitude):
+    return backprop_case(rng, length, magnitude, 'quo')
+
+def bench_backprop_dif_scattered(rng, length, magnitude):
+    return backprop_case(rng, length, magnitude, 'dif', scattered_positions(rng, length))
+
+def bench_backprop_quo_scattered(rng, length, magnitude):
+    return backprop_case(rng, length, magnitude, 'quo', scattered_positions(rng, length))
+
+def bench_backprop_dif_runs(rng, length, magnitude):
+    return backprop_case(rng, length, magnitude, 'dif', run_positions(rng, length))
+
+def bench_backprop_quo_runs(rng, length, magnitude):
+    return backprop_case(rng, length, magnitude, 'quo', run_positions(rng, length))
+
+"""
+The benchmarks, in the order they are run (the position seeds the inputs)
+"""
+BENCHMARKS = [('const_test',                  bench_const_test),
+              ('sum_test',                    bench_sum_test),
+              ('fac_test',                    bench_fac_test),
+              ('fib_test',                    bench_fib_test),
+              ('is_prime',                    bench_is_prime),
+              ('is_square',                   bench_is_square),
+              ('is_cube',                     bench_is_cube),
+              ('extract_subseries',           bench_extract_subseries),
+              ('subseries_plan',              bench_subseries_plan),
+              ('extract_subseries_cons_elem', bench_extract_subseries_cons_elem),
+              ('cons_elem_plan',              bench_cons_elem_plan),
+              ('gen_next_layer',              bench_gen_next_layer),
+              ('backprop_dif',                bench_backprop_dif),
+              ('backprop_quo',                bench_backprop_quo),
+              ('backprop_dif_scattered',      bench_backprop_dif_scattered),
+              ('backprop_quo_scattered',      bench_backprop_quo_scattered),
+              ('backprop_dif_runs',           bench_backprop_dif_runs),
+              ('backprop_quo_runs',           bench_backprop_quo_runs)]
+
+LENGTHS    = [8, 32, 128, 512]
+MAGNITUDES = [1e2, 1e4, 1e6]
+
+"""
+Running the benchmarks
+"""
+def case_key(name, length, magnitude):
+    return '%s[length=%d,magnitude=%g]' % (name, length, magnitude)
+
+def time_function(function, repeat = 5, min_time = 0.02):
+    """
+    time_function(function, repeat = 5, min_time = 0.02)
+    Calls the function once (e.g. to compile numba kernels and to grow the prime sieve),
+    then finds the number of calls taking at least min_time seconds and times them repeat times.
+    Output: a dict of the number of calls per repetition and the minimum and median time of one call (in µs).
+    """
+    function()
+    timer  = timeit.Timer(function)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    times  = np.asarray(timer.repeat(repeat = repeat, number = number))/number
+    return {'number': number, 'min_us': 1e6*float(times.min()), 'median_us': 1e6*float(np.median(times))}
+
+def run_benchmarks(names = None, lengths = LENGTHS, magnitudes = MAGNITUDES, seed = 0, repeat = 5, min_time = 0.02, verbose = True):
+    """
+    run_benchmarks(names = None, lengths = LENGTHS, magnitudes = MAGNITUDES, seed = 0, repeat = 5, min_time = 0.02, verbose = True)
+    Input: the names of the benchmarks to run (None for all, compare BENCHMARKS), the lengths of the series,
+           the magnitudes of their values, the seed of the inputs and the settings of time_function.
+    Output: a dict {key: result} (compare `case_key´ and `time_function´).
+    The inputs of a case only depend on the seed, the benchmark, the length and the magnitude.
+    """
+    results = {}
+    for number, (name, bench) in enumerate(BENCHMARKS):
+        if (names is not None) and (name not in names):
+            continue
+        for length in lengths:
+            for magnitude in magnitudes:
+                rng    = np.random.default_rng([seed, number, length, int(round(np.log10(magnitude)*100))])
+                key    = case_key(name, length, magnitude)
+                result = time_function(bench(rng, length, magnitude), repeat, min_time)
+                result.update({'benchmark': name, 'length': length, 'magnitude': magnitude})
+                results[key] = result
+                if verbose:
+                    print('%-60s %12.2f µs' % (key, result['min_us']))
+    return results
+
+def environment():
+    """
+    environment()
+    The versions the benchmarks ran with, stored next to the results.
+    """
+    try:
+        import numba
+        numba_version = numba.__version__
+    except ImportError:
+        numba_version = None
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'numba': numba_version,
+            'machine': platform.machine(), 'processor': platform.processor(), 'system': platform.system()}
+
+def compare(results, baseline, threshold = 0.1):
+    """
+    compare(results, baseline, threshold = 0.1)
+    Input: the results of run_benchmarks and the ones of a baseline (e.g. loaded from its JSON file),
+           the relative slowdown tolerated (0.1 -> 10 %).
+    Output: a list of (key, baseline µs, current µs, ratio) for the cases present in both, sorted by ratio,
+            and the list of the keys which are slower than the baseline by more than the threshold.
+    The minimum times are compared, as they are the least disturbed by other processes.
+    """
+    rows        = []
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        ratio = result['min_us']/baseline[key]['min_us'] if baseline[key]['min_us'] > 0. else np.inf
+        rows.append((key, baseline[key]['min_us'], result['min_us'], ratio))
+        if ratio > 1.+threshold:
+            regressions.append(key)
+    rows.sort(key = lambda row: row[3])
+    return rows, regressions
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Runs the micro-benchmarks of the hot kernels.')
+    parser.add_argument('--bench', nargs = '+', default = None,
+                        help = 'names of the benchmarks to run (default: all of '+', '.join(name for name, bench in BENCHMARKS)+')')
+    parser.add_argument('--lengths', type = int, nargs = '+', default = LENGTHS, help = 'lengths of the series')
+    parser.add_argument('--magnitudes', type = float, nargs = '+', default = MAGNITUDES, help = 'magnitudes of the values')
+    parser.add_argument('--seed', type = int, default = 0, help = 'seed of the inputs (default: 0)')
+    parser.add_argument('--repeat', type = int, default = 5, help = 'repetitions of each case (default: 5)')
+    parser.add_argument('--min-time', type = float, default = 0.02, help = 'seconds per repetition (default: 0.02)')
+    parser.add_argument('--json', default = None, help = 'write the results to this file')
+    parser.add_argument('--baseline', default = None, help = 'compare against the results in this file')
+    parser.add_argument('--threshold', type = float, default = 0.1,
+                        help = 'relative slowdown reported as a regression (default: 0.1)')
+    args    = parser.parse_args(argv)
+    results = run_benchmarks(args.bench, args.lengths, args.magnitudes, args.seed, args.repeat, args.min_time)
+    if args.json is not None:
+        with open(args.json, 'w') as file:
+            json.dump({'environment': environment(), 'arguments': vars(args), 'results': results}, file, indent = 1)
+    if args.baseline is not None:
+        with open(args.baseline) as file:
+            baseline = json.load(file)['results']
+        rows, regressions = compare(results, baseline, args.threshold)
+        for key, before, after, ratio in rows:
+            print('%-60s %12.2f -> %12.2f µs  x%.2f%s' % (key, before, after, ratio,
+                                                          '  REGRESSION' if key in regressions else ''))
+        print(len(regressions), 'of', len(rows), 'cases slower than the baseline by more than',
+              '%g %%' % (100*args.threshold))
+        return 1 if len(regressions) != 0 else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
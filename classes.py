@@ -1,16 +1,101 @@
 #The necessary imports
 import copy
+import time
 import functools
 import random
+import threading
 
 import numpy as np
-import numba as nb
+try:
+    import numba as nb
+except ImportError:
+    nb = None
+
+"""
+The ways a data object can be generated from its ancestor, stored as codes in the family tree.
+"""
+GENDERS = [None, 'dif', 'quo']
+
+class family_tree:
+    """
+    contains:   __init__(self, truth = None, capacity = 16)
+                add(self, series, parent, gender, positive_tests, links = ())
+                node(self, index)
+    Stores the data objects of a search, from which other data objects got generated, as struct of arrays:
+    for each node the index of its ancestor (-1 for the root), the code of its gender (see GENDERS),
+    its positive tests, further (ancestor, gender) pairs it can be generated from (if duplicates got merged)
+    and the offset of its series in one shared buffer.
+    The data objects themselves only store their index in the tree, thus they don't keep their ancestors alive.
+    """
+    __slots__ = ('truth', 'size', 'used', 'parents', 'genders', 'offsets', 'lengths', 'rules', 'links', 'buffer')
+
+    def __init__(self, truth = None, capacity = 16):
+        """
+        __init__(self, truth = None, capacity = 16)
+        Input: the ground-truth of the search (shared by all nodes) and the number of nodes to allocate.
+        """
+        self.truth   = truth
+        self.size    = 0
+        self.used    = 0
+        self.parents = np.full(capacity, -1, dtype='int64')
+        self.genders = np.zeros(capacity, dtype='int8')
+        self.offsets = np.zeros(capacity, dtype='int64')
+        self.lengths = np.zeros(capacity, dtype='int64')
+        self.rules   = np.empty(capacity, dtype=object)
+        self.links   = np.empty(capacity, dtype=object)
+        self.buffer  = np.empty(16*capacity, dtype='float64')
+        return
+
+    def add(self, series, parent, gender, positive_tests, links = ()):
+        """
+        add(self, series, parent, gender, positive_tests, links = ())
+        Input: the series of the node (gets copied), the index of its ancestor (-1 if none),
+               the way it got generated (see GENDERS), its positive tests
+               and further (index of ancestor, gender) pairs it can be generated from.
+        Output: the index of the node
+        The arrays (and the buffer) double their size if they are full.
+        """
+        if self.size == self.parents.size:
+            capacity     = 2*self.parents.size
+            self.parents = np.concatenate((self.parents, np.full(capacity-self.size, -1, dtype='int64')))
+            self.genders = np.concatenate((self.genders, np.zeros(capacity-self.size, dtype='int8')))
+            self.offsets = np.concatenate((self.offsets, np.zeros(capacity-self.size, dtype='int64')))
+            self.lengths = np.concatenate((self.lengths, np.zeros(capacity-self.size, dtype='int64')))
+            self.rules   = np.concatenate((self.rules, np.empty(capacity-self.size, dtype=object)))
+            self.links   = np.concatenate((self.links, np.empty(capacity-self.size, dtype=object)))
+        if self.used + series.size > self.buffer.size:
+            self.buffer = np.concatenate((self.buffer, np.empty(max(self.buffer.size, series.size))))
+        index                = self.size
+        self.parents[index]  = parent
+        self.genders[index]  = GENDERS.index(gender)
+        self.offsets[index]  = self.used
+        self.lengths[index]  = series.size
+        self.rules[index]    = positive_tests
+        self.links[index]    = links
+        self.buffer[self.used:self.used+series.size] = series
+        self.used           += series.size
+        self.size           += 1
+        return index
+
+    def node(self, index):
+        """
+        node(self, index)
+        Output: a new data object containing a copy of the stored node.
+        """
+        series = self.buffer[self.offsets[index]:self.offsets[index]+self.lengths[index]].copy()
+        return data.from_tree(self, index, series, self.rules[index], GENDERS[self.genders[index]])
 
 class data:
     """
     contains:   __init__(self, positions, series)
+                spawn(self, series, gender)
+                fork(self)
+                add_links(self, other)
                 fill_in(self,position,values)
     """
+    __slots__ = ('pos', 'truth', 'series', 'positive_tests', 'gender', 'tree', 'parent', 'links', 'index', 'shared',
+                 'multiplicity', 'rule_chains')
+
     def __init__(self, positions, series, positive_tests, ancestor, gender):
         """
         __init__(self, positions, series)
@@ -20,8 +105,11 @@ class data:
             2.) a np array which contains a series, used as ground-truth for predictions (self.truth)
             3.) the ground-truth masked at the given positions, denoted as np.nan (self.series)
             4.) the tests with positive outcome
-            5.) the data object from which this data object got generated
+            5.) the data object from which this data object got generated,
+                stored as its index in the family tree (self.tree, self.parent)
             6.) the way this data object got generated
+            7.) the number of leaves supporting this data object as a soloution and their rule chains
+                (compare `return_solutions´)
         """
         self.pos                      = positions
         self.truth                    = series
@@ -30,29 +118,402 @@ class data:
         mask[positions]               = True
         series_work[np.nonzero(mask)] = np.nan
         self.series                   = series_work
-        self.positive_tests           = [positive_tests]
-        self.ancestors                = [ancestor]
+        self.positive_tests           = (positive_tests,)
         self.gender                   = gender
+        self.links                    = ()
+        self.index                    = -1
+        self.shared                   = False
+        self.multiplicity             = 1
+        self.rule_chains              = ()
+        if ancestor is not None:
+            self.tree   = ancestor.family_tree()
+            self.parent = ancestor.register()
+            self.truth  = self.tree.truth
+        else:
+            self.tree   = None
+            self.parent = -1
         return
-    
+
+    @classmethod
+    def from_tree(cls, tree, index, series, positive_tests, gender):
+        """
+        from_tree(cls, tree, index, series, positive_tests, gender)
+        Creates a data object for a node stored in the family tree (without masking anything).
+        """
+        obj                = cls.__new__(cls)
+        obj.pos            = np.arange(series.size)[np.isnan(series)]
+        obj.truth          = tree.truth
+        obj.series         = series
+        obj.positive_tests = positive_tests
+        obj.gender         = gender
+        obj.tree           = tree
+        obj.parent         = tree.parents[index]
+        obj.links          = tree.links[index]
+        obj.index          = index
+        obj.shared         = False
+        obj.multiplicity   = 1
+        obj.rule_chains    = ()
+        return obj
+
+    def __deepcopy__(self, memo):
+        """
+        Copies the series, the positions and the tests, the family tree is shared.
+        The copy is not registered in the family tree.
+        """
+        obj                = self.__class__.__new__(self.__class__)
+        obj.pos            = self.pos.copy()
+        obj.truth          = self.truth
+        obj.series         = self.series.copy()
+        obj.positive_tests = self.positive_tests
+        obj.gender         = self.gender
+        obj.tree           = self.tree
+        obj.parent         = self.parent
+        obj.links          = self.links
+        obj.index          = -1
+        obj.shared         = False
+        obj.multiplicity   = 1
+        obj.rule_chains    = ()
+        return obj
+
+    def fork(self):
+        """
+        fork(self)
+        Returns a copy of this data object, which shares the series with it until one of them writes to it
+        (compare `writable_series(self)´). The positive tests are a tuple, thus they are shared as well.
+        The copy is not registered in the family tree, but both share it (it gets started if there is none yet).
+        """
+        obj                = self.__class__.__new__(self.__class__)
+        obj.pos            = self.pos
+        obj.truth          = self.truth
+        obj.series         = self.series
+        obj.positive_tests = self.positive_tests
+        obj.gender         = self.gender
+        obj.tree           = self.family_tree()
+        obj.parent         = self.parent
+        obj.links          = self.links
+        obj.index          = -1
+        obj.shared         = True
+        obj.multiplicity   = 1
+        obj.rule_chains    = ()
+        self.shared        = True
+        return obj
+
+    @property
+    def ancestors(self):
+        """
+        The data object from which this data object got generated (a copy taken from the family tree) in a list,
+        [None] if there is none.
+        """
+        if self.parent == -1:
+            return [None]
+        return [self.tree.node(self.parent)]
+
+    def family_tree(self):
+        """
+        family_tree(self)
+        Returns the family tree of this data object, a new one is started if there is none yet.
+        """
+        if self.tree is None:
+            self.tree = family_tree(truth = self.truth)
+        return self.tree
+
+    def register(self):
+        """
+        register(self)
+        Stores this data object in its family tree (once), such that data objects can be generated from it.
+        Returns its index in the tree.
+        """
+        if self.index == -1:
+            self.index = self.family_tree().add(self.series, self.parent, self.gender, self.positive_tests, self.links)
+        return self.index
+
+    def spawn(self, series, gender):
+        """
+        spawn(self, series, gender)
+        Input: the series of the new data object and the way it got generated from this one
+        Output: a new data object generated from this data object, which gets registered in the family tree
+        """
+        obj                = self.__class__.__new__(self.__class__)
+        obj.pos            = np.arange(series.size)[np.isnan(series)]
+        obj.truth          = self.family_tree().truth
+        obj.series         = series
+        obj.positive_tests = (None,)
+        obj.gender         = gender
+        obj.tree           = self.tree
+        obj.parent         = self.register()
+        obj.links          = ()
+        obj.index          = -1
+        obj.shared         = False
+        obj.multiplicity   = 1
+        obj.rule_chains    = ()
+        return obj
+
     def fill_in(self,position,values):
         """
         fill_in(self,position,values)
-        Input: The series (from self), the positions to fill in (as np array, dtype int) 
+        Input: The series (from self), the positions to fill in (as np array, dtype int)
                and the values to put (as np array, dtype castable into dtype of series)
         Output: The updated series, updated positions stored inside the object
-        
-        MAKE SURE that positions is a SUBSET of self.pos 
-        
+
+        MAKE SURE that positions is a SUBSET of self.pos
+
         """
+        series = self.writable_series()
         for v,p in zip(values,position):
-            self.series[p] = v
-        self.pos = np.setdiff1d(self.pos, position)
+            series[p] = v
+        self.pos  = np.setdiff1d(self.pos, position)
+        self.index = -1
+        return
+
+    def add_links(self, other):
+        """
+        add_links(self, other)
+        Merges a duplicate data object (same series) into this one:
+        the (ancestor, gender) pairs from which other got generated are added to the links of this data object.
+        """
+        for link in ((other.parent, other.gender),)+other.links:
+            if (link != (self.parent, self.gender)) and (link not in self.links) and (link[0] != -1):
+                self.links = self.links + (link,)
+                self.index = -1
+        return
+
+    def writable_series(self):
+        """
+        writable_series(self)
+        Returns the series of this data object for writing to it,
+        if it is shared with a fork it gets copied first.
+        """
+        if self.shared:
+            self.series = self.series.copy()
+            self.shared = False
+        self.index = -1
+        return self.series
+
+    def add_test(self, test):
+        """
+        add_test(self, test)
+        Appends a positive test to the (immutable) tuple of positive tests.
+        """
+        self.positive_tests = self.positive_tests + (test,)
+        self.index          = -1
         return
-    
+
     def enter_values(self, series):
         """
         Overwrite the series in a data object
         """
         self.series = series
-        pass
\ No newline at end of file
+        self.shared = False
+        self.index  = -1
+        pass
+
+class candidate_list:
+    """
+    contains:   __init__(self, capacity = 16)
+                append(self, data_object)
+                extend(self, data_objects)
+                objects(self)
+                states(self)
+    A growable array of data objects, which stores the number of positions to predict of each object (its state)
+    when it is appended. The arrays are allocated in advance and double their size if they are full,
+    thus appending is amortized O(1).
+    Indexing (e.g. with a boolean mask) works like indexing the np array of the appended objects.
+    """
+    __slots__ = ('size', 'buffer', 'state_buffer')
+
+    def __init__(self, capacity = 16):
+        """
+        __init__(self, capacity = 16)
+        Input: the number of data objects to allocate (e.g. an upper bound of the objects to append).
+        """
+        self.size         = 0
+        self.buffer       = np.empty(max(int(capacity), 1), dtype=object)
+        self.state_buffer = np.zeros(max(int(capacity), 1), dtype='int64')
+        return
+
+    def append(self, data_object):
+        """
+        append(self, data_object)
+        Appends a data object and its state.
+        """
+        if self.size == self.buffer.size:
+            self.buffer       = np.concatenate((self.buffer, np.empty(self.buffer.size, dtype=object)))
+            self.state_buffer = np.concatenate((self.state_buffer, np.zeros(self.state_buffer.size, dtype='int64')))
+        self.buffer[self.size]       = data_object
+        self.state_buffer[self.size] = data_object.pos.size
+        self.size                   += 1
+        return
+
+    def extend(self, data_objects):
+        """
+        extend(self, data_objects)
+        Appends all given data objects.
+        """
+        for data_object in data_objects:
+            self.append(data_object)
+        return
+
+    def objects(self):
+        """
+        objects(self)
+        Returns the np array (dtype object) of the appended data objects, a view which doesn't change by appending.
+        """
+        return self.buffer[:self.size]
+
+    def states(self):
+        """
+        states(self)
+        Returns the np array of the states of the appended data objects.
+        """
+        return self.state_buffer[:self.size]
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        return iter(self.objects())
+
+    def __getitem__(self, key):
+        return self.objects()[key]
+
+class transposition_table:
+    """
+    contains:   __init__(self, decimals = 8)
+                key(self, data_object)
+                rules_key(self, positive_tests)
+                merge(self, data_object)
+    A hash table of the data objects seen so far, keyed by their series (rounded to decimals) and np.nan positions.
+    Duplicates get merged into the data object seen first (compare `data.add_links´).
+    A duplicate found by other rules is not merged, as a data object has one set of positive tests:
+    it stays a candidate of its own, thus its rules are kept (compare `rule_chains´ and `return_solutions´),
+    the data objects generated from both get merged in the next layer.
+    """
+    __slots__ = ('decimals', 'table')
+
+    def __init__(self, decimals = 8):
+        """
+        __init__(self, decimals = 8)
+        Input: the number of decimals two series have to agree on to be duplicates.
+        """
+        self.decimals = decimals
+        self.table    = {}
+        return
+
+    def key(self, data_object):
+        """
+        key(self, data_object)
+        Returns the key of a data object: its length, its rounded series and the positions which are np.nan.
+        """
+        series = data_object.series
+        nan    = np.isnan(series)
+        values = np.round(np.where(nan, 0., series), self.decimals) + 0. # + 0. turns -0. into 0.
+        return series.size, values.tobytes(), nan.tobytes()
+
+    def rules_key(self, positive_tests):
+        """
+        rules_key(self, positive_tests)
+        The positive tests as a hashable tuple (the values of some tests are np arrays).
+        """
+        return tuple(test if (test is None) or not any(isinstance(value, np.ndarray) for value in test)
+                     else tuple(value.tobytes() if isinstance(value, np.ndarray) else value for value in test)
+                     for test in positive_tests)
+
+    def merge(self, data_object):
+        """
+        merge(self, data_object)
+        Output: None if the data object is new (it gets stored),
+                otherwise the data object seen first, into which the given one got merged.
+        """
+        key      = (self.key(data_object), self.rules_key(data_object.positive_tests))
+        existing = self.table.get(key)
+        if existing is None:
+            self.table[key] = data_object
+            return None
+        existing.add_links(data_object)
+        return existing
+
+class cancel_token:
+    """
+    contains:   __init__(self)
+                cancel(self)
+                cancelled(self)
+    Cancels a search from another thread: the search checks the token at its loop boundaries
+    and returns what it found so far (compare `search_budget´).
+    """
+    __slots__ = ('event',)
+
+    def __init__(self):
+        self.event = threading.Event()
+        return
+
+    def cancel(self):
+        """
+        cancel(self)
+        Asks every search holding this token to stop (thread-safe).
+        """
+        self.event.set()
+        return
+
+    def cancelled(self):
+        return self.event.is_set()
+
+class search_budget:
+    """
+    contains:   __init__(self, timeout_s = None, max_candidates = None, cancel = None)
+                charge(self, number = 1)
+                exhausted(self)
+    The time and work a search may spend: timeout_s seconds from the creation of the budget,
+    max_candidates candidates (the ones generated by gen_next and the forks kept by perf_layer)
+    and a cancel_token. None means unbounded.
+    Once exhausted the budget stays exhausted, reason tells why ('cancelled', 'max_candidates' or 'timeout').
+    """
+    __slots__ = ('deadline', 'max_candidates', 'cancel', 'candidates', 'reason')
+
+    def __init__(self, timeout_s = None, max_candidates = None, cancel = None):
+        self.deadline       = None if timeout_s is None else time.monotonic()+timeout_s
+        self.max_candidates = max_candidates
+        self.cancel         = cancel
+        self.candidates     = 0
+        self.reason         = None
+        return
+
+    def charge(self, number = 1):
+        """
+        charge(self, number = 1)
+        Counts number new candidates against max_candidates.
+        """
+        self.candidates += number
+        return
+
+    def exhausted(self):
+        """
+        exhausted(self)
+        Returns True if the search has to stop (the token got cancelled, max_candidates or the deadline is reached).
+        """
+        if self.reason is None:
+            if (self.cancel is not None) and self.cancel.cancelled():
+                self.reason = 'cancelled'
+            elif (self.max_candidates is not None) and (self.candidates >= self.max_candidates):
+                self.reason = 'max_candidates'
+            elif (self.deadline is not None) and (time.monotonic() >= self.deadline):
+                self.reason = 'timeout'
+        return self.reason is not None
+
+class incomplete_result(np.ndarray):
+    """
+    The output of a search which exhausted its budget: a np array (dtype object) of the best candidates found so far,
+    either the soloutions of the interrupted layer (there might be more) or,
+    if there are none, the candidates with the fewest positions left to predict.
+    reason -> why the budget is exhausted (compare `search_budget´).
+    Indexing and slicing keep the reason.
+    """
+    complete = False
+
+    def __new__(cls, candidates, reason):
+        obj        = np.asarray(candidates, dtype=object).view(cls)
+        obj.reason = reason
+        return obj
+
+    def __array_finalize__(self, obj):
+        self.reason = getattr(obj, 'reason', None)
+        return
@@ -3,20 +3,57 @@ import functools
 import random
 import math
 import numpy as np
-import numba as nb
+try:
+    import numba as nb
+except ImportError:
+    nb = None
+from seq_tests import *
 
 """
-get series at indices where series is not np.nan
+The number of known elements a block needs to be tested
 """
-def series_non_nan_cons_elem_test(series, mat_indices):
+CONS_MINIMAL_SIZES = {'const': 2, 'sum': 3, 'fac': 3}
+
+"""
+Performs a test of `perform_tests_rows´ on blocks of consecutive elements
+"""
+def cons_elem_blocks_test(matrix, lengths, groups, number_groups, mode = 'const'):
     """
-    series_non_nan_cons_elem_test(series, mat_indices):
-    returns series[mat_indices[i]] where it's not np.nan 
+    cons_elem_blocks_test(matrix, lengths, groups, number_groups, mode = 'const'):
+    Input: the blocks of number_groups sets of blocks as the rows of a matrix,
+           the length of each block (the entries of a row after its block have to be np.nan,
+           the matrix needs at least one column more than the longest block),
+           the set each block belongs to and the name of the test.
+    A block is tested if it has at least CONS_MINIMAL_SIZES[mode] known elements (for 'fac' elements which are 0
+    are disregarded). A set of blocks is positive if at least two of its blocks were tested, all of them are positive
+    and at least one of them contains np.nan.
+    returns the boolean value of this check for each set and the value of each block (np.nan if it wasn't tested).
     """
-    series_pos = np.asarray([series[ind] for ind in mat_indices[0]])
-    series_pos_non_nan = np.asarray([series_pos[row][np.logical_not(np.isnan(series_pos[row]))!=0]
-                            for row in np.arange(series_pos.shape[0])],dtype=object)
-    return series_pos_non_nan
+    nan    = np.isnan(matrix)
+    known  = np.logical_not(nan) & (matrix != 0.) if mode == 'fac' else np.logical_not(nan)
+    in_row = np.arange(matrix.shape[1]) < lengths[:,None]
+    tested = np.count_nonzero(known, axis=1) >= CONS_MINIMAL_SIZES[mode]
+    #the entry after each block is np.nan, so the blocks count as incomplete series for the tests of seq_tests
+    results, values = perform_tests_rows(matrix, lengths+1, mode = mode)
+    values   = np.where(tested, values, np.nan)
+    count    = np.bincount(groups, weights = tested, minlength = number_groups)
+    failed   = np.bincount(groups, weights = tested & np.logical_not(results), minlength = number_groups)
+    fillable = np.bincount(groups, weights = tested & (nan & in_row).any(axis=1), minlength = number_groups)
+    return (count >= 2) & (failed == 0) & (fillable >= 1), values
+
+def cons_elem_rows_test(series, mat_indices, mode = 'const'):
+    """
+    cons_elem_rows_test(series, mat_indices, mode = 'const'):
+    cons_elem_blocks_test for the blocks series[mat_indices].
+    returns the boolean value of this check and the value of each block.
+    """
+    if(series[np.isnan(series)].size != 0):
+        matrix = series[np.asarray(mat_indices).astype('int')]
+        padded = np.hstack((matrix, np.full((matrix.shape[0],1), np.nan)))
+        result, values = cons_elem_blocks_test(padded, np.full(matrix.shape[0], matrix.shape[1]),
+                                               np.zeros(matrix.shape[0], dtype='int'), 1, mode = mode)
+        return bool(result[0]), values
+    return False, np.nan
 
 """
 constant test for series of consecutive elements 
@@ -24,18 +61,10 @@ constant test for series of consecutive elements
 def const_cons_elem_test(series, mat_indices):
     """
     const_cons_elem_test(series, mat_indices):
-    returns the test result for const_test for each block if all tests were positive. (all(const_tests))
+    returns the test result for const_test for each block if all tests were positive (all(const_tests)),
+    as well as the constant of each block.
     """
-    if(series[np.isnan(series)].size != 0):
-        ser_non_nan      = series_non_nan_cons_elem_test(series, mat_indices)
-        len_ser_non_nan  = ser_non_nan.shape[0]
-        bool_vec_val     = np.asarray([const_test(ser_non_nan[i]) 
-                                       for i in np.arange(len_ser_non_nan) if ser_non_nan[i].size >=2])
-        if bool_vec_val.size >= 1:
-            if all(bool_vec_val.T[0,:]):
-                return True, bool_vec_val.T[1:,:]
-            return False, np.nan
-    return False, np.nan
+    return cons_elem_rows_test(series, mat_indices, mode = 'const')
 
 """
 sum test for series of consecutive elements 
@@ -44,18 +73,9 @@ def sum_cons_elem_test(series, mat_indices):
     """
     sum_cons_elem_test(series, mat_indices):
     returns the boolean value of the sum_test for the consecutive elements (all(sum_tests)),
-    as well as the difference and which block was tested.
+    as well as the difference of each block.
     """
-    if(series[np.isnan(series)].size != 0):
-        ser_non_nan      = series_non_nan_cons_elem_test(series, mat_indices)
-        len_ser_non_nan  = ser_non_nan.shape[0]
-        bool_vec_val     = np.asarray([sum_test(ser_non_nan[i])+(i,)
-                                       for i in np.arange(len_ser_non_nan) if ser_non_nan[i].size >=3])
-        if bool_vec_val.size >= 1:
-            if all(bool_vec_val.T[0,:])&(bool_vec_val.size>=2):
-                return True, bool_vec_val.T[1:,:]
-            return False, bool_vec_val.T[1:,:]
-    return False, np.nan
+    return cons_elem_rows_test(series, mat_indices, mode = 'sum')
 
 """
 fac test for series of consecutive elements 
@@ -64,21 +84,9 @@ def fac_cons_elem_test(series, mat_indices):
     """
     fac_cons_elem_test(series, mat_indices):
     returns the boolean value of the fac_test for the consecutive elements (all(fac_tests)),
-    as well as the factor and which block block was tested.
+    as well as the factor of each block.
     """
-    if(series[np.isnan(series)].size != 0):
-        ser_non_nan      = series_non_nan_cons_elem_test(series, mat_indices)
-        len_ser_non_nan  = ser_non_nan.shape[0]
-        ser_non_nan      = np.asarray([ser_non_nan[i][ser_non_nan[i] != 0] for i in np.arange(len_ser_non_nan) 
-                                       if (ser_non_nan[i][ser_non_nan[i] != 0]).size > 0])
-        len_ser_non_nan  = ser_non_nan.shape[0]
-        bool_vec_val     = np.asarray([fac_test(ser_non_nan[i])+(i,)
-                                       for i in np.arange(len_ser_non_nan) if ser_non_nan[i].size >=3])
-        if bool_vec_val.size >= 1:
-            if all(bool_vec_val.T[0,:])&(bool_vec_val.size>=2):
-                return True, bool_vec_val.T[1:,:]
-            return False, bool_vec_val.T[1:,:]
-    return False, np.nan
+    return cons_elem_rows_test(series, mat_indices, mode = 'fac')
 
 
 """
@@ -107,60 +115,18 @@ def fill_cons_tests(data_object, thesis, start_index, cons_elem_len, step_size,
     """
     fill_cons_tests(data_object, thesis, start_index, cons_elem_len, step_size, value, mode = 'const'):
     Fills the series with the corresponding values, according to the result of the corresponding test.
+    Each tested block is filled with the value found for it, compare `fill_tests_rows´.
     """
-    j = start_index
-    i = step_size
-    series = data_object.series
-    if mode == 'const':
-        mode    = 'cons_const'
-        counter = 0
-        for block in thesis:
-            positions = block
-            values    = np.full(positions.shape, value[counter])
-            if positions.ndim != 0:
-                data_object.fill_in(positions,values)
-            else:
-                data_object.fill_in(np.asarray([positions]),np.asarray([values]))
-            counter += 1
-        data_object.positive_tests.append((mode, start_index, cons_elem_len, step_size, value))
-        return
-    elif mode == 'sum':
-        mode    = 'cons_sum'
-        counter = 0
-        for block in thesis:
-            positions = block
-            if np.nonzero(np.logical_not(np.isnan(series[block])))[0].ndim != 0:
-                index = j+i*np.nonzero(np.logical_not(np.isnan(series[block])))[0][0]
-            else:
-                index = j+i*np.nonzero(np.logical_not(np.isnan(series[block])))[0]
-            values = series[index]+((positions-index)/i)*value
-            if positions.ndim != 0:
-                data_object.fill_in(positions,values)
-            else:
-                data_object.fill_in(np.asarray([positions]),np.asarray([values]))
-            counter += 1
-        data_object.positive_tests.append((mode, start_index, cons_elem_len, step_size, value))
-        return
-    elif mode == 'fac':
-        mode    = 'cons_fac'
-        counter = 0
-        for block in thesis:
-            positions = block
-            indices = (np.nonzero(np.logical_not(np.isnan(series[block])))[0])
-            indices = indices[(np.nonzero(series[block][indices]!=0.)[0])]
-            if indices.ndim != 0:
-                index = j+i*indices[0]
-            else:
-                index = j+i*indices
-            values = (series[index])*(value**((positions-index)/i))
-            if positions.ndim != 0:
-                data_object.fill_in(positions,values)
-            else:
-                data_object.fill_in(np.asarray([positions]),np.asarray([values]))
-            counter += 1
-        data_object.positive_tests.append((mode, start_index, step_size, value))    
-        return
-    else:
+    if mode not in ['const','sum','fac']:
         print('ERROR: This mode doesn\'t exist yet.')
         return False, None
-    pass
\ No newline at end of file
+    series         = data_object.writable_series()
+    thesis         = np.asarray(thesis).astype('int')
+    tested         = np.logical_not(np.isnan(value))
+    blocks         = thesis[tested]
+    matrix         = series[blocks]
+    filled         = fill_tests_rows(matrix, value[tested], mode = mode)
+    positions      = np.isnan(matrix) & np.logical_not(np.isnan(filled))
+    data_object.fill_in(blocks[positions], filled[positions])
+    data_object.add_test(('cons_'+mode, start_index, cons_elem_len, step_size, value))
+    return
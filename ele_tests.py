@@ -3,7 +3,10 @@ import functools
 import random
 import math
 import numpy as np
-import numba as nb
+try:
+    import numba as nb
+except ImportError:
+    nb = None
 
 
 """
@@ -19,19 +22,170 @@ def where(array1,array2):
 The following method finds the position at which the sequence contains primes
 """
 
+#the number up to which the shared prime index may sieve, numbers above are tested by trial division
+PRIME_LIMIT = 10**7
+
+class prime_index:
+    """
+    contains:   __init__(self, limit = 1024, max_limit = PRIME_LIMIT, segment = 2**20)
+                grow(self, limit)
+                odd_primes(self, numbers)
+                is_prime(self, values)
+                rank(self, values)
+                nth(self, ranks)
+    A sieve of Eratosthenes over the odd numbers, packed into bits (bit k of the byte sieve[k//8] <=> 2*k+1 is prime).
+    It grows (at least doubling) when larger numbers are asked for, only the new numbers get sieved,
+    segment odd numbers at a time, thus the memory needed besides the bits is bounded by the segment.
+    The primes found are kept in a sorted array (uint32), thus ranks and primes are found by lookups.
+    is_prime, rank and nth are the mathematical ones, the elementwise tests use the ones of `prime(n)´ and `prime_pos´.
+    """
+    def __init__(self, limit = 1024, max_limit = PRIME_LIMIT, segment = 2**20):
+        """
+        __init__(self, limit = 1024, max_limit = PRIME_LIMIT, segment = 2**20)
+        Input: the number up to which to sieve right away, the number up to which the sieve may grow
+               (at most 2**32) and the number of odd numbers sieved at a time (a multiple of 8).
+        Numbers above max_limit are tested by trial division (compare `prime(n)´), their ranks are unknown (np.nan).
+        """
+        self.max_limit = min(max_limit, 2**32-1)
+        self.segment   = segment
+        #the odd numbers below 16 (1 is not prime)
+        self.sieve     = np.packbits(np.asarray([False, True, True, True, False, True, True, False]), bitorder='little')
+        self.primes    = np.asarray([2, 3, 5, 7, 11, 13], dtype='uint32')
+        self.limit     = 15
+        self.grow(limit)
+        return
+
+    def grow(self, limit):
+        """
+        grow(self, limit)
+        Sieves (at least) all numbers up to limit, respecting self.max_limit.
+        """
+        if (limit <= self.limit) or (self.limit >= self.max_limit):
+            return
+        limit    = int(min(max(limit, 2*self.limit), self.max_limit))
+        end      = (limit//2+8)//8*8 #the number of odd numbers sieved afterwards
+        first    = 8*self.sieve.size
+        bits     = [self.sieve]
+        primes   = [self.primes]
+        root     = math.isqrt(2*end+1)
+        odd      = self.primes[1:np.searchsorted(self.primes, root, side='right')+1].astype('int64')
+        while first < end:
+            #the primes sieving the segment have to be known, i.e. below the first number of the segment
+            low     = 2*first+1
+            count   = min(self.segment, end-first, ((low*low)//2-first)//8*8)
+            segment = np.full(count, True)
+            high    = low+2*count
+            for prime in odd[:np.searchsorted(odd, math.isqrt(high), side='right')]:
+                multiple = max(prime*prime, (low+prime-1)//prime*prime)
+                if multiple % 2 == 0:
+                    multiple += prime
+                segment[(multiple-low)//2::prime] = False
+            found  = (2*(first+np.nonzero(segment)[0])+1).astype('uint32')
+            bits.append(np.packbits(segment, bitorder='little'))
+            primes.append(found)
+            if odd[-1] < root:
+                odd = np.concatenate((odd, found[found <= root].astype('int64')))
+            first += count
+        self.sieve  = np.concatenate(bits)
+        self.primes = np.concatenate(primes)
+        self.limit  = 2*first-1
+        return
+
+    def odd_primes(self, numbers):
+        """
+        odd_primes(self, numbers)
+        Input: an int np array of odd numbers in [1, self.limit]
+        Output: a boolean np array, True where the number is prime (looked up in the bits of the sieve).
+        """
+        k = numbers//2
+        return ((self.sieve[k >> 3] >> (k & 7).astype('uint8')) & 1).astype(bool)
+
+    def is_prime(self, values):
+        """
+        is_prime(self, values)
+        Input: a np array
+        Output: a boolean np array of the same shape, True where the value is a prime number.
+        np.nan, non integer values and numbers below 2 are not prime.
+        """
+        values  = np.asarray(values, dtype='float64')
+        result  = np.full(values.shape, False)
+        with np.errstate(invalid='ignore'):
+            integer = np.isfinite(values) & (values >= 2.) & (values == np.floor(values))
+        if not np.any(integer):
+            return result
+        self.grow(values[integer].max())
+        small = integer & (values <= self.limit)
+        small_values = values[small].astype('int64')
+        result[small] = (small_values == 2) | ((small_values % 2 == 1) & self.odd_primes(small_values))
+        for index in zip(*np.nonzero(integer & (values > self.limit))):
+            result[index] = prime(values[index])
+        return result
+
+    def rank(self, values):
+        """
+        rank(self, values)
+        Input: a np array
+        Output: the number of primes smaller than or equal to each value (float np array of the same shape),
+                i.e. which prime (first, second, third, etc.) a prime number is.
+        """
+        values = np.asarray(values, dtype='float64')
+        result = np.full(values.shape, np.nan)
+        known  = np.isfinite(values)
+        if not np.any(known):
+            return result
+        self.grow(values[known].max())
+        known &= values <= self.limit
+        below  = known & (values < 2.)
+        result[below] = 0.
+        known &= np.logical_not(below)
+        result[known] = np.searchsorted(self.primes, np.floor(values[known]).astype('uint32'), side='right')
+        return result
+
+    def nth(self, ranks):
+        """
+        nth(self, ranks)
+        Input: a np array of ranks (1 for the first prime, 2 for the second, etc.)
+        Output: the corresponding prime numbers (float np array of the same shape), np.nan if there is none.
+        """
+        ranks  = np.asarray(ranks, dtype='float64')
+        result = np.full(ranks.shape, np.nan)
+        known  = np.isfinite(ranks) & (ranks >= 1.) & (ranks == np.floor(ranks))
+        if not np.any(known):
+            return result
+        needed = ranks[known].max()
+        while (self.primes.size < needed) & (self.limit < self.max_limit):
+            #by the prime number theorem the n-th prime is below n*(ln(n)+ln(ln(n))) for n >= 6
+            self.grow(max(2*self.limit, needed*(math.log(needed+2)+math.log(math.log(needed+2)))+10))
+        known &= ranks <= self.primes.size
+        result[known] = self.primes[ranks[known].astype('int64')-1]
+        return result
+
+"""
+The prime index shared by all calls, it keeps everything sieved so far.
+"""
+shared_prime_index = prime_index()
+
 def is_prime(nparray):
     """
-    The vectorized version of prime
-    """
-    vprime = np.vectorize(prime)
-    return vprime(nparray)
+    The vectorized version of prime, the integers from 25 on are looked up in the shared prime index.
+    Like prime, it holds for 2 and 3 and for every finite number which is no multiple of 2 or 3 and
+    below 25 (e.g. 1 and -5) or no integer (e.g. 2.5), np.inf is not prime.
+    """
+    values = np.asarray(nparray, dtype='float64')
+    with np.errstate(invalid='ignore'):
+        result = np.isfinite(values) & ((values == 2.) | (values == 3.) |
+                                        ((np.mod(values, 2.) != 0.) & (np.mod(values, 3.) != 0.)))
+        lookup = result & (values >= 25.) & (values == np.floor(values))
+    if np.any(lookup):
+        result[lookup] = shared_prime_index.is_prime(values[lookup])
+    return result
 
 def prime(n):
     """
     Returns True if n is prime.
     Uses the fact that each prime>3 is of the form 6k+-1
     """
-    if np.isnan(n):
+    if np.isnan(n) or np.isinf(n):
         return False
     if n == 2.:
         return True
@@ -52,83 +206,67 @@ def prime(n):
 
 def vec_prime_pos(primeVec):
     """
-    The vectorized version of prime_pos(primenumber, primenumbers = np.array([]))
+    The vectorized version of prime_pos(primenumber), looks the ranks up in the shared prime index.
     """
-    vprime_pos = np.vectorize(prime_pos)
-    return vprime_pos(primeVec)
+    values = np.asarray(primeVec, dtype='float64')
+    with np.errstate(invalid='ignore'):
+        below = shared_prime_index.rank(np.ceil(values)-1.)
+        return np.where(values <= 0., 1., np.where(values <= 1., 0., 1.+below))
 
 def prime_pos(primenumber, primenumbers = np.array([])):
     """
     Given a primenumber, find out which primenumber (first, second, third, etc.) it is.
+    It counts the numbers in [0, primenumber) which pass prime(n), thus for a prime it is its rank,
+    1 counts as well and a number below 1 gets 1 (none below 0) or 0.
+    primenumbers is not needed anymore (the shared prime index is used), it is kept for compatibility.
     """
-    if primenumber in primenumbers:
-        return np.where(primenumbers == primenumber)
-    elif primenumber >= 11:
-        counter = 0.
-        upbound = math.floor(math.log10(primenumber))
-        for i in np.arange(upbound):
-            operating_range = np.arange(10**(i),10**(i+1))
-            primes          = is_prime(operating_range)
-            counter        += primes.sum()
-            operating_range = operating_range[primes]
-            primenumbers    = np.concatenate((primenumbers,
-                                              operating_range[np.logical_not(np.isin(operating_range,primenumbers))]))
-        operating_range = np.arange(10**(upbound),primenumber)
-        primes          = is_prime(operating_range)
-        counter        += primes.sum()
-        operating_range = operating_range[primes]
-        primenumbers    = np.concatenate((primenumbers,
-                                          operating_range[np.logical_not(np.isin(operating_range,primenumbers))]))
-        return counter
-    else:
-        counter = 0.
-        operating_range = np.arange(primenumber)
-        if operating_range.size >= 2:
-            primes          = is_prime(operating_range)
-            counter        += primes.sum()
-            operating_range = operating_range[primes]
-            primenumbers    = np.concatenate((primenumbers,
-                                              operating_range[np.logical_not(np.isin(operating_range,primenumbers))]))
-        else:
-            primes = prime(operating_range)
-            counter        += primes
-            operating_range = operating_range[primes]
-            if operating_range.size >= 1:
-                primenumbers    = np.concatenate((primenumbers,
-                                                  operating_range[np.logical_not(np.isin(operating_range,primenumbers))]))
-        return counter
-    pass
+    return vec_prime_pos(np.asarray([primenumber]))[0]
 
 """
 The following method finds the position at which the sequence contains squares
 """
 
+def isclose_elementwise(a, b):
+    """
+    Elementwise version of math.isclose (rel_tol = 1e-9), np.nan is never close to anything.
+    """
+    with np.errstate(invalid='ignore'):
+        return np.abs(a-b) <= 1e-9*np.maximum(np.abs(a), np.abs(b))
+
+def square_test(nparray):
+    """
+    square_test(nparray):
+    Input: a np array
+    Output: a boolean np array, True where the element is (close to) a square; Includes 0,
+            and a np array with the square roots of these elements (np.nan elsewhere).
+    The square root is rounded to the next integer and squared again to verify it.
+    """
+    values = np.asarray(nparray, dtype='float64')
+    with np.errstate(invalid='ignore'):
+        roots = np.rint(np.sqrt(np.where(values >= 0., values, np.nan)))
+    result = isclose_elementwise(roots**2, values)
+    return result, np.where(result, roots, np.nan)
+
 def is_square(nparray):
     """
     The vectorized version of square
     """
-    vsquare = np.vectorize(square)
-    return vsquare(nparray)
+    return square_test(nparray)[0]
     
 def square(n):
     """
     Returns True if n is square; Includes 0.
     """
-    if np.isnan(n):
+    if np.isnan(n) or n < 0:
         return False
-    i = 0.
-    while (not math.isclose(i ** 2, n))&(i ** 2 <=n+2):
-        i+=1
-    if math.isclose(i ** 2, n):
-        return True
-    return False
+    return math.isclose(round(math.sqrt(n)) ** 2, n)
 
 def vec_square_pos(squareVec):
     """
     Vectorized Version of square_pos(squarenumber)
     """
-    vsquare_pos = np.vectorize(square_pos)
-    return vsquare_pos(squareVec)
+    with np.errstate(invalid='ignore'):
+        return np.sqrt(np.asarray(squareVec, dtype='float64'))
 
 
 def square_pos(squarenumber):
@@ -141,12 +279,24 @@ def square_pos(squarenumber):
 The following method finds the position at which the sequence contains cubes
 """
 
+def cube_test(nparray):
+    """
+    cube_test(nparray):
+    Input: a np array
+    Output: a boolean np array, True where the element is (close to) a cube; Includes 0 and negative cubes,
+            and a np array with the cube roots of these elements (np.nan elsewhere).
+    The cube root is rounded to the next integer and cubed again to verify it.
+    """
+    values = np.asarray(nparray, dtype='float64')
+    roots  = np.rint(np.cbrt(values))
+    result = isclose_elementwise(roots**3, values)
+    return result, np.where(result, roots, np.nan)
+
 def is_cube(nparray):
     """
     The vectorized version of cube
     """
-    vcube = np.vectorize(cube)
-    return vcube(nparray)
+    return cube_test(nparray)[0]
     
 def cube(n):
     """
@@ -154,21 +304,13 @@ def cube(n):
     """
     if np.isnan(n):
         return False
-    i = 0.
-    while ((not math.isclose(i ** 3, n))&(i ** 3 <=n+2))|((not math.isclose((-i) ** 3, n))&((-i) ** 3 >=n-2)):
-        i+=1
-    if math.isclose(i ** 3, n):
-        return True
-    elif math.isclose((-i) ** 3, n):
-        return True
-    return False
+    return math.isclose(round(np.cbrt(n)) ** 3, n)
 
 def vec_cube_pos(cubeVec):
     """
     Vectorized Version of cube_pos(cube)
     """
-    vcube_pos = np.vectorize(cube_pos)
-    return vcube_pos(cubeVec)
+    return np.cbrt(np.asarray(cubeVec, dtype='float64'))
 
 def cube_pos(cube):
     """
@@ -214,7 +356,7 @@ def fill_ele_test_space(data_object, thesis, start_index, step_size, mode = 'pri
      None
     Fills the series with the corresponding values, according to the result of the corresponding test.
     """
-    series         = data_object.series
+    series         = data_object.writable_series()
     thesis_non_nan = thesis[np.nonzero(np.logical_not(np.isnan(thesis)))]
     if mode == 'prime':
         thesis_non_nan = vec_prime_pos(thesis_non_nan)
@@ -243,7 +385,7 @@ def fill_ele_test_space(data_object, thesis, start_index, step_size, mode = 'pri
     else:
         print('ERROR: This mode doesn\'t exist yet.')
     data_object.enter_values(series)
-    data_object.positive_tests.append((mode, start_index, step_size, sign))
+    data_object.add_test((mode, start_index, step_size, sign))
     pass
 
 """
@@ -305,9 +447,10 @@ def test_square_offline(series):
     Input: A series
     Looks for positions in the series that are square. 
     """
+    result, roots = square_test(series)
     indice = np.arange(series.size)
-    indice = indice[is_square(series)[0]]
-    return indice,is_square(series)[1][np.logical_not(np.isnan(is_square(series)[1]))]
+    indice = indice[result]
+    return indice,roots[np.logical_not(np.isnan(roots))]
 
 
 """
@@ -334,7 +477,8 @@ def test_cube_offline(series):
     Input: A series
     Looks for positions in the series that are cubes. 
     """
+    result, roots = cube_test(series)
     indice = np.arange(series.size)
-    indice = indice[is_cube(series)[0]]
-    return indice,is_cube(series)[1][np.logical_not(np.isnan(is_cube(series)[1]))]
+    indice = indice[result]
+    return indice,roots[np.logical_not(np.isnan(roots))]
 
@@ -0,0 +1,187 @@
+#The necessary imports
+import os
+import sys
+import time
+import json
+import argparse
+import concurrent.futures
+
+import numpy as np
+from searchstructure import *
+from gen_result import *
+from classes import *
+from loader import *
+
+"""
+Runs the accuracy and timing tests of testingground.ipynb on the test sets of Maximilian Kernbach.
+The rows of each test set are split into shards, which are solved in a pool of processes.
+Usage: python -m evaluate Max_testseries/batchseq_sequences --length 7 --masked 0
+"""
+
+"""
+The test sets, named by their file and by their name in the README
+"""
+FAMILIES = [('arithmetic',                 'Arithmetic'),
+            ('geometric',                  'Geometric'),
+            ('arithmetic_geometric',       'Arithmetic Geometric'),
+            ('arithmetic_geometric_two',   'Arithmetic Geometric 2'),
+            ('fibonacci',                  'Fibonacci'),
+            ('arithmetic_alternating',     'Arithmetic Alternating'),
+            ('arithmetic_irrelevant',      'Arithmetic \\& Irrelevant'),
+            ('arithmetic_incremental',     'Arithmetic Incremental')]
+
+MASKED_NAMES = ['Last','One','Two','Three','Four','Five','Six','Seven','Eight','Nine']
+
+def masked_name(number):
+    return MASKED_NAMES[number] if number < len(MASKED_NAMES) else str(number)
+
+def family_path(directory, family):
+    """
+    family_path(directory, family):
+    The path of the test set batchseq_<family>.csv in directory.
+    """
+    return os.path.join(directory, 'batchseq_'+family+'.csv')
+
+def load_family(directory, family, length = None):
+    """
+    load_family(directory, family, length = None):
+    Loads the test set batchseq_<family>.csv from directory (through the .npy cache of loader.load_series).
+    As in testingground.ipynb the first entry of each series is dropped,
+    if length is given the series are cut to their first length entries.
+    """
+    return load_series(family_path(directory, family), length = length)
+
+def cache_family(directory, family):
+    """
+    cache_family(directory, family):
+    The .npy cache of the test set batchseq_<family>.csv in directory (compare `loader.open_cache´), built if needed.
+    The shards read their rows from it, so if it can't be built the OSError or ValueError of loader.build_cache is raised
+    instead of letting every shard parse the csv file.
+    """
+    path   = family_path(directory, family)
+    matrix = open_cache(path)
+    return matrix if matrix is not None else build_cache(path)
+
+def masked_positions(truth, masked, rng):
+    """
+    masked_positions(truth, masked, rng):
+    The positions to predict: the last position for masked = 0,
+    otherwise masked distinct positions drawn at random (compare `perform_test_bfs_2´).
+    """
+    if masked == 0:
+        return np.asarray([truth.size-1])
+    return rng.choice(truth.size, size=(masked,), replace=False)
+
+def score_shard(task):
+    """
+    score_shard(task):
+    Input: a tuple (directory, family, length, masked, first row, last row, seed, tests, cons_tests, elem_tests)
+    Output: (family, masked, right answers, answers, seconds)
+    Solves each row of the shard with bfs and counts the soloutions which are equal to the groundtruth,
+    like the notebook cells do (a soloution counts as often as leaves support it, compare `return_solutions´).
+    Only the rows of the shard are read from the cache of the test set (compare `loader.iter_series´),
+    they are not passed to the process.
+    """
+    directory, family, length, masked, first_row, last_row, seed, tests, cons_tests, elem_tests = task
+    rows          = [(row, truth) for first, chunk in iter_series(family_path(directory, family), last_row-first_row,
+                                                                  length = length, first_row = first_row,
+                                                                  last_row = last_row)
+                     for row, truth in enumerate(chunk, first)]
+    start_time    = time.time()
+    right_answers = 0
+    answers       = 0
+    for row, truth in rows:
+        rng           = np.random.default_rng([seed, masked, row])
+        pos           = masked_positions(truth, masked, rng)
+        p_data        = data(pos, truth, None, None, None)
+        output_p_data = bfs(p_data, tests = tests, cons_tests = cons_tests, elem_tests = elem_tests, verbose = False)
+        if np.any(output_p_data) != 0:
+            soloutions = return_solutions(output_p_data)
+            if np.any(soloutions) != 0:
+                for soloution in soloutions:
+                    right_answers += soloution.multiplicity*all(soloution.series==truth)
+                    answers       += soloution.multiplicity
+            else:
+                answers       += 1
+        else:
+            answers       += 1
+    return family, masked, right_answers, answers, time.time()-start_time
+
+def run(directory, masked = [0], length = None, tests = ['const','sum','fac','fib'], cons_tests = [],
+        elem_tests = [], workers = None, shard_size = 50, seed = 0, verbose = True):
+    """
+    run(directory, masked = [0], length = None, tests, cons_tests, elem_tests, workers = None, shard_size = 50, seed = 0)
+    Input: the directory of the test sets, the numbers of masked positions to test (0 is the last position),
+           the length to cut the series to, the tests used by bfs, the number of processes (default: all cores),
+           the number of rows per shard and the seed for drawing the masked positions.
+    Output: a dict {family: {masked: {'right': ..., 'answers': ..., 'precision': ..., 'seconds': ...}}}
+            and the wall-time of the whole run.
+    Raises the OSError or ValueError of cache_family if a test set can't be cached.
+    """
+    start_time = time.time()
+    tasks      = []
+    for family, name in FAMILIES:
+        test_set = cache_family(directory, family)
+        for number in masked:
+            for first_row in range(0, test_set.shape[0], shard_size):
+                tasks.append((directory, family, length, number, first_row, first_row+shard_size,
+                              seed, tests, cons_tests, elem_tests))
+    results = {family: {number: {'right': 0, 'answers': 0, 'seconds': 0.} for number in masked}
+               for family, name in FAMILIES}
+    with concurrent.futures.ProcessPoolExecutor(max_workers = workers) as executor:
+        for family, number, right_answers, answers, seconds in executor.map(score_shard, tasks):
+            results[family][number]['right']   += right_answers
+            results[family][number]['answers'] += answers
+            results[family][number]['seconds'] += seconds
+    for family, name in FAMILIES:
+        for number in masked:
+            entry = results[family][number]
+            entry['precision'] = entry['right']/entry['answers'] if entry['answers'] != 0 else 0.
+            if verbose:
+                print(name, '|', masked_name(number), 'masked:', entry['right'], '/', entry['answers'],
+                      'in', round(entry['seconds'], 3), 's')
+    return results, time.time()-start_time
+
+def precision_table(results, masked):
+    """
+    precision_table(results, masked):
+    Formats the results of run as a markdown table like the one in the README.
+    """
+    lines = ['|Test Set | '+' | '.join(masked_name(number) for number in masked)+' |',
+             '|:-----|'+':-----:|'*len(masked)]
+    for family, name in FAMILIES:
+        lines.append('|'+name+' | '+' | '.join('%5.1f \\%%' % (100*results[family][number]['precision'])
+                                                for number in masked)+' |')
+    return '\n'.join(lines)
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Runs the accuracy and timing tests on the test sets.')
+    parser.add_argument('directory', help = 'directory containing the batchseq_*.csv test sets')
+    parser.add_argument('--masked', type = int, nargs = '+', default = [0],
+                        help = 'numbers of masked positions, 0 masks the last position (default: 0)')
+    parser.add_argument('--length', type = int, default = None, help = 'cut the series to this length (README: 7)')
+    parser.add_argument('--elem', action = 'store_true', help = 'also perform the elementwise tests')
+    parser.add_argument('--cons', action = 'store_true', help = 'also perform the tests on consecutive elements')
+    parser.add_argument('--workers', type = int, default = None, help = 'number of processes (default: all cores)')
+    parser.add_argument('--shard-size', type = int, default = 50, help = 'rows per shard (default: 50)')
+    parser.add_argument('--seed', type = int, default = 0, help = 'seed for the masked positions (default: 0)')
+    parser.add_argument('--json', default = None, help = 'write the results to this file')
+    args = parser.parse_args(argv)
+    elem_tests = ['prime','cube','square'] if args.elem else []
+    cons_tests = ['const','sum','fac'] if args.cons else []
+    try:
+        results, seconds = run(args.directory, masked = args.masked, length = args.length,
+                               cons_tests = cons_tests, elem_tests = elem_tests,
+                               workers = args.workers, shard_size = args.shard_size, seed = args.seed)
+    except (OSError, ValueError) as error:
+        print(error if str(error).startswith('ERROR') else 'ERROR: '+str(error))
+        return 1
+    print(precision_table(results, args.masked))
+    print('Wall-time:', round(seconds, 3), 's')
+    if args.json is not None:
+        with open(args.json, 'w') as file:
+            json.dump({'results': results, 'seconds': seconds, 'arguments': vars(args)}, file, indent = 1)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
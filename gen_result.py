@@ -4,6 +4,7 @@ import copy
 import numpy as np
 from classes import *
 from ele_tests import *
+from instrumentation import *
 
 """
 A helper for the elementwise backpropagations.
@@ -79,6 +80,48 @@ def backprop_quo(ancestor, child):
     ancestor.series = series
     pass
 
+def backprop_dif_rows(ancestors, children):
+    """
+    backprop_dif_rows(ancestors, children)
+    Input: 
+     ancestors -> np array (N, L), each row is a series
+     children -> np array (N, L-1), the elementwise differences of the rows of ancestors
+    Output:
+     The rows of ancestors, filled at the positions which are now known
+    Row-wise version of backprop_dif, moving forwards and backwards through the columns.
+    """
+    series    = np.array(ancestors, dtype='float64')
+    positions = np.isnan(series) #the positions which contain np.nan
+    single    = positions.sum(axis=1) == 1 #a single position is only filled from one side
+    for index in np.arange(1, series.shape[1]):
+        nan = positions[:,index]
+        series[nan,index] = series[nan,index-1] + children[nan,index-1]
+    for index in np.flip(np.arange(series.shape[1]-1)):
+        nan = positions[:,index] & (np.logical_not(single) | (index == 0))
+        series[nan,index] = series[nan,index+1] - children[nan,index]
+    return series
+
+def backprop_quo_rows(ancestors, children):
+    """
+    backprop_quo_rows(ancestors, children)
+    Input: 
+     ancestors -> np array (N, L), each row is a series
+     children -> np array (N, L-1), the elementwise quotients of the rows of ancestors
+    Output:
+     The rows of ancestors, filled at the positions which are now known
+    Row-wise version of backprop_quo, moving forwards and backwards through the columns.
+    """
+    series    = np.array(ancestors, dtype='float64')
+    positions = np.isnan(series) #the positions which contain np.nan
+    single    = positions.sum(axis=1) == 1 #a single position is only filled from one side
+    for index in np.arange(1, series.shape[1]):
+        nan = positions[:,index]
+        series[nan,index] = series[nan,index-1] * children[nan,index-1]
+    for index in np.flip(np.arange(series.shape[1]-1)):
+        nan = positions[:,index] & (np.logical_not(single) | (index == 0)) & (children[:,index] != 0.)
+        series[nan,index] = series[nan,index+1] / children[nan,index]
+    return series
+
 def backprop_square(ancestor, mode = 'pos'):
     """
     backprop_square(ancestor, mode = 'pos')
@@ -166,14 +209,9 @@ def get_prime(np_array):
     Input:
      np_array -> a numpy array
     Output:
-     The corresponding primenumbers to the positions specified.
+     The corresponding primenumbers to the positions specified (1 -> 2, 2 -> 3, 3 -> 5, ...).
     """
-    if np_array.size >= 2:
-        max_used     = np_array.max # The maximal Prime needed.
-    else:
-        max_used = np_array
-    primenumbers = gen_prime(max_used) # Generate all primes up to the maximum, then all needed primes are given
-    return primenumbers[np_array] # Retrun the positions which are needed.
+    return shared_prime_index.nth(np_array)
 
 def gen_prime(number):
     """
@@ -183,20 +221,222 @@ def gen_prime(number):
     Output:
      A sorted superset of the first n = number primenumbers, containing only primes.
     
-    Using the Prime number theorem assumed by Gauß, check each interval for primenumbers.
-    Append these Primes to the set of already found prime numbers.
+    Taken from the shared prime index, which grows if it doesn't contain enough primes yet.
+    """
+    shared_prime_index.nth(np.asarray([number]))
+    return shared_prime_index.primes.astype('float64')
+
+
+def backprop_ancestor(ancestor, child, gender):
+    """
+    backprop_ancestor(ancestor, child, gender):
+    Input:
+     ancestor -> data type object
+     child -> data type object
+     gender -> the way the child got generated from the ancestor
+    Output:
+     None
+    Fills the positions in ancestor.series which are known from the child.
+    """
+    if 'square' in ancestor.positive_tests:
+        if '+' in ancestor.positive_tests:
+            backprop_square(ancestor, mode = 'pos')
+        else:
+            backprop_square(ancestor, mode = 'neg')
+    elif 'cube' in ancestor.positive_tests:
+        if '+' in ancestor.positive_tests:
+            backprop_cube(ancestor, mode = 'pos')
+        else:
+            backprop_cube(ancestor, mode = 'neg')
+    elif 'prime' in ancestor.positive_tests:
+        if '+' in ancestor.positive_tests:
+            backprop_prime(ancestor, mode = 'pos')
+        else:
+            backprop_prime(ancestor, mode = 'neg')
+    elif gender == 'dif':
+        backprop_dif(ancestor, child)
+    elif gender == 'quo':
+        backprop_quo(ancestor, child)
+    else:
+        print("ERROR: This relation between child and ancestor is not known!")
+        pass
+    pass
+
+"""
+The backprop engine, it completes the ancestors of many solved data objects at once
+"""
+def nan_runs(positions):
     """
-    counter      = 0
-    exponent     = 0.
-    primenumbers = np.asarray([])
-    while counter <= number-1:
-        operating_range = np.arange(10**(exponent),10**(exponent+1)) #[1;10),[10;100),[100;1000),...
-        primes          = is_prime(operating_range)
-        counter        += primes.sum()
-        primenumbers    = np.concatenate((primenumbers, primes))
-        exponent       += 1
-    return primenumbers
+    nan_runs(positions)
+    The [first, last] positions of each run of consecutive positions (sorted list of int).
+    """
+    runs = []
+    for position in positions:
+        if (len(runs) != 0) and (runs[-1][1] == position-1):
+            runs[-1][1] = position
+        else:
+            runs.append([position, position])
+    return runs
 
+def backprop_shared(ancestor, children, gender):
+    """
+    backprop_shared(ancestor, children, gender)
+    Input:
+     ancestor -> np array (L), the series of an ancestor shared by all children
+     children -> np array (N, L-1), the series generated from the ancestor ('dif' or 'quo') as rows
+     gender   -> 'dif' or 'quo'
+    Output:
+     np array (N, L), the ancestor completed by each child, exactly like backprop_dif / backprop_quo would do it.
+    As the np.nans of the ancestor are the same for all rows, each run of them is filled at once:
+    forwards by the cumulative sum (product) of the children anchored on the known entry before the run,
+    then backwards by the cumulative differences (quotients) anchored on the known entry after the run
+    (on the forward value if the run reaches the end). A single np.nan is only filled from one side.
+    The cumulative operations are sequential (ufunc.accumulate), thus the results are the same to the last bit.
+    """
+    series    = np.empty((children.shape[0], ancestor.size))
+    series[:] = ancestor
+    positions = np.flatnonzero(np.isnan(ancestor)).tolist()
+    length    = ancestor.size
+    dif       = gender == 'dif'
+    if len(positions) == 1:
+        position = positions[0]
+        if position >= 1:
+            series[:,position] = (series[:,position-1]+children[:,position-1] if dif
+                                  else series[:,position-1]*children[:,position-1])
+        else:
+            series[:,0] = series[:,1]-children[:,0] if dif else series[:,1]/children[:,0]
+        return series
+    for first, last in nan_runs(positions):
+        start = max(first, 1)
+        if start <= last:
+            block       = series[:,start-1:last+1]
+            block[:,1:] = children[:,start-1:last]
+            (np.add if dif else np.multiply).accumulate(block, axis=1, out=block)
+        end = last if last <= length-2 else last-1
+        if end < first:
+            continue
+        values = children[:,first:end+1]
+        if dif or np.all(values != 0.):
+            block        = series[:,first:end+2]
+            block[:,:-1] = values
+            block        = block[:,::-1]
+            (np.subtract if dif else np.divide).accumulate(block, axis=1, out=block)
+        else:
+            for index in range(end, first-1, -1): #quotients which are 0 leave the forward value
+                known = children[:,index] != 0.
+                series[known,index] = series[known,index+1]/children[known,index]
+    return series
+
+def family_paths(child):
+    """
+    family_paths(child)
+    Input:
+     child -> data type object
+    Output:
+     list of the ways from the root of the family tree to the child, in the order of find_roots_of_family_tree.
+     Each way is a list of (index of the ancestor in the family tree, gender of the next data object) pairs.
+    The family tree is walked iteratively by its arrays, the first way follows the parents (find_root_of_family_tree).
+    """
+    if child.parent == -1:
+        return [[]]
+    tree  = child.tree
+    paths = []
+    stack = [(parent, [(parent, gender)]) for parent, gender in reversed(((child.parent, child.gender),)+child.links)]
+    while len(stack) != 0:
+        index, path = stack.pop()
+        if tree.parents[index] == -1:
+            paths.append(path)
+            continue
+        ways = ((tree.parents[index], GENDERS[tree.genders[index]]),)+tree.links[index]
+        for parent, gender in reversed(ways):
+            stack.append((parent, [(parent, gender)]+path))
+    return paths
+
+def elementwise_ancestor(tree, index):
+    """
+    elementwise_ancestor(tree, index)
+    Checks if backprop_ancestor would complete the node by one of its elementwise branches instead of dif/quo,
+    such a node is completed by backprop_ancestor for each leaf.
+    """
+    tests = tree.rules[index]
+    return ('square' in tests) or ('cube' in tests) or ('prime' in tests)
+
+def backprop_path_rows(tree, path, children):
+    """
+    backprop_path_rows(tree, path, children)
+    Input: a family tree, a way from its root (compare `family_paths´) and the series of the leaves at its end
+           as the rows of a np array.
+    Output: the completed series of the root for each row (the ancestors on the way are completed bottom-up,
+            compare `backprop_shared´), None if an ancestor needs backprop_ancestor.
+    """
+    series = children
+    for index, gender in reversed(path):
+        if elementwise_ancestor(tree, index) or (gender not in ('dif', 'quo')):
+            return None
+        series = backprop_shared(tree.buffer[tree.offsets[index]:tree.offsets[index]+tree.lengths[index]], series, gender)
+    return series
+
+def backprop_path(child, path):
+    """
+    backprop_path(child, path)
+    Completes the ancestors of one child along one way one after the other (compare `backprop_ancestor´).
+    Output: the root, a data type object
+    """
+    for index, gender in reversed(path):
+        ancestor = child.tree.node(index)
+        backprop_ancestor(ancestor, child, gender)
+        child    = ancestor
+    return child
+
+def root_node(tree, path, series):
+    """
+    root_node(tree, path, series)
+    The root of a way (a copy taken from the family tree) with its completed series.
+    """
+    index = path[0][0]
+    return data.from_tree(tree, index, series, tree.rules[index], GENDERS[tree.genders[index]])
+
+"""
+The number of leaves sharing a way from which on they are completed together (fewer are completed one by one,
+which is faster for them).
+"""
+BATCH_MIN_LEAVES = 4
+
+def backprop_leaves(children):
+    """
+    backprop_leaves(children)
+    Input:
+     children -> solved data type objects (e.g. the output of bfs)
+    Output:
+     for each child the list of its roots (compare `find_roots_of_family_tree´), the completed root of each way.
+    The ways of all children are grouped by their family tree and their ancestors,
+    each group is completed at once with its series stacked as the rows of a np array.
+    """
+    if len(children) < BATCH_MIN_LEAVES:
+        return [[child if len(path) == 0 else backprop_path(child, path) for path in family_paths(child)]
+                for child in children]
+    roots  = []
+    groups = {}
+    for number, child in enumerate(children):
+        paths = family_paths(child)
+        roots.append([None]*len(paths))
+        for way, path in enumerate(paths):
+            if len(path) == 0:
+                roots[number][way] = child
+                continue
+            key = (id(child.tree), tuple(path))
+            if key not in groups:
+                groups[key] = (child.tree, path, [])
+            groups[key][2].append((number, way, child))
+    for tree, path, members in groups.values():
+        if len(members) < BATCH_MIN_LEAVES:
+            for number, way, child in members:
+                roots[number][way] = backprop_path(child, path)
+            continue
+        series = backprop_path_rows(tree, path, np.stack([child.series for number, way, child in members]))
+        for row, (number, way, child) in enumerate(members):
+            roots[number][way] = backprop_path(child, path) if series is None else root_node(tree, path, series[row])
+    return roots
 
 def find_root_of_family_tree(child):
     """
@@ -205,50 +445,140 @@ def find_root_of_family_tree(child):
      child -> data type object
     Output:
      root of the family tree -> data type object
-    This method follows the family tree of a given object to its root.
-    The ancestors on the way get completed (np.nans get exchanged for numbers based on the child)
-    """
-    for ancestor in child.ancestors:
-        if ancestor != None:
-            if 'square' in ancestor.positive_tests:
-                if '+' in ancestor.positive_tests:
-                    backprop_square(ancestor, mode = 'pos')
-                else:
-                    backprop_square(ancestor, mode = 'neg')
-            elif 'cube' in ancestor.positive_tests:
-                if '+' in ancestor.positive_tests:
-                    backprop_cube(ancestor, mode = 'pos')
-                else:
-                    backprop_cube(ancestor, mode = 'neg')
-            elif 'prime' in ancestor.positive_tests:
-                if '+' in ancestor.positive_tests:
-                    backprop_prime(ancestor, mode = 'pos')
-                else:
-                    backprop_prime(ancestor, mode = 'neg')
-            elif child.gender == 'dif':
-                backprop_dif(ancestor, child)
-            elif child.gender == 'quo':
-                backprop_quo(ancestor, child)
-            else:
-                print("ERROR: This relation between child and ancestor is not known!")
-                pass
-            child = find_root_of_family_tree(ancestor)
-        else:
-            return child
-    return child
+    This method follows the family tree of a given object to its root, by the indices of the ancestors.
+    The ancestors on the way get completed (np.nans get exchanged for numbers based on the child),
+    they are copies taken from the family tree, thus the stored nodes stay untouched.
+    """
+    if child.parent == -1:
+        return child
+    tree           = child.tree
+    path           = []
+    parent, gender = child.parent, child.gender
+    while parent != -1:
+        path.insert(0, (parent, gender))
+        parent, gender = tree.parents[parent], GENDERS[tree.genders[parent]]
+    series = backprop_path_rows(tree, path, child.series[None,:])
+    return backprop_path(child, path) if series is None else root_node(tree, path, series[0])
+
+def find_roots_of_family_tree(child):
+    """
+    find_roots_of_family_tree(child):
+    Input:
+     child -> data type object
+    Output:
+     list of the roots of the family tree -> data type objects
+    Like find_root_of_family_tree, but follows every ancestor of merged data objects (compare `data.add_links´),
+    thus there is one root for each way the child can be generated.
+    """
+    return backprop_leaves([child])[0]
+
+def rule_tests(data_object):
+    """
+    rule_tests(data_object):
+    The rules found for a data object, i.e. its positive_tests without the leading None.
+    """
+    return tuple(test for test in data_object.positive_tests if test is not None)
+
+def rule_chain(child):
+    """
+    rule_chain(child):
+    Input:
+     child -> data type object
+    Output:
+     the rule chain of the child -> tuple of (gender, rules) pairs
+    Lists, from the root of the family tree to the child, how each data object was generated from its ancestor
+    (None for the root, 'dif' or 'quo') and the rules found for it (compare `rule_tests´).
+    The chain follows the same ancestors as find_root_of_family_tree.
+    """
+    chain = ((child.gender, rule_tests(child)),)
+    while child.parent != -1:
+        child = child.tree.node(child.parent)
+        chain = ((child.gender, rule_tests(child)),)+chain
+    return chain
+
+def rule_chains(child):
+    """
+    rule_chains(child):
+    Input:
+     child -> data type object
+    Output:
+     list of the rule chains of the child (compare `rule_chain´)
+    Like rule_chain, but follows every ancestor of merged data objects,
+    the chains are in the order of the roots returned by find_roots_of_family_tree (compare `family_paths´).
+    The ancestors are read from the arrays of the family tree, not copied out of it.
+    """
+    chains = []
+    for path in family_paths(child):
+        chain  = ()
+        gender = child.gender
+        if len(path) != 0:
+            gender = GENDERS[child.tree.genders[path[0][0]]]
+        for index, next_gender in path:
+            chain  = chain+((gender, tuple(test for test in child.tree.rules[index] if test is not None)),)
+            gender = next_gender
+        chains.append(chain+((gender, rule_tests(child)),))
+    return chains
+
+def solution_keys(roots, decimals = 8):
+    """
+    solution_keys(roots, decimals = 8)
+    Input: a list of data objects and the number of decimals two series have to agree on to be equal.
+    Output: the key of each data object, equal to the one of the transposition table (compare `transposition_table.key´),
+            series of the same length are rounded together.
+    """
+    keys = [None]*len(roots)
+    rows = {}
+    for number, root in enumerate(roots):
+        rows.setdefault(root.series.size, []).append(number)
+    for size, numbers in rows.items():
+        series      = np.array([roots[number].series for number in numbers])
+        nan         = np.isnan(series)
+        values      = series.round(decimals) + 0. # + 0. turns -0. into 0.
+        values[nan] = 0.
+        for row, number in enumerate(numbers):
+            keys[number] = (size, values[row].tobytes(), nan[row].tobytes())
+    return keys
 
-def return_solutions(output_bfs):
+def return_solutions(output_bfs, unique = True, decimals = 8):
     """
-    return_solutions(output_bfs):
+    return_solutions(output_bfs, unique = True, decimals = 8):
     Input:
      output_bfs -> output of bfs or other search
      this is an array which contains data type objects
+     unique     -> collapse equal soloutions (bool)
+     decimals   -> the number of decimals two soloutions have to agree on to be equal
     Output:
-     all possible soloutions found by the search
+     all possible soloutions found by the search, each one once (in the order they are found first),
+     without unique one for each way a merged data object can be generated
+    The ancestors of all soloutions are completed together (compare `backprop_leaves´).
+    Equal soloutions are collapsed by the key of the transposition table (rounded series and np.nan positions),
+    the multiplicity of a soloution is the number of leaves (ways) supporting it
+    and its rule_chains are the rule chains of these leaves (compare `rule_chains´),
+    thus a soloution reached through more rules is more likely.
     """
-    result = np.asarray([])
     if output_bfs.size>=1:
-        for child in output_bfs:
-            result = np.append(result, find_root_of_family_tree(child))
-        return result
+        record  = active_recorder()
+        started = timer() if record is not None else 0.
+        result  = candidate_list(output_bfs.size)
+        roots   = []
+        chains  = []
+        for child, leaves in zip(output_bfs, backprop_leaves(output_bfs)):
+            roots.extend(leaves)
+            chains.extend(rule_chains(child))
+        #without unique (or with a single soloution) the keys only have to be distinct
+        keys    = solution_keys(roots, decimals) if unique and (len(roots) > 1) else range(len(roots))
+        table   = {}
+        for root, chain, key in zip(roots, chains, keys):
+            existing = table.get(key)
+            if existing is not None:
+                existing.multiplicity += 1
+                existing.rule_chains  += (chain,)
+                continue
+            table[key]        = root
+            root.multiplicity = 1
+            root.rule_chains  = (chain,)
+            result.append(root)
+        if record is not None:
+            record.add_backprop(timer()-started, len(result))
+        return result.objects()
     return 0
\ No newline at end of file
@@ -0,0 +1,245 @@
+#The necessary imports
+import numpy as np
+from classes import *
+from searchstructure import *
+from gen_result import *
+from rule_program import *
+
+"""
+Solves a series which arrives one term at a time.
+A solver_session keeps the rule programs (hypotheses) of the soloutions found for the terms seen so far.
+A new term is checked against each hypothesis by deriving it down the layers of the hypothesis (O(depth))
+and checking the rules which apply to the new position, a hypothesis which doesn't determine the new term is dropped.
+Only if no hypothesis survives the search is performed again
+(or if the surviving hypotheses don't determine the next term when it is asked for).
+Usage:
+    session = solver_session([1, 2, 4, 7, 11])
+    session.predict()  # -> 16.
+    session.append(16)
+"""
+
+"""
+The hypotheses
+"""
+def close(a, b):
+    """
+    close(a, b)
+    The tolerance of np.allclose (rtol = 1e-5, atol = 1e-8) for two floats.
+    """
+    return bool(isclose_rows(np.asarray([a], dtype='float64'), np.asarray([b], dtype='float64'))[0])
+
+class hypothesis:
+    """
+    hypothesis(program, length)
+    Input: a rule program and the number of terms of the series seen so far.
+    Keeps the terms of each layer of the program, as the layer below sees them (compare `rule_program´),
+    for the first length terms of the series.
+    """
+    def __init__(self, program, length):
+        self.program = program
+        self.length  = length
+        depth        = program.depth()
+        values       = program.leaf_terms(max(length-depth, 1))
+        layers       = [None]*(depth+1)
+        for layer in reversed(range(depth+1)):
+            layers[layer] = list(values)
+            for rule in reversed(program.layers[layer]['elements']):
+                positions = rule_positions(rule, values.size)
+                values[positions] = element_inverse(rule, values[positions])
+            if layer == 0:
+                break
+            anchor = program.layers[layer]['anchor']
+            if program.layers[layer]['gender'] == 'dif':
+                values = anchor+np.concatenate(([0.], np.cumsum(values)))
+            else:
+                values = anchor*np.concatenate(([1.], np.cumprod(values)))
+        self.layers = [terms[:length-layer] for layer, terms in enumerate(layers)]
+        pass
+
+    def rule_term(self, layer, position):
+        """
+        rule_term(self, layer, position)
+        The term at position (the next one) of a layer, as given by the first rule on subseries applying to it.
+        returns None if no rule applies, np.nan if the rule doesn't determine the term.
+        """
+        terms = self.layers[layer]
+        for rule in self.program.layers[layer]['rules']:
+            mode, j, i = rule[0], rule[1], rule[2]
+            if (mode not in SEQUENCE_RULES) or (position < j) or ((position-j) % i != 0):
+                continue
+            if mode == 'const':
+                return rule[3]
+            if position-i < j:
+                return np.nan
+            if mode == 'sum':
+                return terms[position-i]+rule[3]
+            if mode == 'fac':
+                return terms[position-i]*rule[3]
+            if position-2*i < j:
+                return np.nan
+            return terms[position-i]+terms[position-2*i]
+        return None
+
+    def element_terms(self, layer, position, value):
+        """
+        element_terms(self, layer, position, value)
+        Maps a term of a layer at position the way its elementwise tests do.
+        returns None if the term doesn't pass one of the tests.
+        """
+        for rule in self.program.layers[layer]['elements']:
+            if (position >= rule[1]) and ((position-rule[1]) % rule[2] == 0):
+                result, mapped = element_map(rule, np.asarray([value]))
+                if not result[0]:
+                    return None
+                value = mapped[0]
+        return value
+
+    def inverse_terms(self, layer, position, value):
+        """
+        inverse_terms(self, layer, position, value)
+        The inverse of element_terms.
+        """
+        for rule in reversed(self.program.layers[layer]['elements']):
+            if (position >= rule[1]) and ((position-rule[1]) % rule[2] == 0):
+                value = element_inverse(rule, np.asarray([value]))[0]
+        return value
+
+    def predict(self):
+        """
+        predict(self)
+        Output: the next term of the series, np.nan if the hypothesis doesn't determine it.
+        Starting at the deepest layer, each layer continues the layer below (cumulative sum/product),
+        unless one of its own rules applies to the new position.
+        """
+        depth = self.program.depth()
+        value = np.nan
+        for layer in reversed(range(depth+1)):
+            position = self.length-layer
+            term     = self.rule_term(layer, position)
+            if term is None:
+                if layer == depth:
+                    term = np.nan
+                elif self.program.layers[layer+1]['gender'] == 'dif':
+                    term = self.layers[layer][-1]+value
+                else:
+                    term = self.layers[layer][-1]*value
+            value = self.inverse_terms(layer, position, term)
+        return value
+
+    def append(self, value):
+        """
+        append(self, value)
+        Derives the new term for each layer from the new term of the series and checks the rules applying to it.
+        Output: True if the hypothesis holds (then the terms are kept), False if it is falsified.
+        A hypothesis which doesn't determine the new term (compare `predict´) is falsified as well,
+        otherwise it would hold for every term of the positions none of its rules applies to.
+        """
+        if np.isnan(self.predict()):
+            return False
+        depth = self.program.depth()
+        terms = []
+        for layer in range(depth+1):
+            position = self.length-layer
+            term     = self.element_terms(layer, position, value)
+            if (term is None) or np.isnan(term):
+                return False
+            expected = self.rule_term(layer, position)
+            if (expected is not None) and not close(term, expected):
+                return False
+            terms.append(term)
+            if layer < depth:
+                if self.program.layers[layer+1]['gender'] == 'dif':
+                    value = term-self.layers[layer][-1]
+                elif self.layers[layer][-1] != 0.:
+                    value = term/self.layers[layer][-1]
+                else:
+                    return False
+        for layer, term in enumerate(terms):
+            self.layers[layer].append(term)
+        self.length += 1
+        return True
+
+"""
+The session
+"""
+class solver_session:
+    """
+    solver_session(series = [], tests, cons_tests, elem_tests, mode, database, max_depth = 3)
+    Input: the terms of the series known so far and the configuration of the search (compare `search´).
+    hypotheses are the surviving hypotheses, searches counts the searches performed
+    and searched is the number of terms seen at the last search.
+    """
+    def __init__(self, series = [], tests = ['const','sum','fac','fib'], cons_tests = [], elem_tests = ['prime','cube','square'], mode = 'offline', database = None, max_depth = 3):
+        self.series     = [float(value) for value in series]
+        self.tests      = tests
+        self.cons_tests = cons_tests
+        self.elem_tests = elem_tests
+        self.mode       = mode
+        self.database   = database
+        self.max_depth  = max_depth
+        self.hypotheses = []
+        self.searches   = 0
+        self.searched   = -1
+        if len(self.series) != 0:
+            self.search()
+        pass
+
+    def search(self):
+        """
+        search(self)
+        Searches for the next term of the series seen so far and keeps the rule programs of all soloutions.
+        A single term has no rule (its differences are empty), thus there are no hypotheses before the second term.
+        """
+        self.hypotheses = []
+        length          = len(self.series)
+        self.searched   = length
+        if length < 2:
+            return
+        self.searches  += 1
+        data_object     = data(np.asarray([length]), np.asarray(self.series+[0.]), None, None, None)
+        output          = search(data_object, self.tests, self.cons_tests, self.elem_tests, self.mode, self.database,
+                                 max_depth = self.max_depth, verbose = False)
+        if np.any(output) != 0:
+            for child in output:
+                for program in compile_programs(child, self.tests):
+                    self.hypotheses.append(hypothesis(program, length))
+        pass
+
+    def append(self, value):
+        """
+        append(self, value)
+        Adds the next term of the series, keeps the hypotheses which hold for it and searches again if there are none.
+        Output: True if a hypothesis held, False if the search had to be performed again.
+        """
+        value           = float(value)
+        self.hypotheses = [candidate for candidate in self.hypotheses if candidate.append(value)]
+        self.series.append(value)
+        if len(self.hypotheses) != 0:
+            return True
+        self.search()
+        return False
+
+    def predictions(self):
+        """
+        predictions(self)
+        Output: the next term of the series according to each hypothesis (np array).
+        """
+        return np.asarray([candidate.predict() for candidate in self.hypotheses], dtype='float64')
+
+    def predict(self):
+        """
+        predict(self)
+        Output: the next term of the series according to the first hypothesis which determines it, np.nan if none does.
+        The soloutions of a search only have to determine the masked term, so the hypotheses can hold
+        without determining the next one (e.g. the rule of the other subseries of an alternating series is missing),
+        then the search is performed again for the next term.
+        """
+        for attempt in range(2):
+            for candidate in self.hypotheses:
+                value = candidate.predict()
+                if not np.isnan(value):
+                    return value
+            if (attempt == 1) or (len(self.series) == 0) or (self.searched == len(self.series)):
+                break
+            self.search()
+        return np.nan
@@ -0,0 +1,173 @@
+#The necessary imports
+import json
+import time
+
+"""
+Records where a search spends its time, to decide which tests to disable or reorder for a family of series.
+While a recorder is active (with recorder() as ...) the search stores for each layer:
+    the number of candidates entering it, kept by perf_layer and completely filled,
+    the time spent in each phase of perf_layer ('elem', 'subseries', 'cons'),
+and for each test (const, sum, fac, fib, prime, square, cube, cons_const, ...) the calls, the hits
+(the subseries, blocks or elements filled) and the time, as well as the time spent in gen_next and in return_solutions.
+The search fetches the active recorder once per call, thus without one the overhead is a check for None.
+There is one active recorder per process (the searches of a process pool record in their own process).
+Usage:
+    with recorder() as stats:
+        output    = bfs(data_object, verbose = False)
+        solutions = return_solutions(output)
+    stats.dump('stats.json')
+"""
+
+"""
+The active recorder
+"""
+active = None
+
+def active_recorder():
+    """
+    active_recorder()
+    Returns the active recorder, None if there is none.
+    """
+    return active
+
+def timer():
+    return time.perf_counter()
+
+"""
+The recorder
+"""
+class recorder:
+    """
+    contains:   __init__(self, callback = None)
+                start_layer(self, layer, candidates)
+                enter_phase(self, phase)
+                end_layer(self, candidates, states)
+                add_test(self, name, calls, hits, seconds)
+                add_gen_next(self, seconds, candidates)
+                add_backprop(self, seconds, solutions)
+                to_dict(self)
+                to_json(self)
+                dump(self, path)
+    callback (if given) is called with the record of each layer as soon as the layer is finished.
+    """
+    def __init__(self, callback = None):
+        self.callback = callback
+        self.searches = 0
+        self.layers   = []
+        self.tests    = {}
+        self.gen_next = {'calls': 0, 'candidates': 0, 'time': 0.}
+        self.backprop = {'calls': 0, 'solutions': 0, 'time': 0.}
+        self.current  = None
+        self.phase    = None
+        self.previous = None
+        pass
+
+    def __enter__(self):
+        global active
+        self.previous = active
+        active        = self
+        return self
+
+    def __exit__(self, *exception):
+        global active
+        self.close_layer()
+        active = self.previous
+        return False
+
+    def start_layer(self, layer, candidates):
+        """
+        start_layer(self, layer, candidates)
+        Opens the record of a layer of a search, candidates is the number of candidates entering it.
+        Layer 0 starts a new search.
+        """
+        self.close_layer()
+        if layer == 0:
+            self.searches += 1
+        self.current = {'search': self.searches, 'layer': int(layer), 'candidates': int(candidates), 'kept': 0,
+                        'solved': 0, 'phases': {'elem': 0., 'subseries': 0., 'cons': 0.}}
+        pass
+
+    def enter_phase(self, phase):
+        """
+        enter_phase(self, phase)
+        Starts the timer of a phase of perf_layer, the previous phase ends.
+        If no layer is open (perf_layer called outside of a search), a layer without a number is opened.
+        """
+        now = timer()
+        if self.current is None:
+            self.current = {'search': None, 'layer': None, 'candidates': None, 'kept': None,
+                            'solved': None, 'phases': {'elem': 0., 'subseries': 0., 'cons': 0.}}
+        elif self.phase is not None:
+            self.current['phases'][self.phase[0]] += now-self.phase[1]
+        self.phase = (phase, now)
+        pass
+
+    def end_layer(self, candidates, states):
+        """
+        end_layer(self, candidates, states)
+        Closes the record of the open layer with the candidates and states returned by perf_layer.
+        """
+        if self.current is not None:
+            entered                 = self.current['candidates']
+            self.current['kept']    = int(len(candidates)-entered) if entered is not None else None
+            self.current['solved']  = int((states == 0).sum())
+        self.close_layer()
+        pass
+
+    def close_layer(self):
+        if self.current is None:
+            return
+        if self.phase is not None:
+            self.current['phases'][self.phase[0]] += timer()-self.phase[1]
+        self.layers.append(self.current)
+        if self.callback is not None:
+            self.callback(self.current)
+        self.current = None
+        self.phase   = None
+        pass
+
+    def add_test(self, name, calls, hits, seconds):
+        """
+        add_test(self, name, calls, hits, seconds)
+        Counts calls of a test (e.g. the subseries tested by one call of perform_tests_subseries),
+        how many of them got filled (hits) and the time they took.
+        """
+        test = self.tests.get(name)
+        if test is None:
+            test = self.tests[name] = {'calls': 0, 'hits': 0, 'time': 0.}
+        test['calls'] += int(calls)
+        test['hits']  += int(hits)
+        test['time']  += seconds
+        pass
+
+    def add_gen_next(self, seconds, candidates):
+        self.gen_next['calls']      += 1
+        self.gen_next['candidates'] += int(candidates)
+        self.gen_next['time']       += seconds
+        pass
+
+    def add_backprop(self, seconds, solutions):
+        self.backprop['calls']     += 1
+        self.backprop['solutions'] += int(solutions)
+        self.backprop['time']      += seconds
+        pass
+
+    def to_dict(self):
+        """
+        to_dict(self)
+        Returns the records as a dict of python types (compare `to_json´).
+        """
+        return {'searches': self.searches, 'layers': list(self.layers), 'tests': dict(self.tests),
+                'gen_next': dict(self.gen_next), 'backprop': dict(self.backprop)}
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent = 1)
+
+    def dump(self, path):
+        """
+        dump(self, path)
+        Writes the records as JSON to the file at path.
+        """
+        with open(path, 'w') as file:
+            file.write(self.to_json())
+        pass
@@ -0,0 +1,171 @@
+#The necessary imports
+import os
+import json
+import itertools
+import numpy as np
+
+"""
+Loads the test sets (e.g. Max_testseries/batchseq_*.csv) without parsing them again and again.
+On the first read a csv file is parsed in chunks of rows into a memory-mapped .npy file next to it,
+as long as the mtime and the size of the csv file are unchanged the .npy file is used instead.
+"""
+
+"""
+The Helpers of the cache
+"""
+def cache_paths(path):
+    """
+    cache_paths(path)
+    The .npy file caching the csv file at path and the .json file describing the csv file it was made from.
+    """
+    return path+'.npy', path+'.npy.json'
+
+def source_stamp(path):
+    """
+    source_stamp(path)
+    The mtime (in ns) and the size of the file at path, the cache is valid as long as they are unchanged.
+    """
+    status = os.stat(path)
+    return {'mtime_ns': status.st_mtime_ns, 'size': status.st_size}
+
+def cache_is_valid(path):
+    """
+    cache_is_valid(path)
+    Checks if the .npy file of the csv file at path exists and was made from the current version of it.
+    """
+    cache, stamp = cache_paths(path)
+    if not (os.path.exists(cache) and os.path.exists(stamp)):
+        return False
+    try:
+        with open(stamp) as file:
+            return json.load(file) == source_stamp(path)
+    except (OSError, ValueError):
+        return False
+
+def count_rows(path, delimiter = ','):
+    """
+    count_rows(path, delimiter = ',')
+    Output: the number of (non empty) rows and the number of columns of the csv file at path.
+    """
+    rows    = 0
+    columns = 0
+    with open(path) as file:
+        for line in file:
+            if line.strip():
+                if rows == 0:
+                    columns = line.count(delimiter)+1
+                rows += 1
+    return rows, columns
+
+def parse_chunks(path, chunk_rows = 4096, delimiter = ',', first_row = 0, last_row = None):
+    """
+    parse_chunks(path, chunk_rows = 4096, delimiter = ',', first_row = 0, last_row = None)
+    Parses the rows first_row to last_row (exclusive, None: to the end) of the csv file at path
+    chunk_rows rows at a time (like np.genfromtxt, missing values become np.nan), the rows before are skipped unparsed.
+    Yields the chunks as np arrays (rows, columns) of dtype float.
+    Raises a ValueError naming the file if its rows don't have the same number of columns.
+    """
+    columns = None
+    with open(path) as file:
+        lines = itertools.islice((line for line in file if line.strip()), first_row, last_row)
+        while True:
+            chunk = list(itertools.islice(lines, chunk_rows))
+            if len(chunk) == 0:
+                return
+            try:
+                matrix = np.genfromtxt(chunk, delimiter = delimiter, dtype = 'float', ndmin = 2)
+            except ValueError as error:
+                raise ValueError('ERROR: the csv file %s is malformed in the rows from %d on: %s'
+                                 % (path, first_row, str(error).strip())) from None
+            if columns is None:
+                columns = matrix.shape[1]
+            elif matrix.shape[1] != columns:
+                raise ValueError('ERROR: the csv file %s has %d columns in the rows from %d on, %d before'
+                                 % (path, matrix.shape[1], first_row, columns))
+            first_row += len(chunk)
+            yield matrix
+
+def build_cache(path, chunk_rows = 4096, delimiter = ','):
+    """
+    build_cache(path, chunk_rows = 4096, delimiter = ',')
+    Parses the csv file at path in chunks into the .npy file next to it and stamps it with the mtime and size of the csv file.
+    The .npy file is written under a temporary name first, so an interrupted build leaves no broken cache behind.
+    Output: the .npy file, opened read-only as a memory map.
+    """
+    cache, stamp  = cache_paths(path)
+    before        = source_stamp(path)
+    rows, columns = count_rows(path, delimiter)
+    temporary     = cache+'.%d.tmp' % os.getpid()
+    try:
+        matrix = np.lib.format.open_memmap(temporary, mode = 'w+', dtype = 'float', shape = (rows, columns))
+        row    = 0
+        for chunk in parse_chunks(path, chunk_rows, delimiter):
+            matrix[row:row+chunk.shape[0]] = chunk
+            row += chunk.shape[0]
+        matrix.flush()
+        del matrix
+        os.replace(temporary, cache)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+    with open(stamp, 'w') as file:
+        json.dump(before, file)
+    return np.load(cache, mmap_mode = 'r')
+
+"""
+Loading the test sets
+"""
+def open_cache(path, chunk_rows = 4096, delimiter = ','):
+    """
+    open_cache(path, chunk_rows = 4096, delimiter = ',')
+    The .npy file of the csv file at path, opened read-only as a memory map (built first if it isn't valid).
+    returns None if the cache can't be written, e.g. in a read-only directory,
+    or if the csv file can't be parsed into it (then the csv file is parsed without the cache, compare `parse_chunks´).
+    """
+    try:
+        if cache_is_valid(path):
+            return np.load(cache_paths(path)[0], mmap_mode = 'r')
+        return build_cache(path, chunk_rows, delimiter)
+    except (OSError, ValueError):
+        return None
+
+def load_series(path, length = None, first_column = 1, chunk_rows = 4096, delimiter = ',', cache = True):
+    """
+    load_series(path, length = None, first_column = 1, chunk_rows = 4096, delimiter = ',', cache = True)
+    Input: the path of a csv file with one series per row, the length to cut the series to,
+           the first column belonging to the series (the test sets start with an index column),
+           the number of rows parsed at a time, the delimiter and wether or not to use the .npy cache.
+    Output: the series as the rows of a read-only np array (rows, columns).
+    With the cache this is a view of the memory-mapped .npy file, so cutting the series costs no copy,
+    just as series[:, :7] doesn't. Without the cache the csv file is parsed into memory.
+    """
+    matrix = open_cache(path, chunk_rows, delimiter) if cache else None
+    if matrix is None:
+        chunks = list(parse_chunks(path, chunk_rows, delimiter))
+        matrix = np.concatenate(chunks) if len(chunks) != 0 else np.empty((0,0))
+        matrix.setflags(write = False)
+    stop = None if length is None else first_column+length
+    return matrix[:, first_column:stop]
+
+def iter_series(path, chunk_rows = 1024, length = None, first_column = 1, delimiter = ',', cache = True,
+                first_row = 0, last_row = None):
+    """
+    iter_series(path, chunk_rows = 1024, length = None, first_column = 1, delimiter = ',', cache = True,
+                first_row = 0, last_row = None)
+    Streams the series in the rows first_row to last_row (exclusive, None: to the end)
+    of the csv file at path (compare load_series) to the solver.
+    Yields the number of the first row and the next chunk_rows series as a read-only np array.
+    Without the cache the csv file is parsed chunk by chunk, so only one chunk is kept in memory
+    and only the rows asked for are parsed.
+    """
+    stop   = None if length is None else first_column+length
+    matrix = open_cache(path, chunk_rows, delimiter) if cache else None
+    if matrix is not None:
+        end = matrix.shape[0] if last_row is None else min(last_row, matrix.shape[0])
+        for row in range(first_row, end, chunk_rows):
+            yield row, matrix[row:min(row+chunk_rows, end), first_column:stop]
+        return
+    for chunk in parse_chunks(path, chunk_rows, delimiter, first_row, last_row):
+        chunk.setflags(write = False)
+        yield first_row, chunk[:, first_column:stop]
+        first_row += chunk.shape[0]
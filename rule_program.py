@@ -0,0 +1,292 @@
+#The necessary imports
+import numpy as np
+from classes import *
+from ele_tests import *
+from seq_tests import *
+from gen_result import *
+from searchstructure import *
+
+"""
+Compiles the family tree of a soloution into a rule program, which continues the series without searching again.
+A rule program has one layer for each data object from the root (layer 0) to the solved data object:
+    the rules found for the deepest layer (and the ones holding on its other positions) generate its terms,
+    each layer above is the cumulative sum (dif) or product (quo) of the layer below, started at its first term,
+    the elementwise tests (prime, square, cube) map the terms of their positions back (rank -> prime, root -> power).
+The tests on consecutive elements ('cons_const', 'cons_sum', 'cons_fac') are not replayed,
+the terms they filled are continued like the ones no rule applies to.
+Usage:
+    output   = bfs(data_object)
+    programs = compile_programs(output[0])
+    programs[0].extend(100)
+"""
+
+"""
+The Helpers of the rule programs
+"""
+SEQUENCE_RULES = ['const','sum','fac','fib']
+ELEMENT_RULES  = ['prime','square','cube']
+
+def rule_positions(rule, length):
+    """
+    rule_positions(rule, length)
+    The positions (below length) a rule (start_index, step_size) of a subseries applies to.
+    """
+    return np.arange(rule[1], length, rule[2])
+
+def element_inverse(rule, values):
+    """
+    element_inverse(rule, values)
+    Maps the values an elementwise test has written (ranks of primes, roots) back to the values they replace.
+    """
+    mode, sign = rule[0], (1. if rule[3] == '+' else -1.)
+    if mode == 'prime':
+        return sign*shared_prime_index.nth(sign*values)
+    elif mode == 'square':
+        return sign*(sign*values)**2
+    return sign*(sign*values)**3
+
+def element_map(rule, values):
+    """
+    element_map(rule, values)
+    The map of an elementwise test (prime -> rank of the prime, square -> root, cube -> root) on values,
+    returns a boolean np array marking the values which pass the test and the mapped values (np.nan elsewhere).
+    """
+    mode, sign = rule[0], (1. if rule[3] == '+' else -1.)
+    values     = sign*np.asarray(values, dtype='float64')
+    if mode == 'prime':
+        result = is_prime(values)
+        return result, np.where(result, sign*vec_prime_pos(values), np.nan)
+    elif mode == 'square':
+        result, roots = square_test(values)
+    else:
+        result, roots = cube_test(values)
+    return result, sign*roots
+
+def fibonacci_numbers(number):
+    """
+    fibonacci_numbers(number)
+    The first number Fibonacci numbers (0, 1, 1, 2, ...) as floats, by the formula of Binet.
+    A fib rule continues its subseries from the last two known terms a, b as F(s)*a + F(s+1)*b after s steps.
+    """
+    root  = np.sqrt(5.)
+    steps = np.arange(number)
+    with np.errstate(over='ignore'):
+        return np.rint((((1.+root)/2.)**steps-((1.-root)/2.)**steps)/root)
+
+"""
+The rule programs
+"""
+class rule_program:
+    """
+    rule_program(layers, terms)
+    Input: the layers from the root to the solved data object, as dicts with the keys
+            'gender'   -> the way the layer got generated from the one above (None for the root),
+            'anchor'   -> the first term of the layer above, as the layer below sees it (None for the root),
+            'elements' -> the positive elementwise tests of the layer,
+            'rules'    -> the positive tests on subseries of the layer,
+           and the terms of the deepest layer known so far.
+    """
+    def __init__(self, layers, terms):
+        self.layers = layers
+        self.terms  = np.array(terms, dtype='float64')
+        pass
+
+    def depth(self):
+        return len(self.layers)-1
+
+    def rule_terms(self, layer, terms, known):
+        """
+        rule_terms(self, layer, terms, known)
+        Input: a layer, its terms (np array, changed in place) and the number of its terms which are known.
+        Output: the terms, where the ones after the known ones are generated by the first rule applying to their position,
+                and a boolean np array marking these positions.
+        Each rule continues its subseries in one vectorized step from the last known term(s) of the subseries:
+        'const', 'sum' and 'fac' directly, 'fib' by the Fibonacci numbers (compare `fibonacci_numbers´).
+        A rule without enough known terms of its subseries gives np.nan.
+        """
+        rules   = [rule for rule in self.layers[layer]['rules'] if rule[0] in SEQUENCE_RULES]
+        rule_of = np.full(terms.size, -1)
+        for number_rule, rule in reversed(list(enumerate(rules))):
+            rule_of[rule_positions(rule, terms.size)] = number_rule
+        rule_of[:known] = -1
+        for number_rule, rule in enumerate(rules):
+            mode, j, i = rule[0], rule[1], rule[2]
+            positions  = np.nonzero(rule_of == number_rule)[0]
+            if positions.size == 0:
+                continue
+            last  = j+i*((known-1-j)//i)
+            steps = (positions-last)//i
+            if mode == 'const':
+                terms[positions] = rule[3]
+            elif (last < j) or ((mode == 'fib') and (last-i < j)):
+                terms[positions] = np.nan #not enough terms of the subseries are known
+            elif mode == 'sum':
+                terms[positions] = terms[last]+steps*rule[3]
+            elif mode == 'fac':
+                terms[positions] = terms[last]*rule[3]**steps
+            else:
+                fibonacci        = fibonacci_numbers(steps[-1]+2)
+                terms[positions] = fibonacci[steps]*terms[last-i]+fibonacci[steps+1]*terms[last]
+        return terms, rule_of >= 0
+
+    def leaf_terms(self, number):
+        """
+        leaf_terms(self, number)
+        Output: the first number terms of the deepest layer (as its rules see them), np.nan where no rule applies
+                (compare `rule_terms´).
+        """
+        known         = self.terms.size
+        terms         = np.full(max(number, known), np.nan)
+        terms[:known] = self.terms
+        return self.rule_terms(self.depth(), terms, known)[0][:number]
+
+    def ancestor_terms(self, layer, values, below):
+        """
+        ancestor_terms(self, layer, values, below)
+        Input: the layer, its terms as the cumulative sum/product of the layer below and the terms of the layer below.
+        Output: the terms of the layer, where the terms after the known ones follow the rules of the layer if one applies
+                (as in the search, the rules of a layer come before the layers below), else the layer below.
+        The terms between two terms given by rules are the cumulative sum/product of the layer below,
+        started at the term before them; all runs of such terms are summed/multiplied at once as the rows of a matrix.
+        """
+        known = self.terms.size+self.depth()-layer
+        if (values.size <= known) or not any(rule[0] in SEQUENCE_RULES for rule in self.layers[layer]['rules']):
+            return values
+        values, by_rule = self.rule_terms(layer, values, known)
+        by_rule[:known] = True
+        runs            = np.flatnonzero(np.logical_not(by_rule[1:]) & by_rule[:-1])+1
+        if runs.size == 0:
+            return values
+        ends            = np.append(np.flatnonzero(by_rule[runs[0]:])+runs[0], values.size)
+        lengths         = ends[np.searchsorted(ends, runs)]-runs
+        columns         = np.arange(lengths.max())
+        inside          = columns < lengths[:,None]
+        positions       = np.where(inside, runs[:,None]+columns, 0)
+        if self.layers[layer+1]['gender'] == 'dif':
+            steps = np.cumsum(np.where(inside, below[positions-1], 0.), axis=1)
+            terms = values[runs-1][:,None]+steps
+        else:
+            steps = np.cumprod(np.where(inside, below[positions-1], 1.), axis=1)
+            terms = values[runs-1][:,None]*steps
+        values[positions[inside]] = terms[inside]
+        return values
+
+    def extend(self, number):
+        """
+        extend(self, number)
+        Output: the first number terms of the series (np array), np.nan for the terms the rules don't determine.
+        The terms of the deepest layer come from leaf_terms, each layer above continues them unless one of its own
+        rules applies (compare `ancestor_terms´).
+        """
+        depth  = self.depth()
+        values = self.leaf_terms(max(number-depth, 1))
+        for layer in reversed(range(depth+1)):
+            for rule in reversed(self.layers[layer]['elements']):
+                positions = rule_positions(rule, values.size)
+                values[positions] = element_inverse(rule, values[positions])
+            if layer == 0:
+                break
+            below  = values
+            anchor = self.layers[layer]['anchor']
+            if self.layers[layer]['gender'] == 'dif':
+                values = anchor+np.concatenate(([0.], np.cumsum(below)))
+            else:
+                values = anchor*np.concatenate(([1.], np.cumprod(below)))
+            values = self.ancestor_terms(layer-1, values, below)
+        return values[:number]
+
+    def __str__(self):
+        lines = []
+        for layer in reversed(range(len(self.layers))):
+            parts = []
+            for rule in self.layers[layer]['elements']:
+                parts.append('%s rank, start %d, step %d, sign %s' % (rule[0] if rule[0] == 'prime' else rule[0]+' root',
+                                                                      rule[1], rule[2], rule[3]))
+            for rule in self.layers[layer]['rules']:
+                if rule[0] in SEQUENCE_RULES:
+                    parts.append('%s, start %d, step %d%s' % (rule[0], rule[1], rule[2],
+                                                              '' if rule[0] == 'fib' else ', '+str(rule[3])))
+            if layer != 0:
+                parts.append('%s of layer %d from %s' % (self.layers[layer]['gender'], layer-1,
+                                                         str(self.layers[layer]['anchor'])))
+            lines.append('layer-%d: %s' % (layer, '; '.join(parts)))
+        return '\n'.join(lines)
+
+"""
+The compiler
+"""
+def covering_rules(series, rules, tests = SEQUENCE_RULES):
+    """
+    covering_rules(series, rules, tests = SEQUENCE_RULES)
+    Input: the complete series of a layer, the rules found for it by the search and the tests on subseries.
+    Output: the rules holding on the series for the positions none of the given rules applies to (a tuple).
+    The search only needs rules for the subseries with masked positions, e.g. an alternating series gets
+    no rule for its other subseries, which then couldn't be continued. The rules are looked for like the search does:
+    test by test, the pairs (start_index, step_size) in the order of `subseries_matrix_plan´,
+    on the series followed by the terms to continue (np.nan), as the tests only hold for subseries with masked terms.
+    """
+    covered = np.full(series.size, False)
+    for rule in rules:
+        if rule[0] in SEQUENCE_RULES:
+            covered[rule_positions(rule, series.size)] = True
+    found         = []
+    starts, steps = subseries_matrix_plan(series.size)[:2]
+    if starts.size == 0:
+        return ()
+    #the pairs of a longer series start with the ones of the series
+    padded        = np.append(series, np.full(steps[-1], np.nan))
+    for test in tests:
+        if covered.all():
+            break
+        results, values = perform_tests_subseries(padded, mode = test)
+        for pair in np.flatnonzero(results[:starts.size]):
+            rule      = (test, int(starts[pair]), int(steps[pair]))
+            positions = rule_positions(rule, series.size)
+            if covered[positions].all():
+                continue
+            if test == 'fib':
+                value = perform_tests(extract_thesis(padded, rule[1], rule[2]), mode = test)[1]
+            else:
+                value = float(values[pair])
+            found.append(rule+(value,))
+            covered[positions] = True
+    return tuple(found)
+
+def compile_path(child, path, tests = SEQUENCE_RULES):
+    """
+    compile_path(child, path, tests = SEQUENCE_RULES)
+    Input:
+     child -> solved data type object
+     path  -> a way from the root to the child (compare `family_paths´)
+     tests -> the tests on subseries of the search
+    Output:
+     the rule program of this way
+    The ancestors get completed on the way up like in find_root_of_family_tree, their first terms are the anchors.
+    The rules of the deepest layer are completed by the ones holding on its other positions (compare `covering_rules´).
+    """
+    layers = []
+    node   = child
+    for index, gender in reversed(path):
+        ancestor = child.tree.node(index)
+        backprop_ancestor(ancestor, node, gender)
+        layers.append({'gender': gender, 'anchor': float(ancestor.series[0])})
+        node = ancestor
+    layers.append({'gender': None, 'anchor': None})
+    layers.reverse()
+    nodes = [child.tree.node(index) for index, gender in path]+[child]
+    for layer, node in zip(layers, nodes):
+        layer['elements'] = tuple(test for test in rule_tests(node) if test[0] in ELEMENT_RULES)
+        layer['rules']    = tuple(test for test in rule_tests(node) if test[0] not in ELEMENT_RULES)
+    layers[-1]['rules'] += covering_rules(child.series, layers[-1]['rules'], tests)
+    return rule_program(layers, child.series)
+
+def compile_programs(child, tests = SEQUENCE_RULES):
+    """
+    compile_programs(child, tests = SEQUENCE_RULES)
+    Input:
+     child -> solved data type object (e.g. an element of the output of bfs)
+     tests -> the tests on subseries of the search
+    Output:
+     list of the rule programs of the child, one for each root of find_roots_of_family_tree (in the same order)
+    """
+    return [compile_path(child, path, tests) for path in family_paths(child)]
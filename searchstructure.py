@@ -3,16 +3,34 @@ import os
 import sys
 import copy
 import math
+import functools
 import numpy as np
 from classes import *
 from seq_tests import *
 from con_tests import *
 from ele_tests import *
+from gen_result import *
+from instrumentation import *
 
 """
 The Helpers needed for the algorithm
 They consist of functions that extract subseries, positions of series which are numbers etc.
 """
+@functools.lru_cache(maxsize = 4096)
+def subseries_plan(length, start_index = 0, stepsize = 1):
+    """
+    subseries_plan(length, start_index = 0, stepsize = 1)
+    The indices used by extract_subseries for a series of the given length, computed once per arguments.
+    Output: the (read-only) indices of the subseries and of the remaining series.
+    The plans are kept in a bounded cache (least recently used ones get evicted).
+    """
+    samples       = np.arange(start_index, length, stepsize).astype('int')
+    all_positions = np.arange(length).astype('int')
+    not_samples   = np.setdiff1d(all_positions, samples)
+    samples.setflags(write = False)
+    not_samples.setflags(write = False)
+    return samples, not_samples
+
 def extract_subseries(series, start_index = 0, stepsize = 1):
     """
     extract_subseries(series, start_index = 0, stepsize = 1)
@@ -20,11 +38,113 @@ def extract_subseries(series, start_index = 0, stepsize = 1):
     Outputs is a subseries and the remaining series.
     E.g. every second element of a given series and the remaining series.
     """
-    samples       = np.arange(start_index, series.size, stepsize).astype('int')
-    all_positions = np.arange(series.size).astype('int')
-    not_samples   = np.setdiff1d(all_positions, samples)
+    samples, not_samples = subseries_plan(series.size, start_index, stepsize)
     return series[samples],series[not_samples]
 
+def extract_thesis(series, start_index = 0, stepsize = 1):
+    """
+    extract_thesis(series, start_index = 0, stepsize = 1)
+    Like extract_subseries, but only returns the subseries.
+    """
+    return series[subseries_plan(series.size, start_index, stepsize)[0]]
+
+@functools.lru_cache(maxsize = 256)
+def subseries_matrix_plan(length):
+    """
+    subseries_matrix_plan(length)
+    The (start_index, stepsize) pairs perf_layer tests on a series of the given length, in the order of perf_layer,
+    and the indices of their subseries as the rows of a matrix. Indices past the end of a subseries are set to length.
+    Output: the (read-only) start indices, step sizes, index matrix and lengths of the subseries.
+    """
+    upper_bound = int((2*length-1)/4.)+1
+    starts      = np.asarray([j for i in range(1,upper_bound) for j in range(i)]).astype('int')
+    steps       = np.asarray([i for i in range(1,upper_bound) for j in range(i)]).astype('int')
+    indices     = starts[:,None]+steps[:,None]*np.arange(length)
+    indices     = np.where(indices < length, indices, length)
+    lengths     = (length-starts+steps-1)//steps
+    for array in (starts, steps, indices, lengths):
+        array.setflags(write = False)
+    return starts, steps, indices, lengths
+
+def subseries_matrix(series, first = 0):
+    """
+    subseries_matrix(series, first = 0)
+    The subseries of all pairs of subseries_matrix_plan, starting with the pair number first,
+    as the rows of a matrix padded with np.nan.
+    Output: the matrix and the lengths of its rows.
+    """
+    starts, steps, indices, lengths = subseries_matrix_plan(series.size)
+    return np.append(series, np.nan)[indices[first:]], lengths[first:]
+
+def perform_tests_subseries(series, first = 0, mode = 'const'):
+    """
+    perform_tests_subseries(series, first = 0, mode = 'const')
+    Performs the test on the subseries of all pairs of subseries_matrix_plan (starting with the pair number first)
+    in one pass, compare `perform_tests_rows´.
+    Output: a boolean array of the results and an array of the values checked against.
+    """
+    matrix, lengths = subseries_matrix(series, first)
+    return perform_tests_rows(matrix, lengths, mode = mode)
+
+@functools.lru_cache(maxsize = 4096)
+def cons_elem_plan(length, start_index = 0, cons_elem_len = 1, stepsize = 1):
+    """
+    cons_elem_plan(length, start_index = 0, cons_elem_len = 1, stepsize = 1)
+    The (read-only) indices returned by extract_subseries_cons_elem for a series of the given length,
+    computed once per arguments and kept in a bounded cache (least recently used ones get evicted).
+    """
+    samples_start = np.arange(start_index, length, stepsize).astype('int')
+    samples       = np.asarray([np.arange(pos,pos+cons_elem_len).astype('int')
+                                for pos in samples_start if pos+cons_elem_len<=length]
+                               ,dtype=object).astype('int').reshape(-1, cons_elem_len)
+    remaining     = np.asarray([np.arange(pos+cons_elem_len-1,pos+stepsize+1).astype('int')
+                                for pos in samples_start 
+                                if (pos + cons_elem_len <= length-1) & (pos + stepsize <= length-1)]
+                               ,dtype=object).astype('int')
+    samples.setflags(write = False)
+    remaining.setflags(write = False)
+    return samples, remaining
+
+@functools.lru_cache(maxsize = 256)
+def cons_elem_matrix_plan(length):
+    """
+    cons_elem_matrix_plan(length)
+    The (start_index, cons_elem_len, stepsize) triples perf_layer tests on a series of the given length, in the order
+    of perf_layer, and the blocks of all of them (compare cons_elem_plan) as the rows of one index matrix.
+    Indices after the end of a block are set to length, the matrix has one column more than the longest block.
+    Output: the (read-only) start indices, block lengths and step sizes of the triples,
+            the offsets of the blocks of each triple (triple t has the rows offsets[t]:offsets[t+1]),
+            the index matrix and for each row its block length and its triple.
+    """
+    upper_bound   = int((2*length-1)/4.)+1
+    triples       = [(j,k,i) for i in range(1,upper_bound) for k in range(1,upper_bound) for j in range(i)]
+    starts        = np.asarray([j for j, k, i in triples]).astype('int')
+    cons_lengths  = np.asarray([k for j, k, i in triples]).astype('int')
+    steps         = np.asarray([i for j, k, i in triples]).astype('int')
+    #the blocks of a triple start at j, j+i, ... as long as they end inside the series (compare cons_elem_plan)
+    sizes         = np.maximum((length-cons_lengths-starts)//np.maximum(steps, 1)+1, 0).astype('int')
+    offsets       = np.concatenate(([0], np.cumsum(sizes))).astype('int')
+    block_triples = np.repeat(np.arange(len(triples)), sizes)
+    block_lengths = np.repeat(cons_lengths, sizes)
+    block_starts  = starts[block_triples]+steps[block_triples]*(np.arange(offsets[-1])-offsets[:-1][block_triples])
+    columns       = np.arange(upper_bound)
+    indices       = np.where(columns < block_lengths[:,None], block_starts[:,None]+columns, length)
+    for array in (starts, cons_lengths, steps, offsets, indices, block_lengths, block_triples):
+        array.setflags(write = False)
+    return starts, cons_lengths, steps, offsets, indices, block_lengths, block_triples
+
+def perform_cons_tests_blocks(series, first = 0, mode = 'const'):
+    """
+    perform_cons_tests_blocks(series, first = 0, mode = 'const')
+    Performs the test on the blocks of all triples of cons_elem_matrix_plan (starting with the triple number first)
+    in one pass, compare `cons_elem_blocks_test´.
+    Output: a boolean array of the results of the triples and an array of the values of their blocks.
+    """
+    starts, cons_lengths, steps, offsets, indices, block_lengths, block_triples = cons_elem_matrix_plan(series.size)
+    matrix = np.append(series, np.nan)[indices[offsets[first]:]]
+    return cons_elem_blocks_test(matrix, block_lengths[offsets[first]:], block_triples[offsets[first]:]-first,
+                                 starts.size-first, mode = mode)
+
 def extract_subseries_cons_elem(series, start_index = 0, cons_elem_len = 1, stepsize = 1):
     """
     extract_subseries_cons_elem(series, start_index = 0, cons_elem_len = 1, stepsize = 1)    +1   *2   +1   *2
@@ -35,16 +155,9 @@ def extract_subseries_cons_elem(series, start_index = 0, cons_elem_len = 1, step
     Observe, that the elements in set of indices all have the same length.
     Same thing for the elements in remining indices. This means, that the end of the series is disregarded
     if it can't be subsampled adequatly.
+    The indices are taken from cons_elem_plan, they are read-only.
     """
-    samples_start = np.arange(start_index, series.size, stepsize).astype('int')
-    samples       = np.asarray([np.arange(pos,pos+cons_elem_len).astype('int')
-                                for pos in samples_start if pos+cons_elem_len<=series.size]
-                               ,dtype=object).astype('int')
-    remaining     = np.asarray([np.arange(pos+cons_elem_len-1,pos+stepsize+1).astype('int')
-                                for pos in samples_start 
-                                if (pos + cons_elem_len <= series.size-1) & (pos + stepsize <= series.size-1)]
-                               ,dtype=object).astype('int')
-    return samples, remaining
+    return cons_elem_plan(series.size, start_index, cons_elem_len, stepsize)
 
 """
 In the following the structure of the searchspace is defined.
@@ -58,21 +171,24 @@ def gen_next(candidates):
     """
     gen_next(candidates):
     Generates the next layer (localy) belonging to each candidate.
-    returns all of these seies.
+    returns all of these seies, children with the same series are merged into one with several ancestors.
     """
-    next_candidates = np.asarray([], dtype = 'object')
+    record          = active_recorder()
+    started         = timer() if record is not None else 0.
+    next_candidates = candidate_list(2*len(candidates)) #each candidate has at most two children
+    table           = transposition_table()
     for candidate in candidates:
-        series_dif, series_quo      = gen_next_layer(candidate.series)
-        candidate_series_dif        = data(candidate.pos, candidate.series, None, candidate, 'dif')
-        candidate_series_dif.series = series_dif
-        candidate_series_dif.pos    = np.arange(candidate_series_dif.series.size)[np.isnan(series_dif)]
-        next_candidates             = np.append(next_candidates, candidate_series_dif)
+        series_dif, series_quo = gen_next_layer(candidate.series)
+        candidate_series_dif   = candidate.spawn(series_dif, 'dif')
+        if table.merge(candidate_series_dif) is None:
+            next_candidates.append(candidate_series_dif)
         if series_quo.size != 0:
-            candidate_series_quo        = data(candidate.pos, candidate.series, None, candidate, 'quo')
-            candidate_series_quo.series = series_quo
-            candidate_series_quo.pos    = np.arange(candidate_series_quo.series.size)[np.isnan(series_quo)]
-            next_candidates             = np.append(next_candidates, candidate_series_quo)
-    return next_candidates
+            candidate_series_quo = candidate.spawn(series_quo, 'quo')
+            if table.merge(candidate_series_quo) is None:
+                next_candidates.append(candidate_series_quo)
+    if record is not None:
+        record.add_gen_next(timer()-started, len(next_candidates))
+    return next_candidates.objects()
     
 """
 Generate the next series which define the next layer of the BFS search-structure
@@ -90,37 +206,68 @@ def gen_next_layer(series):
     else: series_quo = np.asarray([])
     return series_dif, series_quo
 
+def gen_next_layer_rows(series_matrix):
+    """
+    gen_next_layer_rows(series_matrix):
+    Row-wise version of gen_next_layer, generates for each row of the matrix:
+        (i)  the absoloute difference between consecutive elements
+        (ii) the quotient between consecutive elements
+    Rows which contain a 0 have no quotients, the third output marks the rows which have them.
+    """
+    series_dif = series_matrix[:,1:]-series_matrix[:,:-1]
+    has_quo    = np.all(series_matrix != 0., axis=1)
+    series_quo = np.full(series_dif.shape, np.nan)
+    series_quo[has_quo] = series_matrix[has_quo,1:]/series_matrix[has_quo,:-1]
+    return series_dif, series_quo, has_quo
+
 """
 Defines the structure of each 'layer' in the searchspace 
 """
-def perf_layer(candidates, tests, cons_tests, elem_tests, mode, database):
+def perf_layer(candidates, tests, cons_tests, elem_tests, mode, database, stop_after = None, budget = None):
     """
-    perf_layer(operating_series, tests, elem_tests, mode, database)
+    perf_layer(operating_series, tests, elem_tests, mode, database, stop_after = None, budget = None)
     Input: A list of object(s) from class data,
            a list of tests to perform on subseries (compare `perform_tests(series, mode)´),
            a list of tests, regarding consecutive Elements, to perform (compare `perform_cons_tests(...)´),
            a list of tests, regarding the properties of the Elements, to perform (compare `perform_element_tests(...)´),
-           mode denotes wether or not the given database is online or not.
+           mode denotes wether or not the given database is online or not,
+           stop_after (if given) stops the layer as soon as this many candidates are completely filled,
+           budget (if given, compare `search_budget´) stops the layer as soon as it is exhausted,
+           it is checked before each candidate and each test, the kept forks are charged to it.
     Performs a series of checks to fill the given series correctly.
+    A fork which has the same series as a candidate already known is merged into that candidate.
     """
-    #preliminaries
-    states         = -1
-    candidates_new = candidates
-    for object_ in candidates:
-        states = np.append(states, object_.pos.size)
-    states = states[1:]
+    #preliminaries, each phase forks each candidate at most once
+    record         = active_recorder()
+    candidates_new = candidate_list(8*len(candidates))
+    candidates_new.extend(candidates)
+    table          = transposition_table()
+    for dat_object in candidates:
+        table.merge(dat_object)
+    solved         = np.count_nonzero(candidates_new.states() == 0)
+    if (stop_after is not None) and (solved >= stop_after):
+        return candidates_new.objects(), candidates_new.states()
     #performs the elementwise tests
-    for dat_object in candidates_new:
+    if record is not None:
+        record.enter_phase('elem')
+    for dat_object in candidates_new.objects():
+        if (budget is not None) and budget.exhausted():
+            return candidates_new.objects(), candidates_new.states()
         new_rule = False
-        obj = copy.deepcopy(dat_object)
+        obj = dat_object.fork()
         series = obj.series
         upper_bound = int((2*series.size-1)/4.)+1
         for test in elem_tests:
             i=0
             for i in range(1,upper_bound):
+                if (budget is not None) and budget.exhausted():
+                    break
                 j=0
                 for j in np.arange(i):
-                    thesis, rest = extract_subseries(series, start_index = j, stepsize = i)
+                    if record is not None:
+                        started = timer()
+                        filled  = len(obj.positive_tests)
+                    thesis = extract_thesis(series, start_index = j, stepsize = i)
                     test_result = perform_element_tests(-thesis, mode = test)
                     validation_ = test_result[(np.squeeze(np.nonzero(np.logical_not(np.isnan(thesis)))))]
                     if validation_.size >= 2:
@@ -145,82 +292,250 @@ def perf_layer(candidates, tests, cons_tests, elem_tests, mode, database):
                             fill_ele_test_space(obj, thesis, j, i, mode = test)
                             new_rule = True
                             series = obj.series
+                    if record is not None:
+                        record.add_test(test, 2, len(obj.positive_tests)-filled, timer()-started)
                     if dat_object.pos.size == 0:
                         break
                 if dat_object.pos.size == 0:
                     break
             if dat_object.pos.size == 0:
                 break
-        if new_rule:
+        if new_rule and (table.merge(obj) is None):
             #save the new result(s)
-            candidates_new = np.append(candidates_new, obj)
-            states         = np.append(states, obj.pos.size)
+            candidates_new.append(obj)
+            if budget is not None:
+                budget.charge()
+            solved += obj.pos.size == 0
+            if (stop_after is not None) and (solved >= stop_after):
+                return candidates_new.objects(), candidates_new.states()
     #performs the tests on subseries
-    for dat_object in candidates_new:
+    if record is not None:
+        record.enter_phase('subseries')
+    for dat_object in candidates_new.objects():
+        if (budget is not None) and budget.exhausted():
+            return candidates_new.objects(), candidates_new.states()
         new_rule    = False
-        obj         = copy.deepcopy(dat_object)
+        obj         = dat_object.fork()
         series      = obj.series
         upper_bound = int((2*series.size-1)/4.)+1
         if upper_bound >=2: #There are no usefull Rules for masked series of length 1 or 2
-            for test in tests:
-                i=0
-                for i in range(1,upper_bound):
-                    j=0
-                    for j in np.arange(i):
-                        thesis, rest = extract_subseries(series, start_index = j, stepsize = i)
-                        test_result = perform_tests(thesis, mode = test)
-                        if test_result[0]:
-                            new_rule = True
-                            fill_tests(obj, thesis, j, i, test_result[1], mode = test)
-                            series = obj.series
-                        if dat_object.pos.size == 0:
-                            break
-                    if dat_object.pos.size == 0:
-                        break
-                if dat_object.pos.size == 0:
+            starts, steps = subseries_matrix_plan(series.size)[:2]
+            #a candidate without masked positions only gets its first subseries tested
+            last_pair = starts.size if dat_object.pos.size != 0 else 1
+            for test in (tests if dat_object.pos.size != 0 else tests[:1]):
+                if (budget is not None) and budget.exhausted():
                     break
-        if new_rule:
+                #all pairs are tested at once, after a fill the pairs behind the filled one are tested again
+                pair = 0
+                while pair < last_pair:
+                    if (budget is not None) and budget.exhausted():
+                        break
+                    if record is not None:
+                        started = timer()
+                    results, values = perform_tests_subseries(series, first = pair, mode = test)
+                    accepted        = np.flatnonzero(results[:last_pair-pair])
+                    if record is not None:
+                        record.add_test(test, min(results.size, last_pair-pair), min(accepted.size, 1), timer()-started)
+                    if accepted.size == 0:
+                        break
+                    pair   = pair+accepted[0]
+                    j, i   = starts[pair], steps[pair]
+                    thesis = extract_thesis(series, start_index = j, stepsize = i)
+                    value  = values[accepted[0]] if test != 'fib' else perform_tests(thesis, mode = test)[1]
+                    new_rule = True
+                    fill_tests(obj, thesis, j, i, value, mode = test)
+                    series = obj.series
+                    pair  += 1
+        if new_rule and (table.merge(obj) is None):
             #save the new result(s)
-            candidates_new = np.append(candidates_new, obj)
-            states         = np.append(states, obj.pos.size)
+            candidates_new.append(obj)
+            if budget is not None:
+                budget.charge()
+            solved += obj.pos.size == 0
+            if (stop_after is not None) and (solved >= stop_after):
+                return candidates_new.objects(), candidates_new.states()
     #performs the tests on consecutive Elements
-    for dat_object in candidates_new:
+    if record is not None:
+        record.enter_phase('cons')
+    for dat_object in candidates_new.objects():
+        if (budget is not None) and budget.exhausted():
+            return candidates_new.objects(), candidates_new.states()
         new_rule    = False
-        obj         = copy.deepcopy(dat_object)
+        obj         = dat_object.fork()
         series      = obj.series
         upper_bound = int((2*series.size-1)/4.)+1
         if upper_bound >=2: #There are no usefull Rules for masked series of length 1 or 2
-            for test in cons_tests:
-                i=0
-                for i in range(1,upper_bound):
-                    k=0
-                    for k in range(1,upper_bound):
-                        j=0
-                        for j in np.arange(i):
-                            thesis, rest = extract_subseries_cons_elem(series, start_index=j, cons_elem_len=k, stepsize=i)
-                            test_result = perform_cons_tests(series, thesis, mode = test)
-                            if test_result[0]:
-                                new_rule = True
-                                fill_cons_tests(obj, thesis, j, k, i, test_result[1], mode = test)
-                                series = obj.series
-                            if dat_object.pos.size == 0:
-                                break
-                        if dat_object.pos.size == 0:
-                            break
-                    if dat_object.pos.size == 0:
-                        break
-                if dat_object.pos.size == 0:
+            starts, cons_lengths, steps, offsets = cons_elem_matrix_plan(series.size)[:4]
+            #a candidate without masked positions only gets its first blocks tested
+            last_triple = starts.size if dat_object.pos.size != 0 else 1
+            for test in (cons_tests if dat_object.pos.size != 0 else cons_tests[:1]):
+                if (budget is not None) and budget.exhausted():
                     break
-        if new_rule:
+                #all triples are tested at once, after a fill the triples behind the filled one are tested again
+                triple = 0
+                while triple < last_triple:
+                    if (budget is not None) and budget.exhausted():
+                        break
+                    if record is not None:
+                        started = timer()
+                    results, values = perform_cons_tests_blocks(series, first = triple, mode = test)
+                    accepted        = np.flatnonzero(results[:last_triple-triple])
+                    if record is not None:
+                        record.add_test('cons_'+test, min(results.size, last_triple-triple), min(accepted.size, 1),
+                                        timer()-started)
+                    if accepted.size == 0:
+                        break
+                    first    = offsets[triple]
+                    triple   = triple+accepted[0]
+                    j, k, i  = starts[triple], cons_lengths[triple], steps[triple]
+                    thesis   = extract_subseries_cons_elem(series, start_index=j, cons_elem_len=k, stepsize=i)[0]
+                    new_rule = True
+                    fill_cons_tests(obj, thesis, j, k, i, values[offsets[triple]-first:offsets[triple+1]-first],
+                                    mode = test)
+                    series   = obj.series
+                    triple  += 1
+        if new_rule and (table.merge(obj) is None):
             #save the new result(s)
-            candidates_new = np.append(candidates_new, obj)
-            states         = np.append(states, obj.pos.size)
-    return candidates_new, states
+            candidates_new.append(obj)
+            if budget is not None:
+                budget.charge()
+            solved += obj.pos.size == 0
+            if (stop_after is not None) and (solved >= stop_after):
+                return candidates_new.objects(), candidates_new.states()
+    return candidates_new.objects(), candidates_new.states()
+
+"""
+The output of a search whose budget is exhausted
+"""
+def budget_result(candidates, states, budget, stop_after = None):
+    """
+    budget_result(candidates, states, budget, stop_after = None):
+    Returns the soloutions among the candidates (at most stop_after of them) or, if there are none,
+    the candidates with the fewest positions left to predict, as an incomplete_result carrying the reason of the budget.
+    """
+    if states[states == 0].size != 0:
+        best = candidates[states == 0]
+    elif states.size != 0:
+        best = candidates[states == np.min(states)]
+    else:
+        best = candidates
+    return incomplete_result(best[:stop_after], budget.reason)
+
+"""
+Performs a search of configurable depth on the Searchspace defined through gen_next() and perf_layer().
+"""
+def search(data_object, tests = ['const','sum','fac','fib'], cons_tests = [], elem_tests = ['prime','cube','square'], mode = 'offline', database = None, max_depth = 3, max_candidates = None, stop_after = None, budget = None, verbose = True, select = None):
+    """
+    search(data_object, tests, cons_tests, elem_tests, mode, database, max_depth = 3, max_candidates = None, stop_after = None, budget = None, verbose = True, select = None)
+    Input: the data object to fill and the tests as in bfs,
+           max_depth -> the number of layers to search (bfs uses 3),
+           max_candidates -> (if given) the maximal number of candidates entering a layer,
+                             the first ones generated by gen_next are kept,
+           stop_after -> (if given) stop as soon as this many candidates are completely filled,
+                         e.g. 1 to return the first soloution found,
+           budget -> (if given) a search_budget bounding the time and the number of candidates of the whole search,
+                     it is checked at the loop boundaries of perf_layer and between the layers,
+           select -> (if given) a function choosing the candidates of a layer which generate the next layer
+                     (compare `beam_search´).
+    Output: the completely filled candidates of the first layer which has some (at most stop_after of them),
+            if there are none: None if verbose else 0 (like bfs).
+            If the budget gets exhausted: the best candidates found so far as an incomplete_result (compare `budget_result´).
+    The layers are searched one after the other, a layer is only entered if the previous layer has no soloution.
+    """
+    candidates = np.asarray([data_object])
+    states     = np.asarray([data_object.pos.size])
+    if budget is not None:
+        budget.charge()
+    for layer in np.arange(max_depth):
+        if layer >= 1:
+            if (budget is not None) and budget.exhausted():
+                return budget_result(candidates, states, budget, stop_after)
+            if select is not None:
+                candidates = select(candidates)
+            candidates = gen_next(candidates)
+            if (max_candidates is not None) and (len(candidates) > max_candidates):
+                candidates = candidates[:max_candidates]
+            if budget is not None:
+                budget.charge(len(candidates))
+        if verbose:
+            print("Entering Layer", layer)
+        record = active_recorder()
+        if record is not None:
+            record.start_layer(layer, len(candidates))
+        candidates, states = perf_layer(candidates, tests, cons_tests, elem_tests, mode, database, stop_after, budget)
+        if record is not None:
+            record.end_layer(candidates, states)
+        if (budget is not None) and (budget.reason is not None):
+            return budget_result(candidates, states, budget, stop_after)
+        if states[states == 0].size != 0:
+            return candidates[states == 0][:stop_after]
+    if verbose:
+        print("No soloution found, try other search structure or extend the tests")
+        return None
+    return 0
+
+"""
+Scores for beam_search, a higher score marks a more promising candidate.
+"""
+def score_positions(candidate):
+    """
+    score_positions(candidate):
+    The fewer positions are left to predict, the better.
+    """
+    return -candidate.pos.size
+
+def score_variance(candidate):
+    """
+    score_variance(candidate):
+    The smaller the variance of the differences between the known consecutive elements, the better.
+    """
+    series_dif = candidate.series[1:]-candidate.series[:-1]
+    if np.all(np.isnan(series_dif)):
+        return -np.inf
+    return -np.nanvar(series_dif)
+
+def score_integers(candidate):
+    """
+    score_integers(candidate):
+    The more known elements are integers, the better.
+    """
+    known = candidate.series[np.logical_not(np.isnan(candidate.series))]
+    return np.count_nonzero(known == np.round(known))
+
+def best_candidates(candidates, beam_width, score = score_positions):
+    """
+    best_candidates(candidates, beam_width, score = score_positions):
+    Returns the beam_width candidates with the highest score, keeping the order of candidates with equal score.
+    """
+    if len(candidates) <= beam_width:
+        return candidates
+    scores = np.asarray([score(candidate) for candidate in candidates], dtype='float64')
+    best   = np.sort(np.argsort(-scores, kind='stable')[:beam_width])
+    return candidates[best]
+
+"""
+Performs a beam search on the Searchspace defined through gen_next() and perf_layer().
+"""
+def beam_search(data_object, tests = ['const','sum','fac','fib'], cons_tests = [], elem_tests = ['prime','cube','square'], mode = 'offline', database = None, beam_width = 8, score = score_positions, max_depth = 3, stop_after = None, budget = None, verbose = True):
+    """
+    beam_search(data_object, tests, cons_tests, elem_tests, mode, database, beam_width = 8, score = score_positions, max_depth = 3, stop_after = None, budget = None, verbose = True)
+    Input: the data object to fill and the tests as in bfs,
+           beam_width -> the number of candidates of a layer which generate the next layer,
+           score -> a function rating a candidate, higher is better (compare `score_positions´, `score_variance´,
+                    `score_integers´),
+           max_depth, stop_after, budget, verbose -> as in search.
+    Output: as in search.
+    Like search, but only the beam_width best candidates of each layer are given to gen_next,
+    thus each layer contains at most 2*beam_width candidates (before perf_layer forks them).
+    """
+    return search(data_object, tests, cons_tests, elem_tests, mode, database, max_depth, stop_after = stop_after,
+                  budget = budget, verbose = verbose,
+                  select = lambda candidates: best_candidates(candidates, beam_width, score))
 
 """
 Performs BFS on the Searchspace defined through gen_next() and perf_layer().
 """
-def bfs(data_object, tests = ['const','sum','fac','fib'], cons_tests = ['const','sum','fac'], elem_tests = ['prime','cube','square'], mode = 'offline', database = None, verbose = True):
+def bfs(data_object, tests = ['const','sum','fac','fib'], cons_tests = [], elem_tests = ['prime','cube','square'], mode = 'offline', database = None, timeout_s = None, max_candidates = None, cancel = None, verbose = True):
     """
     performs bfs in the following searchtree:
     
@@ -231,41 +546,139 @@ def bfs(data_object, tests = ['const','sum','fac','fib'], cons_tests = ['const',
      
      in a te elementwise tests are performed
      in b the tests on subseries are performed
-     in c the tests on consecutive elements are performed
+     in c the tests on consecutive elements are performed (only if cons_tests are given, e.g. ['const','sum','fac'])
      b considers the positive tests from a
      c considers the positive tests from a and b
      
      returns all possible soloutions given the series, the tests above and the way we traverse the searchspace.
+     (This is `search´ with three layers.)
+
+     The search can be bounded (compare `search_budget´) by timeout_s seconds, max_candidates candidates
+     and a cancel_token (cancel) triggered from another thread. If one of them is hit,
+     the best candidates found so far are returned as an incomplete_result (compare `budget_result´).
      """
-    if verbose:
-        operating_object        = data_object
-        print("Entering Layer 0")
-        candidates_L0, state_L0 = perf_layer(np.asarray([operating_object]), tests, cons_tests, elem_tests, mode, database)
-        if(state_L0[state_L0 == 0].size == 0):
-            candidates_L0           = gen_next(candidates_L0)
-            print("Entering Layer 1")
-            candidates_L1, state_L1 = perf_layer(candidates_L0, tests, cons_tests, elem_tests, mode, database)
-            if(state_L1[state_L1 == 0].size == 0):
-                candidates_L1           = gen_next(candidates_L1)
-                print("Entering Layer 2")
-                candidates_L2, state_L2 = perf_layer(candidates_L1, tests, cons_tests, elem_tests, mode, database)
-                if(state_L2[state_L2 == 0].size == 0):
-                    print("No soloution found, try other search structure or extend the tests")
-                else: return candidates_L2[state_L2 == 0]
-            else: return candidates_L1[state_L1 == 0]
-        else: return candidates_L0[state_L0 == 0]
-    else:
-        operating_object        = data_object
-        candidates_L0, state_L0 = perf_layer(np.asarray([operating_object]), tests, cons_tests, elem_tests, mode, database)
-        if(state_L0[state_L0 == 0].size == 0):
-            candidates_L0           = gen_next(candidates_L0)
-            candidates_L1, state_L1 = perf_layer(candidates_L0, tests, cons_tests, elem_tests, mode, database)
-            if(state_L1[state_L1 == 0].size == 0):
-                candidates_L1           = gen_next(candidates_L1)
-                candidates_L2, state_L2 = perf_layer(candidates_L1, tests, cons_tests, elem_tests, mode, database)
-                if(state_L2[state_L2 == 0].size == 0):
-                    return 0
-                else: return candidates_L2[state_L2 == 0]
-            else: return candidates_L1[state_L1 == 0]
-        else: return candidates_L0[state_L0 == 0]
-    pass
\ No newline at end of file
+    budget = None
+    if (timeout_s is not None) or (max_candidates is not None) or (cancel is not None):
+        budget = search_budget(timeout_s, max_candidates, cancel)
+    return search(data_object, tests, cons_tests, elem_tests, mode, database, max_depth = 3, budget = budget,
+                  verbose = verbose)
+
+"""
+Performs the search on a whole matrix of series at once.
+"""
+def first_rule_rows(series_matrix, tests):
+    """
+    first_rule_rows(series_matrix, tests)
+    Input: np array (N, L) of series, the tests on subseries (compare `perform_tests_rows´)
+    Output: the index of the first test (in the order of perf_layer) which holds for the whole series of a row,
+            -1 if no test holds and -2 if a test on a proper subseries holds first.
+    """
+    rule        = np.full(series_matrix.shape[0], -1)
+    upper_bound = int((2*series_matrix.shape[1]-1)/4.)+1
+    if upper_bound < 2:
+        return rule
+    for number, test in enumerate(tests):
+        for i in range(1,upper_bound):
+            for j in np.arange(i):
+                open_rows = rule == -1
+                if not np.any(open_rows):
+                    return rule
+                result = perform_tests_rows(series_matrix[open_rows][:,j::i], mode = test)[0]
+                if test in ['const','sum','fac'] and i == 1:
+                    rule[np.nonzero(open_rows)[0][result]] = number
+                else:
+                    rule[np.nonzero(open_rows)[0][result]] = -2
+    return rule
+
+def unique_rows(series_matrix, decimals = 8):
+    """
+    unique_rows(series_matrix, decimals = 8)
+    The rows of the matrix, each one once (in the order they come first),
+    two rows are equal if they agree on decimals decimals (compare `gen_result.solution_keys´).
+    """
+    first = {}
+    for number, values in enumerate(series_matrix.round(decimals) + 0.): # + 0. turns -0. into 0.
+        first.setdefault(values.tobytes(), number)
+    return series_matrix[list(first.values())]
+
+def bfs_batch(series_matrix, mask_matrix, tests = ['const','sum','fac','fib'], cons_tests = [], elem_tests = [], mode = 'offline', database = None, fallback = True, decimals = 8):
+    """
+    bfs_batch(series_matrix, mask_matrix, tests, cons_tests, elem_tests = [], mode, database, fallback = True, decimals = 8)
+    Input: np array (N, L) of series (float), boolean np array (N, L) marking the positions to predict,
+           the tests as in bfs (but without elementwise tests by default) and the number of decimals
+           two soloutions have to agree on to be equal (compare `return_solutions´).
+    Output: np array (N, L) with the first soloution of each row, a boolean np array (N,) marking the solved rows
+            and a list with an np array (k, L) of all k soloutions of each row (k = 0 if the row isn't solved),
+            i.e. the series of return_solutions(bfs(...)) for the row.
+    
+    Walks the same three layers as bfs (the series, its differences/quotients and theirs) for all rows at once.
+    In each layer every node of a row whose first holding rule (in the order of bfs) is a test on its whole series
+    gets filled and backpropagated to its first layer, a row solved in a layer gets the soloutions of all of its nodes.
+    All other rows (a node whose first rule is on a proper subseries) are given to bfs one by one, if fallback.
+    The tests on consecutive elements and the elementwise tests are not vectorized, they can fork each node
+    of a row in every layer: if cons_tests or elem_tests are given, every row is given to bfs,
+    thus the default of the batch is elem_tests = [].
+    """
+    series_matrix = np.array(series_matrix, dtype='float64')
+    mask_matrix   = np.asarray(mask_matrix, dtype=bool)
+    masked        = np.where(mask_matrix, np.nan, series_matrix)
+    filled        = masked.copy()
+    solved        = np.logical_not(np.isnan(masked).any(axis=1))
+    soloutions    = [masked[row:row+1] if solved[row] else masked[:0] for row in np.arange(masked.shape[0])]
+    # each node of the frontier: (rows of the matrix, series of these rows, [(gender, ancestor series), ...])
+    frontier      = [(np.arange(masked.shape[0]), masked, [])]
+    deferred      = np.full(solved.shape, False)
+    if (len(cons_tests) != 0) or (len(elem_tests) != 0):
+        deferred = np.logical_not(solved)
+        frontier = []
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        for layer in np.arange(3):
+            next_frontier = []
+            leaves        = []
+            for rows, series, family in frontier:
+                active = np.logical_not(solved[rows] | deferred[rows])
+                rows, series = rows[active], series[active]
+                family       = [(gender, ancestor[active]) for gender, ancestor in family]
+                if rows.size == 0:
+                    continue
+                rule = first_rule_rows(series, tests)
+                deferred[rows[rule == -2]] = True
+                for number in np.unique(rule[rule >= 0]):
+                    result, value = perform_tests_rows(series[rule == number], mode = tests[number])
+                    leaf = fill_tests_rows(series[rule == number], value, mode = tests[number])
+                    for gender, ancestor in reversed(family):
+                        if gender == 'dif':
+                            leaf = backprop_dif_rows(ancestor[rule == number], leaf)
+                        else:
+                            leaf = backprop_quo_rows(ancestor[rule == number], leaf)
+                    leaves.append((rows[rule == number], leaf))
+                left = rule == -1
+                if (layer < 2) and np.any(left) and (series.shape[1] >= 2):
+                    series_dif, series_quo, has_quo = gen_next_layer_rows(series[left])
+                    family_left = [(gender, ancestor[left]) for gender, ancestor in family]
+                    next_frontier.append((rows[left], series_dif, family_left+[('dif', series[left])]))
+                    next_frontier.append((rows[left][has_quo], series_quo[has_quo],
+                                          [(gender, ancestor[has_quo]) for gender, ancestor in family_left]
+                                          +[('quo', series[left][has_quo])]))
+            #a row is solved by the layer, unless one of its nodes in it is given to bfs
+            found = {}
+            for rows, leaf in leaves:
+                for row, series in zip(rows, leaf):
+                    if not deferred[row]:
+                        found.setdefault(row, []).append(series)
+            for row, series in found.items():
+                soloutions[row] = unique_rows(np.asarray(series), decimals)
+                filled[row]     = soloutions[row][0]
+                solved[row]     = True
+            frontier = next_frontier
+    if fallback:
+        for row in np.nonzero(deferred & np.logical_not(solved))[0]:
+            data_object = data(np.nonzero(mask_matrix[row])[0], series_matrix[row], None, None, None)
+            output      = bfs(data_object, tests, cons_tests, elem_tests, mode, database, verbose = False)
+            if np.any(output) != 0:
+                found = return_solutions(output, decimals = decimals)
+                if np.any(found) != 0:
+                    soloutions[row] = np.asarray([soloution.series for soloution in found])
+                    filled[row]     = soloutions[row][0]
+                    solved[row]     = True
+    return filled, solved, soloutions
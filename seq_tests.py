@@ -3,7 +3,169 @@ import functools
 import random
 import math
 import numpy as np
-import numba as nb
+try:
+    import numba as nb
+    njit = nb.njit
+except ImportError:
+    nb = None
+    def njit(*args, **kwargs):
+        """
+        Stand-in for numba.njit if numba is not installed, the kernels run as pure Python.
+        """
+        if (len(args) == 1) and callable(args[0]):
+            return args[0]
+        return lambda function: function
+
+"""
+The kernels of the tests, compiled by numba if it is available.
+They loop over the series once and return (result, value) without creating arrays.
+"""
+@njit(cache=True, nogil=True)
+def close_kernel(a, b):
+    """
+    close_kernel(a, b):
+    The tolerance of np.allclose (rtol = 1e-5, atol = 1e-8) for two floats, np.nan is never close.
+    """
+    if a == b:
+        return True
+    if math.isinf(a) or math.isinf(b) or math.isnan(a) or math.isnan(b):
+        return False
+    return abs(a-b) <= 1e-8 + 1e-5*abs(b)
+
+@njit(cache=True, nogil=True)
+def const_kernel(series):
+    """
+    const_kernel(series):
+    The kernel of const_test.
+    """
+    count = 0
+    first = 0
+    for index in range(series.size):
+        if not math.isnan(series[index]):
+            if count == 0:
+                first = index
+            count += 1
+    if (count == series.size) or (count < 2):
+        return False, np.nan
+    value = series[first]
+    if count == 2:
+        for index in range(first+1, series.size):
+            if not math.isnan(series[index]):
+                other = series[index]
+                if (value == other) or ((not math.isinf(value)) and (not math.isinf(other))
+                                        and abs(value-other) <= 1e-9*max(abs(value), abs(other))):
+                    return True, value
+    for index in range(series.size):
+        if (not math.isnan(series[index])) and (not close_kernel(series[index], value)):
+            return False, value
+    return True, value
+
+@njit(cache=True, nogil=True)
+def sum_kernel(series):
+    """
+    sum_kernel(series):
+    The kernel of sum_test.
+    """
+    count = 0
+    for index in range(series.size):
+        if not math.isnan(series[index]):
+            count += 1
+    if (count == series.size) or (count < 3):
+        return False, np.nan
+    previous   = -1
+    first      = True
+    difference = np.nan
+    result     = True
+    for index in range(series.size):
+        if not math.isnan(series[index]):
+            if previous >= 0:
+                if first:
+                    difference = (series[index]-series[previous])/(index-previous)
+                    first      = False
+                if not close_kernel(difference*(index-previous), series[index]-series[previous]):
+                    result = False
+            previous = index
+    return result, difference
+
+@njit(cache=True, nogil=True)
+def fac_kernel(series):
+    """
+    fac_kernel(series):
+    The kernel of fac_test, elements which are 0 are disregarded.
+    """
+    count = 0
+    nan   = False
+    for index in range(series.size):
+        if math.isnan(series[index]):
+            nan = True
+        elif series[index] != 0.:
+            count += 1
+    if (not nan) or (count < 3):
+        return False, np.nan
+    previous = -1
+    first    = True
+    quotient = np.nan
+    result   = True
+    for index in range(series.size):
+        if (not math.isnan(series[index])) and (series[index] != 0.):
+            if previous >= 0:
+                if first:
+                    ratio = series[index]/series[previous]
+                    if (ratio < 0.) and ((1./(index-previous)) % 1. != 0.):
+                        quotient = np.nan
+                    else:
+                        quotient = ratio ** (1./(index-previous))
+                    first = False
+                if not close_kernel(quotient ** float(index-previous), series[index]/series[previous]):
+                    result = False
+            previous = index
+    return result, quotient
+
+@njit(cache=True, nogil=True)
+def fib_kernel(series):
+    """
+    fib_kernel(series):
+    The kernel of fib_test, returns the result and the number of positions where the sum was checked.
+    """
+    nan = False
+    for index in range(series.size):
+        if math.isnan(series[index]):
+            nan = True
+    if not nan:
+        return False, -1
+    count  = 0
+    result = True
+    for index in range(series.size-2):
+        if not (math.isnan(series[index]) or math.isnan(series[index+1]) or math.isnan(series[index+2])):
+            count += 1
+            if not close_kernel(series[index]+series[index+1], series[index+2]):
+                result = False
+    return result, count
+
+@njit(cache=True, nogil=True)
+def rows_kernel(matrix, lengths, mode):
+    """
+    rows_kernel(matrix, lengths, mode):
+    Runs the kernel of the test with the number mode (compare ROW_TEST_MODES) on the first lengths[row] entries
+    of each row of the matrix. For 'fib' the values are the numbers of positions where the sum was checked.
+    """
+    results = np.zeros(matrix.shape[0], dtype=np.bool_)
+    values  = np.full(matrix.shape[0], np.nan)
+    for row in range(matrix.shape[0]):
+        series = matrix[row,:lengths[row]]
+        if mode == 0:
+            results[row], values[row] = const_kernel(series)
+        elif mode == 1:
+            results[row], values[row] = sum_kernel(series)
+        elif mode == 2:
+            results[row], values[row] = fac_kernel(series)
+        else:
+            result, count = fib_kernel(series)
+            results[row]  = result and (count >= 2)
+            values[row]   = max(count, 0)
+    return results, values
+
+ROW_TEST_MODES = {'const': 0, 'sum': 1, 'fac': 2, 'fib': 3}
 
 """
 test for constant value of a (sub)series
@@ -14,19 +176,8 @@ def const_test(series):
     checks if all non np.nan elements in the series have the same constant value.
     returns the boolean value of this check and value checked against.
     """
-    if(series[np.isnan(series)].size != 0):
-        indices = np.nonzero(np.logical_not(np.isnan(series)))[0]
-        if indices.size <2:
-            return False, np.nan
-        value = series[indices[0]]
-        if indices.size ==2:
-            if math.isclose(series[indices[0]],series[indices[1]]):
-                return True, value
-        if np.allclose(series[indices],np.full(series[indices].shape, value)):
-            return True, value
-        return False, value
-    else: return False, np.nan
-    return False, np.nan
+    result, value = const_kernel(np.ascontiguousarray(series, dtype='float64'))
+    return bool(result), value
 
 """
 test for constant summand between the elements of a (sub)series
@@ -37,22 +188,12 @@ def sum_test(series):
     checks if all non np.nan elements in the series can be obtained by adding a constant value.
     returns the boolean value of this check and the distance checked against.
     """
-    if(series[np.isnan(series)].size != 0):
-        series = copy.deepcopy(series).astype('float64')
-        indices = np.nonzero(np.logical_not(np.isnan(series)))[0]
-        if indices.size <3:
-            return False, np.nan
-        differences_indices = indices[1:]-indices[0:-1]
-        #Check the distance of first two non nan items and the distance of their indices. 
-        #Compare if difference between non nan items is:
-        #(distance of non nan)*(distance of first two)/(distance of first two)
-        #If yes, then found a subseries of constant spacing
-        difference_consecutive_elements = (series[indices[1]]-series[indices[0]])/differences_indices[0]
-        if np.allclose((difference_consecutive_elements*differences_indices), series[indices[1:]]-series[indices[0:-1]]):
-            return True, difference_consecutive_elements
-        return False, difference_consecutive_elements
-    else: return False, np.nan
-    return False, np.nan
+    #Check the distance of first two non nan items and the distance of their indices. 
+    #Compare if difference between non nan items is:
+    #(distance of non nan)*(distance of first two)/(distance of first two)
+    #If yes, then found a subseries of constant spacing
+    result, difference = sum_kernel(np.ascontiguousarray(series, dtype='float64'))
+    return bool(result), difference
 
 """
 test for constant factor between the elements of a (sub)series
@@ -63,24 +204,12 @@ def fac_test(series):
     checks if all non np.nan elements in the series can be obtained by multiplying a constant factor.
     returns the boolean value of this check and the distance checked against.
     """
-    if(series[np.isnan(series)].size != 0):
-        series = copy.deepcopy(series).astype('float64')
-        indices = (np.nonzero(np.logical_not(np.isnan(series)))[0])
-        indices = indices[(np.nonzero(series[indices]!=0.)[0])]
-        if indices.size <3:
-            return False, np.nan
-        differences_indices = indices[1:]-indices[0:-1]
-        #print("differences_indices",differences_indices)
-        #Check the distance of first two non nan items and the relative distance of their indices. 
-        #Check if quotient between non nan items is equal to 
-        #((quotient of first two)^{1/(distance of first two)})^(distance of non nan)
-        #If yes, then found a subseries of constant spacing
-        quotient_consecutive_elements = (series[indices[1]]/series[indices[0]]) ** (1./differences_indices[0])
-        if np.allclose((quotient_consecutive_elements ** differences_indices), series[indices[1:]]/series[indices[0:-1]]):
-            return True, quotient_consecutive_elements
-        return False, quotient_consecutive_elements
-    else: return False, np.nan
-    return False, np.nan
+    #Check the distance of first two non nan items and the relative distance of their indices. 
+    #Check if quotient between non nan items is equal to 
+    #((quotient of first two)^{1/(distance of first two)})^(distance of non nan)
+    #If yes, then found a subseries of constant spacing
+    result, quotient = fac_kernel(np.ascontiguousarray(series, dtype='float64'))
+    return bool(result), quotient
 
 """
 test for sum between consecutive elements (Fibonacci numbers etc.)
@@ -92,18 +221,167 @@ def fib_test(series):
     if they are non np.nan.
     returns the boolean value of this check and the positions where it was true.
     """
-    if(series[np.isnan(series)].size != 0):
-        indices             = np.nonzero(np.logical_not(np.isnan(series)))[0]
-        differences_indices = (indices[2:]-indices[1:-1])+(indices[1:-1]-indices[0:-2])
-        if np.argwhere(differences_indices == 2).size <2:
-            return False, np.asarray([np.nan])
-        if np.allclose((series[indices[np.argwhere(differences_indices == 2)]]
-                        + series[indices[np.argwhere(differences_indices == 2)]+1]),
-                        series[indices[np.argwhere(differences_indices == 2)]+2]):
-            return True, indices[np.argwhere(differences_indices == 2)]
-        return False, indices[np.argwhere(differences_indices == 2)]
-    else: return False, np.nan
-    return False, np.nan
+    series        = np.ascontiguousarray(series, dtype='float64')
+    result, count = fib_kernel(series)
+    if count == -1:
+        return False, np.nan
+    if count < 2:
+        return False, np.asarray([np.nan])
+    known = np.logical_not(np.isnan(series))
+    return bool(result), np.nonzero(known[:-2] & known[1:-1] & known[2:])[0][:,None]
+
+"""
+Row-wise versions of the tests above.
+Each row of a matrix is treated as one (sub)series, rows may be shorter than the matrix (see `lengths´).
+"""
+def compact_rows(matrix, valid):
+    """
+    compact_rows(matrix, valid):
+    Moves the entries of each row which are marked in valid to the front of the row, keeping their order.
+    returns the compacted values (padded with np.nan), their column indices (padded with -1)
+    and the number of valid entries per row.
+    """
+    order   = np.argsort(np.logical_not(valid), axis=1, kind='stable')
+    counts  = valid.sum(axis=1)
+    filled  = np.arange(matrix.shape[1]) < counts[:,None]
+    values  = np.where(filled, np.take_along_axis(matrix, order, axis=1), np.nan)
+    indices = np.where(filled, order, -1)
+    return values, indices, counts
+
+def isclose_rows(a, b):
+    """
+    isclose_rows(a, b):
+    Elementwise version of the tolerance used by np.allclose (rtol = 1e-5, atol = 1e-8).
+    np.nan is never close to anything.
+    """
+    with np.errstate(invalid='ignore'):
+        return (np.abs(a-b) <= 1e-8 + 1e-5*np.abs(b)) | (a == b)
+
+def rows_in_range(matrix, lengths = None):
+    """
+    rows_in_range(matrix, lengths = None):
+    returns a boolean matrix which marks the entries belonging to each row (the first lengths[row] entries).
+    """
+    if lengths is None:
+        return np.full(matrix.shape, True)
+    return np.arange(matrix.shape[1]) < np.asarray(lengths)[:,None]
+
+def const_test_rows(matrix, lengths = None):
+    """
+    const_test_rows(matrix, lengths = None):
+    const_test for each row of the matrix.
+    returns a boolean array of the results and an array of the values checked against.
+    """
+    in_row                 = rows_in_range(matrix, lengths)
+    nan                    = np.isnan(matrix)
+    values, indices, count = compact_rows(matrix, np.logical_not(nan) & in_row)
+    testable               = (nan & in_row).any(axis=1) & (count >= 2)
+    value                  = values[:,0]
+    close                  = isclose_rows(values, value[:,None]) | (indices < 0)
+    return testable & close.all(axis=1), np.where(testable, value, np.nan)
+
+def sum_test_rows(matrix, lengths = None):
+    """
+    sum_test_rows(matrix, lengths = None):
+    sum_test for each row of the matrix.
+    returns a boolean array of the results and an array of the distances checked against.
+    """
+    if matrix.shape[1] < 3:
+        return np.full(matrix.shape[0], False), np.full(matrix.shape[0], np.nan)
+    in_row                 = rows_in_range(matrix, lengths)
+    nan                    = np.isnan(matrix)
+    values, indices, count = compact_rows(matrix, np.logical_not(nan) & in_row)
+    testable               = (nan & in_row).any(axis=1) & (count >= 3)
+    differences_indices    = indices[:,1:]-indices[:,:-1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        difference = (values[:,1]-values[:,0])/differences_indices[:,0]
+        close      = isclose_rows(difference[:,None]*differences_indices, values[:,1:]-values[:,:-1])
+    close = close | (indices[:,1:] < 0)
+    return testable & close.all(axis=1), np.where(testable, difference, np.nan)
+
+def fac_test_rows(matrix, lengths = None):
+    """
+    fac_test_rows(matrix, lengths = None):
+    fac_test for each row of the matrix.
+    returns a boolean array of the results and an array of the factors checked against.
+    """
+    if matrix.shape[1] < 3:
+        return np.full(matrix.shape[0], False), np.full(matrix.shape[0], np.nan)
+    in_row                 = rows_in_range(matrix, lengths)
+    nan                    = np.isnan(matrix)
+    values, indices, count = compact_rows(matrix, np.logical_not(nan) & in_row & (matrix != 0.))
+    testable               = (nan & in_row).any(axis=1) & (count >= 3)
+    differences_indices    = indices[:,1:]-indices[:,:-1]
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        quotient = (values[:,1]/values[:,0]) ** (1./differences_indices[:,0])
+        close    = isclose_rows(quotient[:,None] ** differences_indices, values[:,1:]/values[:,:-1])
+    close = close | (indices[:,1:] < 0)
+    return testable & close.all(axis=1), np.where(testable, quotient, np.nan)
+
+def fib_test_rows(matrix, lengths = None):
+    """
+    fib_test_rows(matrix, lengths = None):
+    fib_test for each row of the matrix.
+    returns a boolean array of the results and the number of positions where the sum was checked.
+    """
+    in_row   = rows_in_range(matrix, lengths)
+    nan      = np.isnan(matrix)
+    known    = np.logical_not(nan) & in_row
+    triplets = known[:,:-2] & known[:,1:-1] & known[:,2:]
+    count    = triplets.sum(axis=1)
+    testable = (nan & in_row).any(axis=1) & (count >= 2)
+    close    = isclose_rows(matrix[:,:-2]+matrix[:,1:-1], matrix[:,2:]) | np.logical_not(triplets)
+    return testable & close.all(axis=1), count
+
+def perform_tests_rows(matrix, lengths = None, mode = 'const'):
+    """
+    perform_tests_rows(matrix, lengths = None, mode = 'const'):
+    Tests the named test on each row of a given matrix, if a row-wise version of the test is known.
+    There is no row-wise `fill_tests´ for 'fib'.
+    If numba is available the rows are passed to the compiled kernels of the tests.
+    """
+    if (nb is not None) and (mode in ROW_TEST_MODES):
+        matrix  = np.ascontiguousarray(matrix, dtype='float64')
+        lengths = np.full(matrix.shape[0], matrix.shape[1]) if lengths is None else np.asarray(lengths)
+        return rows_kernel(matrix, lengths.astype('int64'), ROW_TEST_MODES[mode])
+    if mode == 'const':
+        return const_test_rows(matrix, lengths)
+    elif mode == 'sum':
+        return sum_test_rows(matrix, lengths)
+    elif mode == 'fac':
+        return fac_test_rows(matrix, lengths)
+    elif mode == 'fib':
+        return fib_test_rows(matrix, lengths)
+    else:
+        print('ERROR: This mode doesn\'t exist yet.')
+        return np.full(matrix.shape[0], False), np.full(matrix.shape[0], np.nan)
+    pass
+
+def fill_tests_rows(matrix, value, lengths = None, mode = 'const'):
+    """
+    fill_tests_rows(matrix, value, lengths = None, mode = 'const'):
+    Row-wise version of `fill_tests´ for the tests of `perform_tests_rows´, with start_index 0 and step_size 1.
+    Only pass the rows which passed the test.
+    returns the filled matrix.
+    """
+    in_row  = rows_in_range(matrix, lengths)
+    nan     = np.isnan(matrix) & in_row
+    columns = np.arange(matrix.shape[1])
+    if mode == 'const':
+        values = np.broadcast_to(value[:,None], matrix.shape)
+    elif mode == 'sum':
+        index  = np.argmax(np.logical_not(np.isnan(matrix)), axis=1)
+        start  = matrix[np.arange(matrix.shape[0]), index]
+        values = start[:,None]+(columns-index[:,None])*value[:,None]
+    elif mode == 'fac':
+        index  = np.argmax(np.logical_not(np.isnan(matrix)) & (matrix != 0.), axis=1)
+        start  = matrix[np.arange(matrix.shape[0]), index]
+        with np.errstate(invalid='ignore', over='ignore'):
+            values = start[:,None]*(value[:,None]**(columns-index[:,None]))
+    else:
+        print('ERROR: This mode doesn\'t exist yet.')
+        return matrix
+    return np.where(nan, values, matrix)
 
 """
 Performs a set of predefined Tests regarding the structure of the (sub)series
@@ -136,7 +414,7 @@ def fill_tests(data_object, thesis, start_index, step_size, value, mode = 'const
     """
     j = start_index
     i = step_size
-    series = data_object.series
+    series = data_object.writable_series()
     if mode == 'const':
         positions = j+i*(np.squeeze(np.nonzero(np.isnan(thesis))))
         values = np.full(positions.shape, value)
@@ -144,7 +422,7 @@ def fill_tests(data_object, thesis, start_index, step_size, value, mode = 'const
             data_object.fill_in(positions,values)
         else:
             data_object.fill_in(np.asarray([positions]),np.asarray([values]))
-        data_object.positive_tests.append((mode, start_index, step_size, value))
+        data_object.add_test((mode, start_index, step_size, value))
         return
     elif mode == 'sum':
         positions = j+i*(np.squeeze(np.nonzero(np.isnan(thesis))))
@@ -157,7 +435,7 @@ def fill_tests(data_object, thesis, start_index, step_size, value, mode = 'const
             data_object.fill_in(positions,values)
         else:
             data_object.fill_in(np.asarray([positions]),np.asarray([values]))
-        data_object.positive_tests.append((mode, start_index, step_size, value))
+        data_object.add_test((mode, start_index, step_size, value))
         return
     elif mode == 'fac':
         positions = j+i*(np.squeeze(np.nonzero(np.isnan(thesis))))
@@ -172,7 +450,7 @@ def fill_tests(data_object, thesis, start_index, step_size, value, mode = 'const
             data_object.fill_in(positions,values)
         else:
             data_object.fill_in(np.asarray([positions]),np.asarray([values]))
-        data_object.positive_tests.append((mode, start_index, step_size, value))
+        data_object.add_test((mode, start_index, step_size, value))
         return 
     elif mode == 'fib':
         all_indices_thesis = np.arange(0,thesis.size)
@@ -213,7 +491,7 @@ def fill_tests(data_object, thesis, start_index, step_size, value, mode = 'const
                     else:
                         if positions==index+(2*i):
                             positions = np.asarray([])    
-        data_object.positive_tests.append((mode, start_index, step_size, value))
+        data_object.add_test((mode, start_index, step_size, value))
         return 
     else:
         print('ERROR: This mode doesn\'t exist yet.')
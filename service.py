@@ -0,0 +1,444 @@
+#The necessary imports
+import sys
+import json
+import time
+import asyncio
+import os
+import argparse
+import concurrent.futures
+
+import numpy as np
+from classes import *
+from searchstructure import *
+from gen_result import *
+from solution_cache import to_json
+
+"""
+Solves series sent as JSON lines over a local TCP or Unix socket.
+Each line is one request, the response to it is one line as well, the responses of a connection are in the order of its requests.
+The requests of all connections are gathered into batches (up to batch_size requests, waiting at most latency seconds
+for more) and each batch is solved by bfs and return_solutions in a pool of processes, which are warmed up when they start.
+The number of waiting requests, of batches being solved, of open connections and of unanswered requests per connection
+are bounded: if a bound is reached, the requests are no longer read, thus the clients are slowed down by the socket.
+Request:  {"id": 1, "series": [1, 2, 4, 7, 11, null], "masked": [5],
+           "tests": [...], "cons_tests": [...], "elem_tests": [...], "timeout_s": 0.5, "max_candidates": 10000, "chains": false}
+          only series is needed, masked defaults to the positions which are null (or the last position),
+          the tests default to the ones of bfs.
+Response: {"id": 1, "solutions": [[1, 2, 4, 7, 11, 16]], "multiplicity": [2], "complete": true, "reason": null,
+           "error": null, "timing": {"queued_ms": ..., "solve_ms": ..., "batch_ms": ..., "total_ms": ..., "batch_size": ...}}
+          np.nan is written as null, rule_chains are added if the request asks for chains.
+          An incomplete search without soloutions answers its best candidates instead, "candidates": [[1, 2, 4, 7, 11, null]].
+          A request which isn't a JSON object or whose series isn't a list of numbers and nulls is answered with an error.
+          A line longer than LINE_LIMIT is answered with an error and the connection is closed.
+Usage:
+    python -m service --port 8765 --workers 4
+    python -m service --port 8765 --client < requests.jsonl
+    responses = solve_remote([{'series': [1, 2, 4, 7, 11, None]}], port = 8765)
+"""
+
+PORT         = 8765
+LINE_LIMIT   = 2**20
+WARM_UP      = [1., 2., 4., 7., 11., 16., 22.]
+
+"""
+Solving (in the processes of the pool)
+"""
+def to_values(series):
+    """
+    to_values(series)
+    The series as a list of python floats, np.nan as None (JSON has no nan).
+    """
+    return [None if np.isnan(value) else float(value) for value in series]
+
+def json_type(value):
+    """
+    json_type(value)
+    The name of the JSON type of a value read from JSON.
+    """
+    names = {bool: 'boolean', int: 'number', float: 'number', str: 'string', list: 'list', dict: 'object'}
+    return 'null' if value is None else names.get(type(value), type(value).__name__)
+
+def check_request(request):
+    """
+    check_request(request)
+    Raises a ValueError naming the problem if the request (dict read from JSON) can't be solved:
+    series has to be a non-empty list of numbers and nulls, masked (if given) a list of positions in it.
+    """
+    series = request.get('series')
+    if not isinstance(series, list) or len(series) == 0:
+        raise ValueError('series has to be a non-empty JSON list of numbers and nulls, not %s'
+                         % ('an empty list' if isinstance(series, list) else 'a '+json_type(series)))
+    for value in series:
+        if (value is not None) and (isinstance(value, bool) or not isinstance(value, (int, float))):
+            raise ValueError('series has to be a JSON list of numbers and nulls, it contains a %s' % json_type(value))
+    positions = request.get('masked')
+    if positions is not None:
+        if not (isinstance(positions, list) and all(isinstance(position, int) and not isinstance(position, bool)
+                                                    and 0 <= position < len(series) for position in positions)):
+            raise ValueError('masked has to be a JSON list of positions in series (0 to %d)' % (len(series)-1))
+    pass
+
+def request_data(request):
+    """
+    request_data(request)
+    Input: a request (dict read from JSON)
+    Output: the data object to solve, the series with null as np.nan masked at the requested positions.
+    Raises a ValueError if the request is invalid (compare `check_request´).
+    """
+    check_request(request)
+    series    = np.asarray([np.nan if value is None else value for value in request['series']], dtype='float64')
+    positions = request.get('masked')
+    if positions is None:
+        positions = np.nonzero(np.isnan(series))[0]
+        if positions.size == 0:
+            positions = [series.size-1]
+    return data(np.asarray(positions, dtype='int64'), series, None, None, None)
+
+def solve_request(request, timeout_s = None):
+    """
+    solve_request(request, timeout_s = None)
+    Input: a request and the timeout used if the request doesn't give one.
+    Output: the response without its id and timing.
+    A search which hits its budget (compare `bfs´) is incomplete, its soloutions are returned if it found some,
+    otherwise its best candidates (the positions still unknown as np.nan, compare `budget_result´) are returned as candidates.
+    """
+    data_object = request_data(request)
+    output      = bfs(data_object, tests = request.get('tests', ['const','sum','fac','fib']),
+                      cons_tests = request.get('cons_tests', []),
+                      elem_tests = request.get('elem_tests', ['prime','cube','square']),
+                      timeout_s = request.get('timeout_s', timeout_s), max_candidates = request.get('max_candidates'),
+                      verbose = False)
+    response    = {'solutions': [], 'multiplicity': [], 'complete': True, 'reason': None, 'error': None}
+    if isinstance(output, incomplete_result):
+        response['complete'] = False
+        response['reason']   = output.reason
+        if not all(np.isnan(candidate.series).sum() == 0 for candidate in output):
+            response['candidates'] = [to_values(candidate.series) for candidate in return_solutions(output)]
+            return response
+    if np.any(output) != 0:
+        soloutions               = return_solutions(output)
+        response['solutions']    = [to_values(soloution.series) for soloution in soloutions]
+        response['multiplicity'] = [soloution.multiplicity for soloution in soloutions]
+        if request.get('chains', False):
+            response['rule_chains'] = [soloution.rule_chains for soloution in soloutions]
+    return response
+
+def solve_batch(requests, timeout_s = None):
+    """
+    solve_batch(requests, timeout_s = None)
+    Input: a list of requests
+    Output: the list of their responses, each one with the seconds its search took (solve_s).
+    An invalid request gets a response with the error instead of stopping the batch.
+    """
+    responses = []
+    for request in requests:
+        started = time.perf_counter()
+        try:
+            response = solve_request(request, timeout_s)
+        except Exception as error:
+            response = {'solutions': [], 'multiplicity': [], 'complete': False, 'reason': None,
+                        'error': type(error).__name__+': '+str(error)}
+        response['solve_s'] = time.perf_counter()-started
+        responses.append(response)
+    return responses
+
+def warm_up():
+    """
+    warm_up()
+    Solves a series with all tests, thus the numba kernels of a new process are compiled before the first batch arrives.
+    """
+    for positions in ([len(WARM_UP)-1], [1, len(WARM_UP)-2]):
+        solve_request({'series': WARM_UP, 'masked': positions, 'cons_tests': ['const','sum','fac']})
+    pass
+
+"""
+The service
+"""
+class solving_service:
+    """
+    contains:   __init__(self, workers = None, batch_size = 64, latency = 0.002, max_pending = 4096,
+                         max_batches = None, max_connections = 256, max_outstanding = 1024, timeout_s = None)
+                start(self, host = '127.0.0.1', port = PORT, path = None)
+                serve_forever(self)
+                close(self)
+    workers -> processes solving the batches (default: all cores), 0 solves them in a thread of this process
+    batch_size, latency -> a batch is dispatched when it has batch_size requests or latency seconds after its first request
+    max_pending -> requests waiting for a batch, max_batches -> batches solved at a time (default: 2 per process)
+    max_connections -> open connections, max_outstanding -> unanswered requests per connection
+    timeout_s -> the timeout of a search if the request doesn't give one
+    """
+    def __init__(self, workers = None, batch_size = 64, latency = 0.002, max_pending = 4096, max_batches = None,
+                 max_connections = 256, max_outstanding = 1024, timeout_s = None):
+        self.workers         = workers
+        self.batch_size      = batch_size
+        self.latency         = latency
+        self.max_pending     = max_pending
+        self.max_batches     = max_batches
+        self.max_connections = max_connections
+        self.max_outstanding = max_outstanding
+        self.timeout_s       = timeout_s
+        self.pool            = None
+        self.server          = None
+        self.batcher         = None
+        self.pending         = None
+        self.batches         = None
+        self.connections     = None
+        self.running         = set()
+        pass
+
+    async def start(self, host = '127.0.0.1', port = PORT, path = None):
+        """
+        start(self, host = '127.0.0.1', port = PORT, path = None)
+        Starts the pool (and warms up its processes) and listens on host:port, or on the Unix socket at path if given.
+        """
+        loop = asyncio.get_running_loop()
+        if self.workers == 0:
+            self.pool = concurrent.futures.ThreadPoolExecutor(max_workers = 1, initializer = warm_up)
+            workers   = 1
+        else:
+            workers   = self.workers if self.workers is not None else os.cpu_count()
+            self.pool = concurrent.futures.ProcessPoolExecutor(max_workers = workers, initializer = warm_up)
+        # the processes start (and warm up) before the first request
+        await asyncio.gather(*[loop.run_in_executor(self.pool, time.sleep, 0.) for worker in range(workers)])
+        self.pending     = asyncio.Queue(maxsize = self.max_pending)
+        self.batches     = asyncio.Semaphore(self.max_batches if self.max_batches is not None else 2*workers)
+        self.connections = asyncio.Semaphore(self.max_connections)
+        self.batcher     = asyncio.create_task(self.gather_batches())
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self.handle_connection, path = path, limit = LINE_LIMIT)
+        else:
+            self.server = await asyncio.start_server(self.handle_connection, host, port, limit = LINE_LIMIT)
+        return self.server
+
+    async def serve_forever(self):
+        async with self.server:
+            await self.server.serve_forever()
+        pass
+
+    async def close(self):
+        """
+        close(self)
+        Stops listening, the batches being solved are finished, then the pool is shut down.
+        """
+        self.server.close()
+        await self.server.wait_closed()
+        self.batcher.cancel()
+        if len(self.running) != 0:
+            await asyncio.gather(*self.running, return_exceptions = True)
+        self.pool.shutdown(wait = True)
+        pass
+
+    async def gather_batches(self):
+        """
+        gather_batches(self)
+        Takes the waiting requests in batches and dispatches them, as long as fewer than max_batches are being solved.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.batches.acquire()
+            batch    = [await self.pending.get()]
+            deadline = loop.time()+self.latency
+            while len(batch) < self.batch_size:
+                if self.pending.empty():
+                    timeout = deadline-loop.time()
+                    if timeout <= 0.:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self.pending.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    batch.append(self.pending.get_nowait())
+            task = asyncio.create_task(self.solve(batch))
+            self.running.add(task)
+            task.add_done_callback(self.running.discard)
+        pass
+
+    async def solve(self, batch):
+        """
+        solve(self, batch)
+        Solves a batch of (request, future, time received) in the pool and sets the futures to the responses.
+        """
+        loop       = asyncio.get_running_loop()
+        dispatched = time.perf_counter()
+        try:
+            responses = await loop.run_in_executor(self.pool, solve_batch, [request for request, future, received in batch],
+                                                   self.timeout_s)
+        except Exception as error:
+            responses = [{'solutions': [], 'multiplicity': [], 'complete': False, 'reason': None, 'solve_s': 0.,
+                          'error': type(error).__name__+': '+str(error)}]*len(batch)
+        finally:
+            self.batches.release()
+        returned = time.perf_counter()
+        for (request, future, received), response in zip(batch, responses):
+            response           = dict(response)
+            response['timing'] = {'queued_ms': 1e3*(dispatched-received), 'solve_ms': 1e3*response.pop('solve_s'),
+                                  'batch_ms': 1e3*(returned-dispatched), 'total_ms': 1e3*(returned-received),
+                                  'batch_size': len(batch)}
+            if not future.done():
+                future.set_result(response)
+        pass
+
+    async def handle_connection(self, reader, writer):
+        """
+        handle_connection(self, reader, writer)
+        Reads the requests of a connection and queues them, the responses are written in the same order by write_responses.
+        """
+        async with self.connections:
+            loop        = asyncio.get_running_loop()
+            outstanding = asyncio.Semaphore(self.max_outstanding)
+            responses   = asyncio.Queue()
+            responder   = asyncio.create_task(self.write_responses(writer, responses, outstanding))
+            try:
+                while True:
+                    try:
+                        line = await reader.readline()
+                    except (ValueError, asyncio.LimitOverrunError):
+                        await outstanding.acquire()
+                        future = loop.create_future()
+                        future.set_result({'id': None, 'solutions': [], 'multiplicity': [], 'complete': False,
+                                           'reason': None, 'timing': None,
+                                           'error': 'invalid request: the line is longer than %d bytes' % LINE_LIMIT})
+                        await responses.put((None, future))
+                        break
+                    if len(line) == 0:
+                        break
+                    if len(line.strip()) == 0:
+                        continue
+                    await outstanding.acquire()
+                    received = time.perf_counter()
+                    future   = loop.create_future()
+                    request  = None
+                    try:
+                        request = json.loads(line)
+                        if not isinstance(request, dict):
+                            raise ValueError('a request has to be a JSON object')
+                        check_request(request)
+                    except ValueError as error:
+                        identifier = request.get('id') if isinstance(request, dict) else None
+                        future.set_result({'id': identifier, 'solutions': [], 'multiplicity': [], 'complete': False,
+                                           'reason': None, 'error': 'invalid request: '+str(error), 'timing': None})
+                        await responses.put((identifier, future))
+                        continue
+                    await responses.put((request.get('id'), future))
+                    await self.pending.put((request, future, received))
+            except ConnectionError:
+                pass
+            await responses.put(None)
+            await responder
+        pass
+
+    async def write_responses(self, writer, responses, outstanding):
+        """
+        write_responses(self, writer, responses, outstanding)
+        Writes the response of each request of a connection as soon as it and all requests before it are solved.
+        """
+        try:
+            while True:
+                entry = await responses.get()
+                if entry is None:
+                    break
+                identifier, future = entry
+                response           = await future
+                response['id']     = identifier
+                writer.write(json.dumps(response, default = to_json).encode()+b'\n')
+                outstanding.release()
+                if responses.empty():
+                    await writer.drain()
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+        pass
+
+"""
+The local client
+"""
+async def request_lines(requests, host = '127.0.0.1', port = PORT, path = None, window = 1024):
+    """
+    request_lines(requests, host = '127.0.0.1', port = PORT, path = None, window = 1024)
+    Input: an iterable of requests (dicts, or lines of JSON sent as they are) and the address of the service.
+    Output: the list of the responses, in the order of the requests.
+    At most window requests are sent ahead of the responses.
+    """
+    if path is not None:
+        reader, writer = await asyncio.open_unix_connection(path, limit = LINE_LIMIT)
+    else:
+        reader, writer = await asyncio.open_connection(host, port, limit = LINE_LIMIT)
+    window    = asyncio.Semaphore(window)
+    responses = []
+    async def send():
+        try:
+            for request in requests:
+                if isinstance(request, str):
+                    line = request.strip()
+                    if len(line) == 0:
+                        continue
+                else:
+                    line = json.dumps(request, default = to_json)
+                await window.acquire()
+                writer.write(line.encode()+b'\n')
+                await writer.drain()
+        finally:
+            writer.write_eof()
+        pass
+    sender = asyncio.create_task(send())
+    while True:
+        line = await reader.readline()
+        if len(line) == 0:
+            break
+        responses.append(json.loads(line))
+        window.release()
+    await sender
+    writer.close()
+    return responses
+
+def solve_remote(requests, host = '127.0.0.1', port = PORT, path = None, window = 1024):
+    """
+    solve_remote(requests, host = '127.0.0.1', port = PORT, path = None, window = 1024)
+    request_lines for code without an event loop.
+    """
+    return asyncio.run(request_lines(requests, host, port, path, window))
+
+async def serve(service, host = '127.0.0.1', port = PORT, path = None):
+    await service.start(host, port, path)
+    print('Serving on', path if path is not None else host+':'+str(port))
+    try:
+        await service.serve_forever()
+    finally:
+        await service.close()
+    pass
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Solves series sent as JSON lines over a local socket.')
+    parser.add_argument('--host', default = '127.0.0.1', help = 'host to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type = int, default = PORT, help = 'port to listen on (default: %d)' % PORT)
+    parser.add_argument('--unix', default = None, help = 'listen on this Unix socket instead')
+    parser.add_argument('--workers', type = int, default = None, help = 'number of processes (default: all cores)')
+    parser.add_argument('--batch-size', type = int, default = 64, help = 'requests per batch (default: 64)')
+    parser.add_argument('--latency-ms', type = float, default = 2., help = 'waiting time for a batch to fill (default: 2)')
+    parser.add_argument('--max-pending', type = int, default = 4096, help = 'requests waiting for a batch (default: 4096)')
+    parser.add_argument('--max-batches', type = int, default = None,
+                        help = 'batches solved at a time (default: 2 per process)')
+    parser.add_argument('--max-connections', type = int, default = 256, help = 'open connections (default: 256)')
+    parser.add_argument('--max-outstanding', type = int, default = 1024,
+                        help = 'unanswered requests per connection (default: 1024)')
+    parser.add_argument('--timeout', type = float, default = None, help = 'seconds per search (default: unbounded)')
+    parser.add_argument('--client', action = 'store_true',
+                        help = 'send the requests read from stdin to the service and print the responses')
+    args = parser.parse_args(argv)
+    if args.client:
+        for response in solve_remote(sys.stdin, args.host, args.port, args.unix):
+            print(json.dumps(response))
+        return
+    service = solving_service(args.workers, args.batch_size, args.latency_ms/1e3, args.max_pending, args.max_batches,
+                              args.max_connections, args.max_outstanding, args.timeout)
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+#The necessary imports
+import json
+import time
+import sqlite3
+import hashlib
+import numpy as np
+from classes import *
+from searchstructure import *
+from gen_result import *
+
+"""
+A persistent cache of the solutions found by the search, kept in a SQLite file.
+The key of an entry is a hash of the masked series (the positions of the np.nans included) and of the tests,
+its value are the soloutions of `return_solutions´: the completed series, their multiplicity and their rule chains.
+The file holds at most max_entries entries, the least recently used ones get evicted.
+Usage:
+    with solution_cache('solutions.sqlite') as cache:
+        solutions, multiplicity, chains = solve(data_object, cache)
+"""
+
+#the layout of the stored values, entries of an older layout are never hit
+FORMAT = 2
+
+"""
+The Helpers of the cache
+"""
+def canonical_series(series):
+    """
+    canonical_series(series)
+    The bytes of the series as float64, every np.nan is replaced by the same np.nan and -0. by 0.
+    """
+    series = np.array(series, dtype='float64')
+    series[np.isnan(series)] = np.nan
+    series[series == 0.]     = 0.
+    return series.tobytes()
+
+def cache_key(data_object, tests, cons_tests, elem_tests, mode = 'offline', max_depth = 3):
+    """
+    cache_key(data_object, tests, cons_tests, elem_tests, mode = 'offline', max_depth = 3)
+    The hash (hex string) identifying a search: the masked series of the data object and the configuration of the search.
+    """
+    configuration = json.dumps({'tests': list(tests), 'cons_tests': list(cons_tests), 'elem_tests': list(elem_tests),
+                                'mode': mode, 'max_depth': max_depth, 'format': FORMAT}, sort_keys = True)
+    key = hashlib.sha256(canonical_series(data_object.series))
+    key.update(configuration.encode())
+    return key.hexdigest()
+
+def to_json(value):
+    """
+    to_json(value)
+    Converts the np arrays and np numbers in rules to lists and python numbers (used by json.dumps).
+    """
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError('Object of type '+type(value).__name__+' is not JSON serializable')
+
+def to_tuples(value):
+    """
+    to_tuples(value)
+    Turns the lists read by json.loads back into tuples (the rules and rule chains are tuples).
+    """
+    if isinstance(value, list):
+        return tuple(to_tuples(element) for element in value)
+    return value
+
+"""
+The cache
+"""
+class solution_cache:
+    """
+    solution_cache(path = 'solutions.sqlite', max_entries = 100000)
+    A size-bounded LRU cache of solutions in the SQLite file at path.
+    hits and misses count the lookups of this instance.
+    entries is the number of entries as counted by this instance (updated on insert and eviction),
+    it gets counted again every recount_every inserts, as other processes can share the file.
+    """
+    def __init__(self, path = 'solutions.sqlite', max_entries = 100000):
+        self.path          = path
+        self.max_entries   = max_entries
+        self.hits          = 0
+        self.misses        = 0
+        self.inserts       = 0
+        self.recount_every = max(1000, max_entries//10)
+        self.connection    = sqlite3.connect(path, timeout = 60.)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS solutions '
+                                '(key TEXT PRIMARY KEY, value TEXT NOT NULL, last_used INTEGER NOT NULL)')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS solutions_last_used ON solutions (last_used)')
+        self.connection.commit()
+        self.entries       = len(self)
+        pass
+
+    def get(self, key):
+        """
+        get(self, key)
+        Output: the solutions (list of np arrays), their multiplicities and their rule chains stored under the key,
+                None if there are none (a miss).
+        """
+        row = self.connection.execute('SELECT value FROM solutions WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        with self.connection:
+            self.connection.execute('UPDATE solutions SET last_used = ? WHERE key = ?', (time.time_ns(), key))
+        value = json.loads(row[0])
+        return ([np.asarray(series, dtype='float64') for series in value['solutions']], value['multiplicity'],
+                list(to_tuples(value['chains'])))
+
+    def put(self, key, solutions, multiplicity, chains):
+        """
+        put(self, key, solutions, multiplicity, chains)
+        Stores the solutions (np arrays), their multiplicities and their rule chains under the key,
+        then evicts the least recently used entries above max_entries (by the running count, compare `entries´).
+        """
+        value = json.dumps({'solutions': [np.asarray(series, dtype='float64').tolist() for series in solutions],
+                            'multiplicity': list(multiplicity), 'chains': chains}, default = to_json)
+        with self.connection:
+            inserted = self.connection.execute('INSERT OR IGNORE INTO solutions (key, value, last_used) VALUES (?, ?, ?)',
+                                               (key, value, time.time_ns())).rowcount
+            if inserted == 1:
+                self.entries += 1
+                self.inserts += 1
+                if self.inserts % self.recount_every == 0:
+                    self.entries = len(self)
+            else:
+                self.connection.execute('UPDATE solutions SET value = ?, last_used = ? WHERE key = ?',
+                                        (value, time.time_ns(), key))
+            surplus = self.entries - self.max_entries
+            if surplus > 0:
+                self.entries -= self.connection.execute('DELETE FROM solutions WHERE key IN '
+                                                        '(SELECT key FROM solutions ORDER BY last_used LIMIT ?)',
+                                                        (surplus,)).rowcount
+        pass
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM solutions').fetchone()[0]
+
+    def stats(self):
+        """
+        stats(self)
+        Output: a dict of the hits, the misses, the hit rate and the number of entries.
+        """
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits/lookups if lookups != 0 else 0.,
+                'entries': len(self)}
+
+    def clear(self):
+        """
+        clear(self)
+        Removes all entries.
+        """
+        with self.connection:
+            self.connection.execute('DELETE FROM solutions')
+        self.entries = 0
+        pass
+
+    def close(self):
+        self.connection.close()
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+        return False
+
+"""
+Performs the search through the cache
+"""
+def solve(data_object, cache = None, tests = ['const','sum','fac','fib'], cons_tests = [], elem_tests = ['prime','cube','square'], mode = 'offline', database = None, max_depth = 3):
+    """
+    solve(data_object, cache = None, tests, cons_tests, elem_tests, mode, database, max_depth = 3)
+    Input: a data object, a solution_cache (or None) and the configuration of the search (compare `search´).
+    Output: the soloutions of `return_solutions´ as three lists: their series (np arrays), their multiplicities
+            and their rule chains (a tuple of rule chains per soloution, compare `rule_chains´).
+    If the cache knows the masked series and the configuration, its entry is returned,
+    else the search is performed and its result is stored (also if there is no solution),
+    thus a hit returns the same as search and return_solutions.
+    """
+    if cache is not None:
+        key   = cache_key(data_object, tests, cons_tests, elem_tests, mode, max_depth)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+    solutions    = []
+    multiplicity = []
+    chains       = []
+    output       = search(data_object, tests, cons_tests, elem_tests, mode, database, max_depth = max_depth, verbose = False)
+    if np.any(output) != 0:
+        for soloution in return_solutions(output):
+            solutions.append(soloution.series)
+            multiplicity.append(soloution.multiplicity)
+            chains.append(soloution.rule_chains)
+    if cache is not None:
+        cache.put(key, solutions, multiplicity, chains)
+    return solutions, multiplicity, chains
@@ -0,0 +1,212 @@
+#The necessary imports
+import os
+import argparse
+
+import numpy as np
+from classes import *
+from evaluate import FAMILIES, family_path
+
+"""
+Generates series of the eight families of the construction table (construction_table.png) instead of reading test sets.
+Each family is generated for a whole chunk of series at once, as a np array (rows, length),
+the parameters of each row are drawn from a np random generator.
+The chunks are seeded by (seed, family, number of the chunk), thus a run can be repeated
+and any chunk can be generated on its own (e.g. in another process).
+Usage:
+    for first_row, series in iter_family('fibonacci', 10**7, 10, chunk_rows = 10**5):
+        ...
+    for data_object in iter_data('arithmetic', 1000, 10, masked = 2):
+        output = bfs(data_object, verbose = False)
+"""
+
+"""
+The parameters of the series
+start values, c, c1, c2 -> integers in [-PARAMETER_RANGE, PARAMETER_RANGE]
+f1 of the geometric series -> integers with 2 <= |f1| <= FACTOR_RANGE, f1 and f2 of the others in [-FACTOR_RANGE, FACTOR_RANGE]
+The values stay exact (integers below 2**53) as long as FACTOR_RANGE**length does.
+"""
+PARAMETER_RANGE = 20
+FACTOR_RANGE    = 3
+
+def integers(rng, rows, low = -PARAMETER_RANGE, high = PARAMETER_RANGE):
+    return rng.integers(low, high+1, size = (rows,1)).astype('float64')
+
+def factors(rng, rows):
+    """
+    factors(rng, rows)
+    Factors of geometric series, neither 0, 1 nor -1.
+    """
+    return rng.integers(2, FACTOR_RANGE+1, size = (rows,1))*rng.choice([-1., 1.], size = (rows,1))
+
+"""
+The families
+Each function gets a np random generator, the number of rows and the length of the series,
+the rules are the ones of the construction table (with a_0 as the first element).
+"""
+def arithmetic(rng, rows, length):
+    """
+    a_i = a_{i-1} + c
+    """
+    return integers(rng, rows)+integers(rng, rows)*np.arange(length)
+
+def geometric(rng, rows, length):
+    """
+    a_i = f1 * a_{i-1}, a_0 != 0
+    """
+    start = integers(rng, rows, 1, PARAMETER_RANGE)*rng.choice([-1., 1.], size = (rows,1))
+    return start*factors(rng, rows)**np.arange(length)
+
+def arithmetic_geometric(rng, rows, length):
+    """
+    a_i = f1 * a_{i-1} + c, i.e. a_i = f1**i * a_0 + c * (1 + f1 + ... + f1**(i-1))
+    """
+    start, f1, c = integers(rng, rows), integers(rng, rows, -FACTOR_RANGE, FACTOR_RANGE), integers(rng, rows)
+    powers       = f1**np.arange(length)
+    return powers*start+c*(np.cumsum(powers, axis=1)-powers)
+
+def arithmetic_geometric_two(rng, rows, length):
+    """
+    a_i = f1 * a_{i-1} + f2 * a_{i-2} + c
+    The recursion is evaluated column by column, each step for all rows at once.
+    """
+    series        = np.empty((rows, max(length, 2)))
+    series[:,0:1] = integers(rng, rows)
+    series[:,1:2] = integers(rng, rows)
+    f1            = integers(rng, rows, -FACTOR_RANGE, FACTOR_RANGE)[:,0]
+    f2            = integers(rng, rows, -FACTOR_RANGE, FACTOR_RANGE)[:,0]
+    c             = integers(rng, rows)[:,0]
+    for column in range(2, length):
+        series[:,column] = f1*series[:,column-1]+f2*series[:,column-2]+c
+    return series[:,:length]
+
+def fibonacci(rng, rows, length):
+    """
+    a_0 = a, a_1 = b, a_i = a_{i-1} + a_{i-2}, i.e. a_i = F_{i-1} * a + F_i * b with the Fibonacci numbers F (F_{-1} = 1).
+    """
+    numbers = np.empty(length+1)
+    numbers[:2] = 1., 0.
+    for index in range(2, length+1):
+        numbers[index] = numbers[index-1]+numbers[index-2]
+    return integers(rng, rows)*numbers[:-1]+integers(rng, rows)*numbers[1:]
+
+def arithmetic_alternating(rng, rows, length):
+    """
+    a_{2k} = a_{2k-2} + c1, a_{2k+1} = a_{2k-1} + c2
+    """
+    positions = np.arange(length)
+    even, odd = integers(rng, rows)+integers(rng, rows)*(positions//2), integers(rng, rows)+integers(rng, rows)*(positions//2)
+    return np.where(positions % 2 == 0, even, odd)
+
+def arithmetic_irrelevant(rng, rows, length):
+    """
+    a_{2k} = a_{2k-2} + c, a_{2k+1} = a_{2k-1} (the irrelevant number)
+    """
+    positions = np.arange(length)
+    even, odd = integers(rng, rows)+integers(rng, rows)*(positions//2), integers(rng, rows)
+    return np.where(positions % 2 == 0, even, odd)
+
+def arithmetic_incremental(rng, rows, length):
+    """
+    a_i = a_{i-1} + i * c, i.e. a_i = a_0 + c * i*(i+1)/2
+    """
+    positions = np.arange(length)
+    return integers(rng, rows)+integers(rng, rows)*(positions*(positions+1)//2)
+
+GENERATORS = {'arithmetic':               arithmetic,
+              'geometric':                geometric,
+              'arithmetic_geometric':     arithmetic_geometric,
+              'arithmetic_geometric_two': arithmetic_geometric_two,
+              'fibonacci':                fibonacci,
+              'arithmetic_alternating':   arithmetic_alternating,
+              'arithmetic_irrelevant':    arithmetic_irrelevant,
+              'arithmetic_incremental':   arithmetic_incremental}
+
+"""
+Generating and streaming the series
+"""
+def family_rng(family, seed = 0, chunk = 0):
+    """
+    family_rng(family, seed = 0, chunk = 0)
+    The np random generator of a chunk of a family.
+    """
+    return np.random.default_rng([seed, list(GENERATORS).index(family), chunk])
+
+def generate_family(family, rows, length, rng):
+    """
+    generate_family(family, rows, length, rng)
+    Output: rows series of the given length of the family (np array (rows, length), dtype float).
+    """
+    if family not in GENERATORS:
+        print('ERROR: This family doesn\'t exist yet.')
+        return None
+    return GENERATORS[family](rng, rows, length)
+
+def iter_family(family, rows, length, chunk_rows = 100000, seed = 0):
+    """
+    iter_family(family, rows, length, chunk_rows = 100000, seed = 0)
+    Streams rows series of the family, chunk_rows at a time (compare `loader.iter_series´).
+    Yields the number of the first row and the next chunk as a np array.
+    The series depend on the seed and on chunk_rows.
+    """
+    for chunk, first_row in enumerate(range(0, rows, chunk_rows)):
+        yield first_row, generate_family(family, min(chunk_rows, rows-first_row), length, family_rng(family, seed, chunk))
+
+"""
+The masked positions (the scenarios of perform_test_bfs_2 in testingground.ipynb)
+"""
+def masked_positions_rows(rows, length, masked, rng, replace = False):
+    """
+    masked_positions_rows(rows, length, masked, rng, replace = False)
+    The positions to predict for each of the rows (np array (rows, masked), (rows, 1) for masked = 0):
+    the last position for masked = 0, otherwise masked positions drawn at random,
+    distinct ones (rng.choice(..., replace = False)) or, with replace, positions which can be drawn several times
+    (rng.integers).
+    """
+    if masked == 0:
+        return np.full((rows,1), length-1)
+    if replace:
+        return rng.integers(0, length, size = (rows, masked))
+    return np.argsort(rng.random((rows, length)), axis=1)[:,:masked]
+
+def iter_data(family, rows, length, masked = 0, replace = False, chunk_rows = 100000, seed = 0):
+    """
+    iter_data(family, rows, length, masked = 0, replace = False, chunk_rows = 100000, seed = 0)
+    Streams the series of iter_family as data objects with masked positions (compare `masked_positions_rows´),
+    ready for bfs.
+    """
+    for chunk, (first_row, series) in enumerate(iter_family(family, rows, length, chunk_rows, seed)):
+        rng       = np.random.default_rng([seed, list(GENERATORS).index(family), chunk, masked, int(replace)])
+        positions = masked_positions_rows(series.shape[0], length, masked, rng, replace)
+        for truth, pos in zip(series, positions):
+            yield data(pos, truth, None, None, None)
+
+"""
+Writing test sets
+"""
+def write_family(directory, family, rows, length, chunk_rows = 100000, seed = 0):
+    """
+    write_family(directory, family, rows, length, chunk_rows = 100000, seed = 0)
+    Writes rows series of the family as directory/batchseq_<family>.csv in the format of the test sets
+    (an index column followed by the series), thus evaluate.py can run on them.
+    """
+    with open(family_path(directory, family), 'w') as file:
+        for first_row, series in iter_family(family, rows, length, chunk_rows, seed):
+            index = np.arange(first_row, first_row+series.shape[0])[:,None]
+            np.savetxt(file, np.hstack((index, series)), delimiter = ',', fmt = '%.17g')
+    pass
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Writes synthetic test sets of the eight families.')
+    parser.add_argument('directory', help = 'directory to write the batchseq_*.csv test sets to')
+    parser.add_argument('--rows', type = int, default = 1000, help = 'series per family (default: 1000)')
+    parser.add_argument('--length', type = int, default = 10, help = 'length of the series (default: 10)')
+    parser.add_argument('--chunk-rows', type = int, default = 100000, help = 'series generated at a time (default: 100000)')
+    parser.add_argument('--seed', type = int, default = 0, help = 'seed of the series (default: 0)')
+    args = parser.parse_args(argv)
+    os.makedirs(args.directory, exist_ok = True)
+    for family, name in FAMILIES:
+        write_family(args.directory, family, args.rows, args.length, args.chunk_rows, args.seed)
+    pass
+
+if __name__ == '__main__':
+    main()
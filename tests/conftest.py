@@ -0,0 +1,8 @@
+#The necessary imports
+import os
+import sys
+
+"""
+The modules of the solver are the files in the directory above, the tests import them from there.
+"""
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,43 @@
+#The necessary imports
+import numpy as np
+
+from searchstructure import bfs_batch
+from test_solutions import PINNED
+
+"""
+bfs_batch has to give every row the soloutions of bfs and return_solutions.
+"""
+def batch_of(length, elem_tests):
+    cases  = [case for case in PINNED if len(case[0]) == length and case[2] == elem_tests]
+    series = np.asarray([case[0] for case in cases])
+    mask   = np.full(series.shape, False)
+    for row, case in enumerate(cases):
+        mask[row, case[1]] = True
+    return cases, series, mask
+
+def test_batch_returns_all_soloutions_of_each_row():
+    for length in (7, 10):
+        cases, series, mask = batch_of(length, [])
+        filled, solved, soloutions = bfs_batch(series, mask)
+        for row, case in enumerate(cases):
+            expected = np.asarray(case[3]).reshape(-1, length)
+            assert solved[row] == (len(case[3]) != 0)
+            np.testing.assert_allclose(soloutions[row], expected)
+            if solved[row]:
+                np.testing.assert_allclose(filled[row], expected[0])
+
+def test_batch_solves_rows_without_bfs():
+    series = np.asarray([[1., 2., 4., 7., 11., 16.], [2., 6., 18., 54., 162., 486.], [3., 5., 7., 9., 11., 13.]])
+    mask   = np.full(series.shape, False)
+    mask[:, -1] = True
+    filled, solved, soloutions = bfs_batch(series, mask, fallback = False)
+    assert solved.all()
+    np.testing.assert_allclose(filled, series)
+    assert [len(row) for row in soloutions] == [1, 1, 1]
+
+def test_batch_gives_rows_with_elementwise_tests_to_bfs():
+    cases, series, mask = batch_of(7, ['prime','cube','square'])
+    filled, solved, soloutions = bfs_batch(series, mask, elem_tests = ['prime','cube','square'], fallback = False)
+    assert not solved.any()
+    filled, solved, soloutions = bfs_batch(series, mask, elem_tests = ['prime','cube','square'])
+    np.testing.assert_allclose(soloutions[0], cases[0][3])
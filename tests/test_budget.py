@@ -0,0 +1,53 @@
+#The necessary imports
+import threading
+import numpy as np
+
+from classes import data, cancel_token, search_budget, incomplete_result
+from searchstructure import bfs, budget_result
+
+"""
+A search bounded by time, candidates or a cancel token returns the best candidates found so far.
+"""
+SERIES = np.asarray([1., 2., 4., 7., 11., 16., 22., 29., 37., 46., 56.])
+
+def masked(positions):
+    return data(np.asarray(positions, dtype='int64'), SERIES, None, None, None)
+
+def test_cancelled_search_returns_its_candidates():
+    token  = cancel_token()
+    thread = threading.Thread(target = token.cancel)
+    thread.start()
+    thread.join()
+    output = bfs(masked([10]), cancel = token, verbose = False)
+    assert isinstance(output, incomplete_result)
+    assert output.reason == 'cancelled'
+    np.testing.assert_array_equal(output[0].series[:10], SERIES[:10])
+    assert np.isnan(output[0].series[10])
+
+def test_timeout_and_max_candidates_stop_the_search():
+    output = bfs(masked([10]), timeout_s = 0., verbose = False)
+    assert isinstance(output, incomplete_result) and output.reason == 'timeout'
+    output = bfs(masked([3, 7, 10]), max_candidates = 2, verbose = False)
+    assert isinstance(output, incomplete_result) and output.reason == 'max_candidates'
+    #the candidates with the fewest positions left to predict
+    assert all(np.isnan(candidate.series).sum() == 3 for candidate in output)
+
+def test_search_within_its_budget_is_complete():
+    bounded   = bfs(masked([10]), timeout_s = 60., max_candidates = 10**6, cancel = cancel_token(), verbose = False)
+    unbounded = bfs(masked([10]), verbose = False)
+    assert not isinstance(bounded, incomplete_result)
+    assert len(bounded) == len(unbounded)
+    for first, second in zip(bounded, unbounded):
+        np.testing.assert_array_equal(first.series, second.series)
+
+def test_exhausted_budget_prefers_soloutions():
+    token  = cancel_token()
+    budget = search_budget(cancel = token)
+    token.cancel()
+    assert budget.exhausted()
+    solved = masked([])
+    masks  = masked([10])
+    output = budget_result(np.asarray([masks, solved]), np.asarray([1, 0]), budget)
+    assert list(output) == [solved] and output.reason == 'cancelled'
+    output = budget_result(np.asarray([masks]), np.asarray([1]), budget)
+    assert list(output) == [masks]
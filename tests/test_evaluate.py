@@ -0,0 +1,29 @@
+#The necessary imports
+import os
+import numpy as np
+import pytest
+
+from evaluate import FAMILIES, family_path, cache_family, score_shard, run
+
+"""
+The shards of evaluate read their rows from the cache of the test sets.
+"""
+def write_test_sets(directory, rows = 6):
+    for family, name in FAMILIES:
+        series = np.arange(rows)[:,None]+np.arange(1., 8.)[None,:]*np.arange(1, rows+1)[:,None]
+        with open(family_path(directory, family), 'w') as file:
+            for number, row in enumerate(series):
+                file.write(','.join([str(number)]+[repr(value) for value in row])+'\n')
+
+def test_shard_solves_its_rows(tmp_path):
+    write_test_sets(str(tmp_path))
+    cache_family(str(tmp_path), 'arithmetic')
+    task = (str(tmp_path), 'arithmetic', None, 0, 2, 5, 0, ['const','sum','fac','fib'], [], [])
+    family, masked, right_answers, answers, seconds = score_shard(task)
+    assert (family, masked, right_answers, answers) == ('arithmetic', 0, 3, 3)
+
+def test_run_fails_if_a_cache_cannot_be_built(tmp_path):
+    write_test_sets(str(tmp_path))
+    os.mkdir(family_path(str(tmp_path), 'geometric')+'.npy')
+    with pytest.raises(OSError):
+        run(str(tmp_path), workers = 1, verbose = False)
@@ -0,0 +1,47 @@
+#The necessary imports
+import numpy as np
+
+from classes import data
+from searchstructure import bfs
+from rule_program import compile_programs
+from incremental import hypothesis, solver_session
+
+"""
+A session searches only when no hypothesis holds for a new term.
+"""
+def test_session_starts_from_no_term():
+    session = solver_session(elem_tests = [])
+    assert np.isnan(session.predict()) and session.searches == 0
+    for value in (3., 5., 7.):
+        session.append(value)
+    assert session.predict() == 9.
+    assert session.append(9.) and session.predict() == 11.
+    assert session.searches == 2
+
+def test_falsified_hypotheses_are_searched_again():
+    session = solver_session([1., 2., 3., 4.], elem_tests = [])
+    assert session.predict() == 5. and session.searches == 1
+    assert not session.append(7.)
+    assert session.searches == 2
+    assert session.series == [1., 2., 3., 4., 7.]
+
+def test_session_predicts_an_alternating_series():
+    session     = solver_session(elem_tests = [])
+    terms       = [1., 10., 2., 20., 3., 30., 4., 40., 5., 50., 6., 60.]
+    predictions = []
+    for value in terms:
+        predictions.append(session.predict())
+        session.append(value)
+    assert predictions[6:] == terms[6:]
+    assert session.searches <= 5
+
+def test_hypothesis_which_does_not_determine_the_new_term_is_falsified():
+    series = np.asarray([1., 10., 2., 20., 3., 30., 4., 40.])
+    output = bfs(data(np.asarray([7]), series, None, None, None), elem_tests = [], verbose = False)
+    #without the rules covering the other positions the next term (of the other subseries) is unknown
+    partial = hypothesis(compile_programs(output[0], ())[0], series.size)
+    assert np.isnan(partial.predict())
+    assert not partial.append(5.)
+    covered = hypothesis(compile_programs(output[0])[0], series.size)
+    assert covered.predict() == 5.
+    assert covered.append(5.) and not covered.append(51.)
@@ -0,0 +1,67 @@
+#The necessary imports
+import os
+import numpy as np
+import pytest
+
+from loader import cache_paths, cache_is_valid, load_series, iter_series
+
+"""
+The .npy cache of a csv file has to be rebuilt whenever the csv file changes.
+"""
+def write_csv(path, rows):
+    with open(path, 'w') as file:
+        for number, row in enumerate(rows):
+            file.write(','.join([str(number)]+['' if np.isnan(value) else repr(value) for value in row])+'\n')
+
+def test_cache_is_built_and_used(tmp_path):
+    path = str(tmp_path/'batchseq_test.csv')
+    rows = [[1., 2., 3.], [4., np.nan, 6.]]
+    write_csv(path, rows)
+    np.testing.assert_array_equal(load_series(path, cache = False), rows)
+    assert not os.path.exists(cache_paths(path)[0])
+    np.testing.assert_array_equal(load_series(path), rows)
+    assert cache_is_valid(path)
+    np.testing.assert_array_equal(load_series(path, length = 2), [[1., 2.], [4., np.nan]])
+
+def test_cache_is_rebuilt_when_the_csv_file_changes(tmp_path):
+    path = str(tmp_path/'batchseq_test.csv')
+    write_csv(path, [[1., 2., 3.]])
+    np.testing.assert_array_equal(load_series(path), [[1., 2., 3.]])
+    #same size, other values and mtime
+    write_csv(path, [[7., 8., 9.]])
+    status = os.stat(path)
+    os.utime(path, ns = (status.st_atime_ns, status.st_mtime_ns+10**9))
+    assert not cache_is_valid(path)
+    np.testing.assert_array_equal(load_series(path), [[7., 8., 9.]])
+    #other size
+    write_csv(path, [[7., 8., 9.], [10., 11., 12.]])
+    np.testing.assert_array_equal(load_series(path), [[7., 8., 9.], [10., 11., 12.]])
+    assert cache_is_valid(path)
+
+def test_malformed_csv_file_is_reported(tmp_path):
+    path = str(tmp_path/'batchseq_test.csv')
+    with open(path, 'w') as file:
+        file.write('0,1,2,3\n1,4,5\n')
+    with pytest.raises(ValueError, match = 'ERROR'):
+        load_series(path)
+    assert not os.path.exists(cache_paths(path)[0])
+
+def test_iter_series_streams_all_rows(tmp_path):
+    path = str(tmp_path/'batchseq_test.csv')
+    rows = np.arange(30.).reshape(10, 3)
+    write_csv(path, rows)
+    for cache in (True, False):
+        chunks = list(iter_series(path, chunk_rows = 4, cache = cache))
+        assert [first_row for first_row, chunk in chunks] == [0, 4, 8]
+        np.testing.assert_array_equal(np.concatenate([chunk for first_row, chunk in chunks]), rows)
+
+def test_iter_series_reads_a_range_of_rows(tmp_path):
+    path = str(tmp_path/'batchseq_test.csv')
+    rows = np.arange(30.).reshape(10, 3)
+    write_csv(path, rows)
+    for cache in (True, False):
+        chunks = list(iter_series(path, chunk_rows = 3, cache = cache, first_row = 2, last_row = 7))
+        assert [first_row for first_row, chunk in chunks] == [2, 5]
+        np.testing.assert_array_equal(np.concatenate([chunk for first_row, chunk in chunks]), rows[2:7])
+        chunks = list(iter_series(path, chunk_rows = 3, cache = cache, first_row = 8, last_row = 20))
+        np.testing.assert_array_equal(np.concatenate([chunk for first_row, chunk in chunks]), rows[8:])
@@ -0,0 +1,51 @@
+#The necessary imports
+import numpy as np
+
+from ele_tests import prime_index, is_prime, prime, vec_prime_pos
+
+"""
+The prime index has to agree with trial division, the elementwise prime test with the one of the original code.
+"""
+def trial_division(number):
+    return number >= 2 and all(number % divisor != 0 for divisor in range(2, int(number**0.5)+1))
+
+def test_sieve_agrees_with_trial_division_while_growing():
+    index  = prime_index(limit = 64, segment = 64)
+    values = np.arange(0, 20000)
+    for limit in (100, 1000, 20000):
+        index.grow(limit)
+        expected = np.asarray([trial_division(int(value)) for value in values[:limit]])
+        np.testing.assert_array_equal(index.is_prime(values[:limit]), expected)
+    np.testing.assert_array_equal(index.primes[:10], [2, 3, 5, 7, 11, 13, 17, 19, 23, 29])
+    np.testing.assert_array_equal(index.rank(np.asarray([1., 2., 10., 29., 19999.])), [0., 1., 4., 10., 2262.])
+    np.testing.assert_array_equal(index.nth(np.asarray([1., 10., 2262.])), [2., 29., 19997.])
+
+def test_sieve_is_packed_into_bits():
+    index = prime_index(limit = 10**6)
+    assert index.sieve.dtype == np.uint8
+    assert index.sieve.nbytes <= index.limit//16+8
+    assert np.count_nonzero(index.primes < 10**6) == 78498
+
+def test_sieve_stops_at_max_limit():
+    index = prime_index(limit = 1000, max_limit = 5000)
+    assert index.is_prime(np.asarray([1000003.]))[0]
+    assert index.limit < 6000
+    assert np.isnan(index.rank(np.asarray([10**6]))[0])
+
+def test_elementwise_prime_test_is_the_original_one():
+    """
+    The original prime(n) holds for 1, negative numbers and non integers which are no multiples of 2 or 3.
+    """
+    values = np.concatenate((np.arange(-40., 3000.), [2.5, 4.5, 7.25, -2.5, 1e9+7, 1e9+9, np.nan, np.inf]))
+    np.testing.assert_array_equal(is_prime(values), [prime(value) for value in values])
+    assert list(is_prime(np.asarray([1., -5., 2.5, 25., 29., 4.]))) == [True, True, True, False, True, False]
+
+def test_prime_position_counts_the_original_primes():
+    """
+    The position of a value is the number of numbers in [0, value) prime(n) holds for, 1 is the first one
+    (thus 2 is at position 1).
+    """
+    values   = np.asarray([0.5, 1., 1.5, 2., 3., 5., 29., 30., 100.])
+    expected = [sum(prime(number) for number in range(0, int(np.ceil(value)))) for value in values]
+    np.testing.assert_array_equal(vec_prime_pos(values), expected)
+    np.testing.assert_array_equal(vec_prime_pos(np.asarray([1., 2., 3., 5., 7.])), [0., 1., 2., 3., 4.])
@@ -0,0 +1,35 @@
+#The necessary imports
+import numpy as np
+import pytest
+
+from classes import data
+from searchstructure import bfs
+from rule_program import compile_programs
+
+"""
+The rule programs compiled from the soloutions of bfs have to continue the series, for every position.
+"""
+CONTINUED = [([1., 2., 4., 7., 11., 16.], [5], [22., 29., 37.]),
+             ([3., 5., 7., 9., 11.], [2], [13., 15., 17.]),
+             ([2., 6., 18., 54., 162.], [4], [486., 1458.]),
+             ([1., 1., 2., 3., 5., 8., 13.], [6], [21., 34., 55.]),
+             ([1., 3., 7., 15., 31., 63.], [5], [127., 255.]),
+             ([1., 10., 2., 20., 3., 30., 4., 40.], [7], [5., 50., 6., 60.]),
+             ([2., 9., 4., 9., 6., 9., 8., 9.], [3, 6], [10., 9., 12., 9.])]
+
+def programs(series, masked):
+    output = bfs(data(np.asarray(masked), np.asarray(series), None, None, None), elem_tests = [], verbose = False)
+    return [program for child in output for program in compile_programs(child)]
+
+@pytest.mark.parametrize('series, masked, continuation', CONTINUED)
+def test_programs_continue_the_series(series, masked, continuation):
+    found = programs(series, masked)
+    assert len(found) != 0
+    for program in found:
+        np.testing.assert_allclose(program.extend(len(series)+len(continuation)), series+continuation)
+        assert str(program).startswith('layer-')
+
+def test_program_replays_many_terms():
+    program = programs([1., 2., 4., 7., 11., 16.], [5])[0]
+    number  = np.arange(10**5, dtype='float64')
+    np.testing.assert_allclose(program.extend(number.size), 1.+number*(number+1.)/2.)
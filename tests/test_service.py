@@ -0,0 +1,67 @@
+#The necessary imports
+import json
+import asyncio
+
+from service import LINE_LIMIT, solving_service, request_lines, solve_request
+
+"""
+The service answers every request line, also the invalid and the overlong ones, and the incomplete searches.
+"""
+async def served(path, requests):
+    service = solving_service(workers = 0)
+    await service.start(path = path)
+    try:
+        return await request_lines(requests, path = path)
+    finally:
+        await service.close()
+
+async def send_overlong(path):
+    service = solving_service(workers = 0)
+    await service.start(path = path)
+    try:
+        reader, writer = await asyncio.open_unix_connection(path, limit = LINE_LIMIT)
+        writer.write(b'{"id": 1, "series": [1, 2, 4, 7, 11, null]}\n'+b'1'*(LINE_LIMIT+10)+b'\n'
+                     +b'{"id": 2, "series": [1, 2, 4, 7, 11, null]}\n')
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        responses = []
+        while True:
+            line = await reader.readline()
+            if len(line) == 0:
+                break
+            responses.append(json.loads(line))
+        writer.close()
+        return responses
+    finally:
+        await service.close()
+
+def test_requests_are_answered_in_order(tmp_path):
+    responses = asyncio.run(served(str(tmp_path/'service.sock'),
+                                   [{'id': number, 'series': [1, 2, 4, 7, 11, None], 'elem_tests': []}
+                                    for number in range(5)]))
+    assert [response['id'] for response in responses] == list(range(5))
+    assert all(response['solutions'] == [[1., 2., 4., 7., 11., 16.]] for response in responses)
+
+def test_invalid_requests_are_answered_with_an_error(tmp_path):
+    responses = asyncio.run(served(str(tmp_path/'service.sock'),
+                                   ['{"id": 1, "series": "1,2,3"}', '{"id": 2, "series": [1, true, null]}',
+                                    '[1, 2]', 'not json', '{"id": 3, "series": [1, 2, 4], "masked": [3]}',
+                                    {'id': 4, 'series': [1, 2, 4, 7, 11, None], 'elem_tests': []}]))
+    assert [response['id'] for response in responses] == [1, 2, None, None, 3, 4]
+    assert all(response['error'].startswith('invalid request') for response in responses[:5])
+    assert 'string' in responses[0]['error'] and 'boolean' in responses[1]['error']
+    assert responses[5]['error'] is None and responses[5]['solutions'] == [[1., 2., 4., 7., 11., 16.]]
+
+def test_overlong_line_is_answered_and_closes_the_connection(tmp_path):
+    responses = asyncio.run(send_overlong(str(tmp_path/'service.sock')))
+    assert len(responses) == 2
+    assert responses[0]['id'] == 1 and responses[0]['error'] is None
+    assert 'longer than' in responses[1]['error']
+
+def test_incomplete_search_answers_its_candidates():
+    response = solve_request({'series': [1, 2, 4, 7, 11, 16, 22, None, None, None, None], 'max_candidates': 3})
+    assert not response['complete'] and response['reason'] == 'max_candidates'
+    assert response['solutions'] == [] and len(response['candidates']) != 0
+    assert all(None in candidate for candidate in response['candidates'])
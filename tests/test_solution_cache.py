@@ -0,0 +1,37 @@
+#The necessary imports
+import numpy as np
+
+from classes import data
+from searchstructure import bfs
+from gen_result import return_solutions
+from solution_cache import solution_cache, solve
+
+"""
+The SQLite cache keeps the max_entries entries used last and returns what return_solutions returns.
+"""
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    with solution_cache(str(tmp_path/'solutions.sqlite'), max_entries = 2) as cache:
+        for key in ('first', 'second'):
+            cache.put(key, [np.asarray([1., 2.])], [1], [()])
+        assert cache.get('first') is not None
+        cache.put('third', [np.asarray([3., 4.])], [2], [()])
+        assert len(cache) == 2
+        assert cache.get('second') is None
+        assert cache.get('first') is not None
+        solutions, multiplicity, chains = cache.get('third')
+        np.testing.assert_array_equal(solutions[0], [3., 4.])
+        assert multiplicity == [2]
+        assert cache.stats()['hits'] == 3 and cache.stats()['misses'] == 1
+
+def test_solve_returns_the_soloutions_of_return_solutions(tmp_path):
+    series      = np.asarray([7., -21., 63., -189., 567., -1701., 5103.])
+    soloutions = return_solutions(bfs(data(np.asarray([1]), series, None, None, None), verbose = False))
+    with solution_cache(str(tmp_path/'solutions.sqlite')) as cache:
+        for attempt in range(2):
+            solutions, multiplicity, chains = solve(data(np.asarray([1]), series, None, None, None), cache)
+            assert len(solutions) == len(soloutions)
+            for solution, soloution in zip(solutions, soloutions):
+                np.testing.assert_array_equal(solution, soloution.series)
+            assert multiplicity == [soloution.multiplicity for soloution in soloutions]
+            assert chains == [soloution.rule_chains for soloution in soloutions]
+        assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
@@ -0,0 +1,59 @@
+#The necessary imports
+import numpy as np
+import pytest
+
+from classes import data
+from searchstructure import bfs
+from gen_result import return_solutions
+
+"""
+The soloutions of bfs and return_solutions, pinned to the ones of the original code:
+(series, masked positions, elementwise tests, soloutions in the order they are found first, their multiplicities).
+The original return_solutions returned one soloution per leaf, its equal soloutions are counted as the multiplicity.
+"""
+PINNED = [([7., -21., 63., -189., 567., -1701., 5103.], [1], [],
+           [[7., -21., 63., -189., 567., -1701., 5103.]], [2]),
+          ([7., 0., 7., 14., 35., 84., 203.], [5], [],
+           [[7., 0., 7., 14., 35., 70., 203.], [7., 0., 7., 14., 35., 140., 203.]], [1, 1]),
+          ([18., -54., 162., -486., 1458., -4374., 13122., -39366., 118098., -354294.], [0, 2, 8], [],
+           [[18., -54., 162., -486., 1458., -4374., 13122., -39366., 118098., -354294.]], [3]),
+          ([14., -42., 126., -378., 1134., -3402., 10206.], [1, 3, 5], [],
+           [[14., 42., 126., 378., 1134., 3402., 10206.]], [1]),
+          ([7., 0., 7., 14., 35., 84., 203.], [6], [],
+           [[7., 0., 7., 14., 35., 84., 147.]], [1]),
+          ([7., 0., 7., 7., 14., 21., 35.], [0, 2, 6], [],
+           [[-7., 0., 0., 7., 14., 21., 28.]], [1]),
+          ([-9., -12., -18., -27., -39., -54., -72.], [2, 4], [],
+           [[-9., -12., -20.25, -27., -40.5, -54., -72.]], [1]),
+          ([0., 0., 0., -3., 0., -6., 0., -9., 0., -12.], [1, 5, 9], [],
+           [[0., -3., 0., -3., 0., -9., 0., -9., 0., -9.]], [1]),
+          ([-11., 33., -99., 297., -891., 2673., -8019.], [0, 2, 5], [], [], []),
+          ([5., 1., -7., -23., -55., -119., -247.], [0, 3, 4], [], [], []),
+          ([17., 25., 33., 41., 49., 57., 65.], [3], ['prime','cube','square'],
+           [[17., 25., 33., 41., 49., 57., 65.], [-1., -1., 33., -1., -1., 57., -1.]], [1, 1])]
+
+def solve_pinned(series, masked, elem_tests, unique = True):
+    output = bfs(data(np.asarray(masked), np.asarray(series), None, None, None), elem_tests = elem_tests,
+                 verbose = False)
+    if np.any(output) == 0:
+        return []
+    return list(return_solutions(output, unique = unique))
+
+@pytest.mark.parametrize('series, masked, elem_tests, expected, multiplicity', PINNED)
+def test_bfs_matches_the_original_soloutions(series, masked, elem_tests, expected, multiplicity):
+    soloutions = solve_pinned(series, masked, elem_tests)
+    assert len(soloutions) == len(expected)
+    for soloution, values in zip(soloutions, expected):
+        np.testing.assert_allclose(soloution.series, values)
+    assert [soloution.multiplicity for soloution in soloutions] == multiplicity
+
+@pytest.mark.parametrize('series, masked, elem_tests, expected, multiplicity', PINNED)
+def test_multiplicity_counts_the_leaves(series, masked, elem_tests, expected, multiplicity):
+    """
+    evaluate counts each soloution multiplicity times, this has to equal counting every leaf like the notebook.
+    """
+    soloutions = solve_pinned(series, masked, elem_tests)
+    leaves     = solve_pinned(series, masked, elem_tests, unique = False)
+    assert sum(soloution.multiplicity for soloution in soloutions) == len(leaves)
+    assert (sum(soloution.multiplicity*all(soloution.series == series) for soloution in soloutions)
+            == sum(all(leaf.series == series) for leaf in leaves))
@@ -0,0 +1,46 @@
+#The necessary imports
+import numpy as np
+
+from classes import data, transposition_table
+
+"""
+The transposition table merges data objects with the same series, the positions to predict and the same rules.
+"""
+def node(series, rules = ()):
+    series      = np.asarray(series, dtype='float64')
+    data_object = data(np.nonzero(np.isnan(series))[0], series, None, None, None)
+    for rule in rules:
+        data_object.add_test(rule)
+    return data_object
+
+def test_equal_series_with_equal_rules_are_merged():
+    table  = transposition_table()
+    first  = node([1., 2., np.nan], [('sum', 0, 1, np.asarray([1.]))])
+    second = node([1., 2., np.nan], [('sum', 0, 1, np.asarray([1.]))])
+    assert table.merge(first) is None
+    assert table.merge(second) is first
+
+def test_equal_series_found_by_other_rules_are_kept():
+    table  = transposition_table()
+    first  = node([1., 2., 3.], [('sum', 0, 1, 1.)])
+    second = node([1., 2., 3.], [('fac', 0, 1, 2.)])
+    assert table.merge(first) is None
+    assert table.merge(second) is None
+
+def test_key_rounds_the_series_and_marks_the_masked_positions():
+    table = transposition_table(decimals = 8)
+    assert table.merge(node([0., 1., np.nan])) is None
+    assert table.merge(node([-0., 1.+1e-12, np.nan])) is not None
+    assert table.merge(node([0., 1., 0.])) is None
+    assert table.merge(node([0., 1.])) is None
+    assert table.merge(node([0., 1.001, np.nan])) is None
+
+def test_merged_children_keep_the_ways_they_got_generated():
+    table    = transposition_table()
+    root     = node([1., 2., 4., 8., np.nan])
+    first    = root.spawn(np.asarray([1., 2., 4., np.nan]), 'dif')
+    second   = root.spawn(np.asarray([2., 2., 2., np.nan]), 'quo')
+    children = [first.spawn(np.asarray([1., 2., np.nan]), 'dif'), second.spawn(np.asarray([1., 2., np.nan]), 'dif')]
+    assert table.merge(children[0]) is None
+    assert table.merge(children[1]) is children[0]
+    assert (children[1].parent, 'dif') in children[0].links